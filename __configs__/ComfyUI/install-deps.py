@@ -1,181 +1,308 @@
 """ install-deps.py | by ANXETY """
 
-from importlib.metadata import distribution, PackageNotFoundError
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import distributions
 from pathlib import Path
 import subprocess
-import importlib
+import tempfile
+import hashlib
+import json
+import time
 import sys
 import re
 import os
 
+try:
+    from packaging.requirements import Requirement, InvalidRequirement
+except ImportError:
+    try:
+        from pip._vendor.packaging.requirements import Requirement, InvalidRequirement
+    except ImportError:
+        Requirement = InvalidRequirement = None
+
+# Notebook modules are optional here: with them installs go through the shared wheelhouse
+# and every pip run is profiled into the session log
+if os.environ.get('scr_path'):
+    sys.path.append(str(Path(os.environ['scr_path']) / 'modules'))
+try:
+    import pip_utils
+    import pip_profiler
+except ImportError:
+    pip_utils = pip_profiler = None
+
+STATE_FILE = 'install-deps.json'
+SCRIPT_WORKERS = min(4, os.cpu_count() or 1)     # pip-free install.py scripts running at once
+# Anything that looks like it runs pip (pip, pip3, pip_install, run_pip, ensurepip, ...)
+USES_PIP = re.compile(r'\bpip\w*\b|run_pip|ensurepip')
+SCRIPT_TIMEOUT = 1800
+# venv marker of the notebook's snapshots: fingerprint of what the (base) venv was built from
+VENV_MARKER = '.anxety-fingerprint'
+
+
+def canonical_name(name):
+    """PEP 503 normalised distribution name"""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+def normalize_url(url):
+    """Comparable form of a VCS URL: no git+ prefix, @ref, #fragment, .git suffix or trailing slash"""
+    url = url.split('#')[0].removeprefix('git+').rstrip('/')
+    url = re.sub(r'(/[^/@]+)@[^/]+$', r'\1', url)
+    return url.removesuffix('.git').lower()
+
+
+# ============================== Index ==============================
+
+def build_index():
+    """Installed distributions, read once: {name: version} and {vcs url: name}"""
+    versions, urls = {}, {}
+    for dist in distributions():
+        name = dist.metadata['Name']
+        if not name:
+            continue
+        versions[canonical_name(name)] = dist.version
+        direct_url = dist.read_text('direct_url.json')
+        if direct_url:
+            try:
+                urls[normalize_url(json.loads(direct_url)['url'])] = canonical_name(name)
+            except (ValueError, KeyError):
+                pass
+    return versions, urls
+
+def requirement_name(line):
+    """Distribution name a requirement line refers to, if it can be told without installing it"""
+    egg = re.search(r'#egg=([A-Za-z0-9._-]+)', line)
+    if egg:
+        return canonical_name(egg.group(1))
+    match = re.match(r'^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*(@|[<>=!~;]|$)', line)
+    return canonical_name(match.group(1)) if match else None
+
+def is_satisfied(line, index):
+    """Check one requirement line against the index (no imports, no subprocesses)"""
+    versions, urls = index
+    line = re.sub(r'^(-e|--editable)\s+', '', line)
+    if 'git+' in line or '://' in line:
+        url = line.split(' @ ', 1)[-1].strip()
+        return normalize_url(url) in urls or requirement_name(line) in versions
+    if Requirement is None:
+        return requirement_name(line) in versions
+    try:
+        requirement = Requirement(line)
+    except InvalidRequirement:
+        return False
+    if requirement.marker and not requirement.marker.evaluate():
+        return True
+    installed = versions.get(canonical_name(requirement.name))
+    if installed is None:
+        return False
+    return not requirement.specifier or requirement.specifier.contains(installed, prereleases=True)
+
+
+# ============================== Nodes ==============================
+
 def get_enabled_subdirectories(base_directory):
     """Find active directories with dependencies"""
     base_path = Path(base_directory)
     subdirs = []
 
-    for subdir in base_path.iterdir():
+    for subdir in sorted(base_path.iterdir()):
         if subdir.is_dir() and not subdir.name.endswith('.disabled') and not subdir.name.startswith('.') and subdir.name != '__pycache__':
-            print(f"\033[1;34mChecking dependencies >> \033[0m{subdir.name}")
             req_file = subdir / 'requirements.txt'
             inst_script = subdir / 'install.py'
 
             if req_file.exists() or inst_script.exists():
                 subdirs.append((subdir, req_file, inst_script))
 
-    print()
     return subdirs
 
-def get_git_package_name(git_url):
-    """Extract package name from Git URL"""
-    clean_url = git_url.split('git+')[-1].rstrip('/')
-
-    # Attempt to extract name from GitHub URL
-    if 'github.com' in clean_url:
-        match = re.search(r'github\.com/[^/]+/([^/]+)', clean_url)
-        if match:
-            return match.group(1).replace('.git', '')
-
-    # General case for .git repositories
-    match = re.search(r'/([^/]+?)(\.git)?$', clean_url)
-    return match.group(1) if match else None
-
-def is_git_installed(git_url):
-    """Check if Git package is installed by attempting import"""
-    pkg_name = get_git_package_name(git_url)
-    if not pkg_name:
-        return False
-
-    variants = {
-        pkg_name,
-        pkg_name.lower(),
-        pkg_name.replace('-', '_'),
-        pkg_name.lower().replace('-', '_')
-    }
-
-    for variant in variants:
-        try:
-            importlib.import_module(variant)
-            return True
-        except ImportError:
+def environment_id():
+    """
+    The environment nodes are installed into: interpreter, venv and the base venv's build
+
+    A node recorded as installed in one venv is not installed in a fresh or rebuilt one.
+    """
+    parts = [sys.version]
+    for prefix in dict.fromkeys(filter(None, [sys.prefix, os.environ.get('venv_path')])):
+        marker = Path(prefix) / VENV_MARKER
+        parts.append(f"{Path(prefix).resolve()}:{marker.read_text().strip() if marker.is_file() else ''}")
+    return '\0'.join(parts)
+
+def node_fingerprint(req_file, inst_script, environment=''):
+    """Hash of what decides a node's dependencies: its requirements.txt, install.py and the environment"""
+    digest = hashlib.sha256(environment.encode() + b'\0')
+    for path in (req_file, inst_script):
+        digest.update(path.name.encode() + b'\0')
+        digest.update(path.read_bytes() if path.exists() else b'<missing>')
+    return digest.hexdigest()[:16]
+
+def _local_path(value, base_dir):
+    """value made absolute if it names something inside the node (pip reads the batch from a temp file)"""
+    if '://' in value or value.startswith('git+'):
+        return value
+    path = Path(base_dir) / value
+    return str(path.resolve()) if path.exists() else value
+
+def read_requirements(req_file, seen=None):
+    """
+    Requirement and option lines of a node: (specs, options)
+
+    -r includes are inlined; -e and local-path requirements stay requirements. Every other
+    option (--extra-index-url, -f, -c, ...) is returned as is, with local paths made absolute,
+    so the batched pip run sees what the node's own requirements.txt would have given it.
+    """
+    seen = set() if seen is None else seen
+    req_file = Path(req_file)
+    if not req_file.is_file() or req_file.resolve() in seen:
+        return [], []
+    seen.add(req_file.resolve())
+    specs, options = [], []
+    text = req_file.read_text(encoding='utf-8', errors='replace').replace('\\\n', '')
+    for raw in text.splitlines():
+        line = re.sub(r'(^|\s)#(?!egg=).*$', '', raw).strip()
+        if not line:
             continue
-    return False
+        flag, *value = re.split(r'[\s=]+', line, maxsplit=1)          # '-f URL' or '--find-links=URL'
+        value = value[0].strip() if value else ''
+        if flag in ('-r', '--requirement'):
+            nested_specs, nested_options = read_requirements(req_file.parent / value, seen)
+            specs.extend(nested_specs)
+            options.extend(nested_options)
+        elif flag in ('-e', '--editable'):
+            specs.append(f"-e {_local_path(value, req_file.parent)}")
+        elif line.startswith('-'):
+            options.append(f"{flag} {_local_path(value, req_file.parent)}" if value else flag)
+        elif line.startswith(('.', '/')):
+            specs.append(_local_path(line, req_file.parent))
+        else:
+            specs.append(line)
+    return specs, options
+
+
+# ============================ Installing ===========================
+
+def pip_install(specs, options=()):
+    """Install specs with one pip (resolver) run under the nodes' options; returns (ok, last error line)"""
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', prefix='install-deps-', delete=False) as f:
+        f.write('\n'.join([*options, *specs]) + '\n')
 
-def check_package(package_spec):
-    """Check package installation with version verification"""
     try:
-        if 'git+' in package_spec:
-            return is_git_installed(package_spec)
+        if pip_utils:
+            result = pip_utils.install_requirements([sys.executable, '-m', 'pip'], Path(f.name), label='comfyui-nodes')
+        else:
+            result = subprocess.run([sys.executable, '-m', 'pip', 'install', '-q', '--disable-pip-version-check',
+                                     '-r', f.name], capture_output=True, text=True)
+    finally:
+        os.unlink(f.name)
+    error = (result.stderr.strip().splitlines() or [''])[-1]
+    return result.returncode == 0, error
+
+def install_missing(missing, options=()):
+    """Install all missing packages in one batch; on conflict fall back to one by one. Returns failed specs"""
+    specs = sorted(missing)
+    print(f"\033[1;32mInstalling >> \033[0m{len(specs)} packages: {', '.join(specs)}")
+    ok, error = pip_install(specs, options)
+    if ok:
+        return set()
+
+    print(f"\033[1;31mBatch install failed ({error}), retrying packages one by one\033[0m")
+    failed = set()
+    for spec in specs:
+        if not pip_install([spec], options)[0]:
+            print(f"\033[1;31mFailed >> \033[0m{spec}")
+            failed.add(spec)
+    return failed
+
+def uses_pip(node_dir, script_path):
+    """Whether an install.py (or a module of its node it imports) may invoke pip"""
+    text = Path(script_path).read_text(encoding='utf-8', errors='replace')
+    for module in re.findall(r'^\s*(?:from\s+\.?|import\s+)([A-Za-z_]\w*)', text, re.MULTILINE):
+        helper = Path(node_dir) / f"{module}.py"
+        if helper.is_file() and helper.name != Path(script_path).name:
+            text += helper.read_text(encoding='utf-8', errors='replace')
+    return bool(USES_PIP.search(text))
+
+def run_install_script(node_dir, script_path):
+    """Execute a node's install.py in its own folder; returns (ok, seconds, last output line)"""
+    start = time.time()
+    try:
+        result = subprocess.run([sys.executable, str(Path(script_path).resolve())], cwd=str(node_dir),
+                                capture_output=True, text=True, timeout=SCRIPT_TIMEOUT)
+        output = (result.stderr.strip() or result.stdout.strip()).splitlines()
+        return result.returncode == 0, time.time() - start, output[-1] if output else ''
+    except subprocess.TimeoutExpired:
+        return False, time.time() - start, f"timed out after {SCRIPT_TIMEOUT}s"
 
-        match = re.match(r'^([^=><]+)([<>=!]+)(.+)$', package_spec)
-        if not match:
-            dist = distribution(package_spec.strip())
-            return True
 
-        name, op, version = map(str.strip, match.groups())
-        installed = distribution(name).version
-        return compare_versions(installed, version, op)
+# ============================== State ==============================
 
-    except (PackageNotFoundError, AttributeError):
-        return False
+def load_state(state_file):
+    """Previous per-node fingerprints"""
+    try:
+        return json.loads(Path(state_file).read_text())
+    except (OSError, ValueError):
+        return {}
 
-def compare_versions(v1, v2, operator):
-    """Universal version comparison"""
-    v1_parts = list(map(int, re.findall(r'\d+', v1)))
-    v2_parts = list(map(int, re.findall(r'\d+', v2)))
-
-    for a, b in zip(v1_parts, v2_parts):
-        if a != b:
-            break
-    else:
-        a, b = len(v1_parts), len(v2_parts)
-
-    if operator == '==': return a == b
-    if operator == '>=': return a >= b
-    if operator == '<=': return a <= b
-    if operator == '>': return a > b
-    if operator == '<': return a < b
-    return False
-
-def install_package(package_spec):
-    """Install a package"""
-    print(f"\033[1;32mInstalling >> \033[0m{package_spec}")
-    subprocess.run(
-        [sys.executable, '-m', 'pip', 'install', '-q', package_spec],
-        check=True,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
-
-def process_requirements(file_path, installed):
-    """Process requirements file"""
-    if not file_path.exists():
-        return
+def save_state(state, state_file):
+    tmp = Path(f"{state_file}.tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+    os.replace(tmp, state_file)
 
-    with open(file_path) as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('#') or line in installed:
-                continue
-
-            if not check_package(line):
-                install_package(line)
-                installed.add(line)
-
-def run_install_script(script_path, executed):
-    """Execute installation script"""
-    if script_path.exists() and str(script_path) not in executed:
-        print(f"\033[1;33mRunning install script >> \033[0m{script_path}")
-        subprocess.run(
-            [sys.executable, str(script_path)],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        executed.add(str(script_path))
-
-def save_state(installed, scripts, log_file):
-    """Save installation state to log file"""
-    with open(log_file, 'w') as f:
-        f.write('\n'.join(installed))
-        f.write('\n\n# Executed scripts:\n')
-        f.write('\n'.join(scripts))
-
-def load_previous_state(log_file):
-    """Load previous installation state from log"""
-    installed = set()
-    scripts = set()
-
-    if Path(log_file).exists():
-        with open(log_file) as f:
-            section = 0
-            for line in f:
-                line = line.strip()
-                if not line: continue
-
-                if line.startswith('# Executed scripts:'):
-                    section = 1
-                    continue
-
-                if section == 0:
-                    installed.add(line)
-                else:
-                    scripts.add(line)
-
-    return installed, scripts
 
 def main():
     base_dir = 'custom_nodes'
-    log_file = 'installed_packages.txt'
-
-    installed, executed = load_previous_state(log_file)
-    directories = get_enabled_subdirectories(base_dir)
+    start = time.time()
+
+    state = load_state(STATE_FILE)
+    nodes = get_enabled_subdirectories(base_dir)
+    environment = environment_id()
+    changed = [(node, req, script, node_fingerprint(req, script, environment)) for node, req, script in nodes]
+    changed = [entry for entry in changed if state.get(entry[0].name, {}).get('fingerprint') != entry[3]]
+    print(f"\033[1;34mChecking dependencies >> \033[0m{len(nodes)} nodes, {len(changed)} new or changed")
+    if not changed:
+        return
 
     try:
-        for _, req, script in directories:
-            process_requirements(req, installed)
-            run_install_script(script, executed)
-
-        save_state(installed, executed, log_file)
+        # One index of installed distributions, one batched pip run for every node's missing packages
+        index = build_index()
+        requirements = {node.name: read_requirements(req) for node, req, _, _ in changed}
+        node_specs = {name: specs for name, (specs, _) in requirements.items()}
+        missing = {spec for specs in node_specs.values() for spec in specs if not is_satisfied(spec, index)}
+        # Options of every node with something to install (deduplicated, in first-seen order)
+        options = list(dict.fromkeys(option for specs, node_options in requirements.values()
+                                     if any(spec in missing for spec in specs) for option in node_options))
+        failed = install_missing(missing, options) if missing else set()
+
+        # Scripts that don't touch pip run side by side; ones that do run one at a time afterwards,
+        # so no two pip processes (un)install into the same site-packages at once
+        scripts = [(node, script) for node, _, script, _ in changed if script.exists()]
+        serial = [(node, script) for node, script in scripts if uses_pip(node, script)]
+        parallel = [entry for entry in scripts if entry not in serial]
+        timings = {}
+        if scripts:
+            print(f"\033[1;33mRunning install scripts >> \033[0m{len(parallel)} side by side ({SCRIPT_WORKERS} at a time), "
+                  f"{len(serial)} using pip one by one")
+            with ThreadPoolExecutor(max_workers=SCRIPT_WORKERS) as pool:
+                futures = {node.name: pool.submit(run_install_script, node, script) for node, script in parallel}
+                timings = {name: future.result() for name, future in futures.items()}
+            for node, script in serial:
+                timings[node.name] = run_install_script(node, script)
+
+        for node, _, _, fingerprint in changed:
+            ok, seconds, message = timings.get(node.name, (True, 0.0, ''))
+            node_failed = sorted(failed.intersection(node_specs[node.name]))
+            if ok and not node_failed:
+                state[node.name] = {'fingerprint': fingerprint, 'installed_at': time.time(),
+                                    'script_seconds': round(seconds, 2)}
+            elif not ok:
+                print(f"\033[1;31mInstall script failed >> \033[0m{node.name}: {message}")
+            if node_failed:
+                print(f"\033[1;31mMissing dependencies >> \033[0m{node.name}: {', '.join(node_failed)}")
+
+        for name, (ok, seconds, _) in sorted(timings.items(), key=lambda item: -item[1][1]):
+            print(f"  {'✔' if ok else '✘'} {name}: {seconds:.1f}s")
+        save_state(state, STATE_FILE)
+        print(f"\033[1;32mDependencies ready in {time.time() - start:.1f}s\033[0m")
+        if pip_profiler and missing:
+            print('\n'.join(pip_profiler.summary()))
 
     except KeyboardInterrupt:
         print("\n\033[1;31mInterrupted by user\033[0m")
@@ -183,4 +310,4 @@ def main():
         print(f"\n\033[1;31mError: {e}\033[0m")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
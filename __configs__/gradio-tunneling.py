@@ -22,6 +22,14 @@ import re
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+try:
+    from http_utils import get_session  # shared keep-alive pool when run inside sdAIgen
+except ImportError:
+    _session = requests.Session()
+
+    def get_session() -> requests.Session:
+        return _session
+
 
 class BinaryManager:
     """Manages downloading and configuration of frpc binary"""
@@ -54,7 +62,7 @@ class BinaryManager:
             return
 
         logger.info("Downloading frpc binary...")
-        response = requests.get(self.download_url)
+        response = get_session().get(self.download_url)
 
         if response.status_code == 403:
             raise OSError(f"Unsupported platform: {platform.uname()}")
@@ -93,7 +101,7 @@ class Tunnel:
             host, port = server.split(":", 1)
             return host, int(port)
 
-        response = requests.get(self.GRADIO_API)
+        response = get_session().get(self.GRADIO_API)
         response.raise_for_status()
         data = response.json()[0]
         return data["host"], int(data["port"])
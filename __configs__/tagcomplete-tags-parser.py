@@ -1,6 +1,7 @@
 # ~ tagcomplete-tags-parser.py | CSV Tags Downloader for sd-webui-tagcomplete | by ANXETY ~
 
 import json_utils as js
+import http_utils as http
 
 from datetime import datetime
 from pathlib import Path
@@ -66,12 +67,11 @@ class TagsParser:
         self.verbose = verbose
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self.session = http.get_async_session()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        await http.close_async_session()
 
     async def get_directory_contents(self, path=""):
         """Get contents of a directory from GitHub API."""
@@ -1,6 +1,7 @@
 # ~ CivitaiAPI Module (V3) - Enhanced for 10WebUI System | by ANXETY ~
 
 import json_utils as js
+import http_utils as http
 import requests
 import time
 import re
@@ -31,11 +32,8 @@ class CivitAiAPI:
         # Get token from multiple sources
         self.token = token or self._get_token()
         self.timeout = timeout
-        self.session = requests.Session()
-        
-        # Configure session
-        self.session.headers.update({
-            'User-Agent': 'LightningSdaigen/3.0 (Enhanced WebUI Manager)',
+        # Own headers, shared keep-alive pools (see http_utils)
+        self.session = http.new_session({
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
@@ -0,0 +1,440 @@
+# ~ archive_utils.py | Streaming, parallel archive extraction | by ANXETY ~
+
+import http_utils as http
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, List, BinaryIO
+import subprocess
+import threading
+import tarfile
+import zipfile
+import struct
+import shutil
+import stat
+import zlib
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+READ_CHUNK = 4 * 1024 * 1024
+WRITE_BUFFER = 8 * 1024 * 1024
+INLINE_THRESHOLD = 32 * 1024 * 1024      # bigger zip members are inflated by the reader itself
+MAX_INFLIGHT = 256 * 1024 * 1024         # compressed bytes buffered for the worker pool
+
+# External decompressors run in their own process (pigz/xz use several threads)
+TAR_FILTERS = {
+    'gz': [['pigz', '-dc'], ['gzip', '-dc']],
+    'bz2': [['lbzip2', '-dc'], ['bzip2', '-dc']],
+    'xz': [['xz', '-dc', '-T0']],
+    'zst': [['zstd', '-dc']]
+}
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+LOCAL_SIG, CENTRAL_SIG, END_SIG, DESCRIPTOR_SIG = 0x04034b50, 0x02014b50, 0x06054b50, 0x08074b50
+
+
+class ArchiveError(RuntimeError):
+    """Archive that can't be extracted (unsupported layout, corrupt data or unsafe paths)."""
+
+
+def archive_format(name: str) -> Optional[str]:
+    """
+    'zip', 'tar' or 'tar.<gz|bz2|xz|zst>' from a file name or URL, None if unknown
+
+    A bare .gz / .xz / .bz2 / .zst is a single compressed file (e.g. model.safetensors.gz),
+    not a tarball, so it is not an archive either.
+    """
+    name = name.lower().split('?')[0]
+    if name.endswith('.zip'):
+        return 'zip'
+    for suffixes, fmt in ((('.tar.zst', '.tzst'), 'tar.zst'), (('.tar.gz', '.tgz'), 'tar.gz'),
+                          (('.tar.xz', '.txz'), 'tar.xz'), (('.tar.bz2', '.tbz2'), 'tar.bz2'),
+                          (('.tar',), 'tar')):
+        if name.endswith(suffixes):
+            return fmt
+    return None
+
+def _safe_target(destination: Path, name: str) -> Path:
+    parts = Path(name.replace('\\', '/')).parts
+    if Path(name).is_absolute() or '..' in parts:
+        raise ArchiveError(f"Unsafe path in archive: {name}")
+    return destination.joinpath(*parts)
+
+
+# ============================= Streams =============================
+
+class _Reader:
+    """Exact-size reads over a forward-only stream, with push-back for over-read bytes."""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.pending = b''
+        self.consumed = 0
+
+    def read(self, size: int) -> bytes:
+        chunks, need = [], size
+        if self.pending:
+            chunks.append(self.pending[:need])
+            self.pending = self.pending[need:]
+            need -= len(chunks[0])
+        while need > 0:
+            data = self.stream.read(min(need, READ_CHUNK))
+            if not data:
+                break
+            chunks.append(data)
+            need -= len(data)
+        data = b''.join(chunks)
+        self.consumed += len(data)
+        return data
+
+    def read_exact(self, size: int) -> bytes:
+        data = self.read(size)
+        if len(data) != size:
+            raise ArchiveError('Unexpected end of archive stream')
+        return data
+
+    def chunk(self) -> bytes:
+        """Whatever is next in the stream (at most READ_CHUNK bytes)."""
+        if self.pending:
+            data, self.pending = self.pending, b''
+        else:
+            data = self.stream.read(READ_CHUNK)
+        self.consumed += len(data)
+        return data
+
+    def unread(self, data: bytes):
+        if data:
+            self.pending = data + self.pending
+            self.consumed -= len(data)
+
+
+class _Budget:
+    """Caps the compressed bytes queued for the worker pool so a fast network can't outrun the disk."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int):
+        with self._cond:
+            while self.used and self.used + size > self.limit:
+                self._cond.wait()
+            self.used += size
+
+    def release(self, size: int):
+        with self._cond:
+            self.used -= size
+            self._cond.notify_all()
+
+
+def _decompressor(command_options: List[List[str]], stream: BinaryIO):
+    """Pipe stream through the first available external decompressor; returns (stdout, proc) or None."""
+    command = next((cmd for cmd in command_options if shutil.which(cmd[0])), None)
+    if not command:
+        return None
+    proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, bufsize=READ_CHUNK)
+
+    def feed():
+        try:
+            while (data := stream.read(READ_CHUNK)):
+                proc.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    threading.Thread(target=feed, name='ArchiveFeed', daemon=True).start()
+    return proc.stdout, proc
+
+
+# =============================== Zip ===============================
+
+def _write_member(target: Path, data: bytes, method: int, crc: int) -> int:
+    if method == zipfile.ZIP_DEFLATED:
+        data = zlib.decompress(data, -15)
+    elif method != zipfile.ZIP_STORED:
+        raise ArchiveError(f"Unsupported zip compression method {method} for {target.name}")
+    if zlib.crc32(data) != crc:
+        raise ArchiveError(f"CRC mismatch for {target}")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target, 'wb', buffering=WRITE_BUFFER) as f:
+        f.write(data)
+    return len(data)
+
+def _zip64_sizes(extra: bytes, csize: int, usize: int):
+    while len(extra) >= 4:
+        tag, size = struct.unpack('<HH', extra[:4])
+        if tag == 0x0001:
+            values = iter(struct.unpack(f'<{size // 8}Q', extra[4:4 + size - size % 8]))
+            if usize == 0xFFFFFFFF:
+                usize = next(values)
+            if csize == 0xFFFFFFFF:
+                csize = next(values)
+            break
+        extra = extra[4 + size:]
+    return csize, usize
+
+def _inflate_inline(reader: _Reader, target: Path, method: int, csize: Optional[int]) -> tuple:
+    """Decompress one member straight from the stream; csize None means 'until the deflate stream ends'."""
+    inflater = zlib.decompressobj(-15) if method == zipfile.ZIP_DEFLATED else None
+    if method not in (zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED):
+        raise ArchiveError(f"Unsupported zip compression method {method} for {target.name}")
+    if inflater is None and csize is None:
+        raise ArchiveError(f"Stored member without sizes cannot be streamed: {target.name}")
+
+    crc, written, remaining = 0, 0, csize
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target, 'wb', buffering=WRITE_BUFFER) as f:
+        while remaining is None or remaining > 0:
+            data = reader.read(min(remaining, READ_CHUNK)) if remaining is not None else reader.chunk()
+            if not data:
+                raise ArchiveError(f"Unexpected end of archive stream in {target.name}")
+            if remaining is not None:
+                remaining -= len(data)
+            if inflater:
+                out = inflater.decompress(data)
+                if inflater.eof:
+                    reader.unread(inflater.unused_data)
+                    remaining = 0
+            else:
+                out = data
+            crc = zlib.crc32(out, crc)
+            written += len(out)
+            f.write(out)
+    return crc, written
+
+def _read_descriptor(reader: _Reader, zip64: bool) -> int:
+    """Skip a data descriptor and return its CRC."""
+    head = reader.read_exact(4)
+    if struct.unpack('<I', head)[0] != DESCRIPTOR_SIG:
+        reader.unread(head)
+    crc = struct.unpack('<I', reader.read_exact(4))[0]
+    reader.read_exact(16 if zip64 else 8)
+    return crc
+
+def _apply_central_directory(reader: _Reader, destination: Path):
+    """Restore unix modes and symlinks recorded in the central directory (local headers don't carry them)."""
+    while (head := reader.read(4)) and struct.unpack('<I', head)[0] == CENTRAL_SIG:
+        fields = CENTRAL_HEADER.unpack(head + reader.read_exact(CENTRAL_HEADER.size - 4))
+        made_by, name_len, extra_len, comment_len, external = fields[1], fields[10], fields[11], fields[12], fields[15]
+        name = reader.read_exact(name_len).decode('utf-8' if fields[3] & 0x800 else 'cp437')
+        reader.read_exact(extra_len + comment_len)
+        mode = external >> 16
+        if made_by >> 8 != 3 or not mode:           # not created on unix
+            continue
+        target = _safe_target(destination, name)
+        if stat.S_ISLNK(mode) and target.is_file():
+            link = target.read_text()
+            target.unlink()
+            os.symlink(link, target)
+        elif stat.S_ISREG(mode) and target.is_file():
+            os.chmod(target, stat.S_IMODE(mode))
+
+def extract_zip_stream(stream: BinaryIO, destination: Path, workers: int = None) -> Dict[str, int]:
+    """
+    Extract a zip from a forward-only stream by walking its local file headers
+
+    Members are inflated on a thread pool (zlib releases the GIL) while the stream keeps
+    being read; members above INLINE_THRESHOLD are inflated by the reader to bound memory.
+
+    Returns:
+        Dict with files and bytes written
+    """
+    destination = Path(destination)
+    reader = _Reader(stream)
+    budget = _Budget(MAX_INFLIGHT)
+    files, written = 0, 0
+    futures = []
+
+    def job(target, data, method, crc):
+        try:
+            return _write_member(target, data, method, crc)
+        finally:
+            budget.release(len(data))
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4, thread_name_prefix='Extract') as pool:
+        while True:
+            head = reader.read(4)
+            if len(head) < 4 or struct.unpack('<I', head)[0] != LOCAL_SIG:
+                reader.unread(head)
+                break
+            (_, _, flags, method, _, _, crc, csize, usize, name_len, extra_len) = LOCAL_HEADER.unpack(
+                head + reader.read_exact(LOCAL_HEADER.size - 4))
+            name = reader.read_exact(name_len).decode('utf-8' if flags & 0x800 else 'cp437')
+            extra = reader.read_exact(extra_len)
+            if flags & 0x1:
+                raise ArchiveError(f"Encrypted zip members are not supported: {name}")
+            zip64 = csize == 0xFFFFFFFF or usize == 0xFFFFFFFF
+            csize, usize = _zip64_sizes(extra, csize, usize)
+            target = _safe_target(destination, name)
+
+            if name.endswith('/'):
+                target.mkdir(parents=True, exist_ok=True)
+                if flags & 0x8:
+                    _read_descriptor(reader, zip64)
+                continue
+
+            files += 1
+            sized = not flags & 0x8 or csize
+            if sized and csize <= INLINE_THRESHOLD and not flags & 0x8:
+                data = reader.read_exact(csize)
+                budget.acquire(len(data))
+                futures.append(pool.submit(job, target, data, method, crc))
+            else:
+                actual_crc, size = _inflate_inline(reader, target, method, csize if sized else None)
+                if flags & 0x8:
+                    crc = _read_descriptor(reader, zip64 or size >= 0xFFFFFFFF)
+                if actual_crc != crc:
+                    raise ArchiveError(f"CRC mismatch for {target}")
+                written += size
+            # Surface worker failures early instead of after the whole download
+            for future in [f for f in futures if f.done()]:
+                written += future.result()
+                futures.remove(future)
+
+        for future in futures:
+            written += future.result()
+
+    if files == 0:
+        raise ArchiveError('No zip entries found in stream')
+    _apply_central_directory(reader, destination)
+    # Drain the end-of-central-directory record so HTTP connections can be reused
+    while reader.chunk():
+        pass
+    return {'files': files, 'bytes': written}
+
+def extract_zip_file(archive: Path, destination: Path, workers: int = None) -> Dict[str, int]:
+    """Extract a zip on disk with members spread over a thread pool (one ZipFile handle per thread)."""
+    destination = Path(destination)
+    with zipfile.ZipFile(archive) as zf:
+        members = zf.infolist()
+    for info in members:
+        _safe_target(destination, info.filename)
+
+    local = threading.local()
+
+    def extract(info: zipfile.ZipInfo) -> int:
+        if not hasattr(local, 'zf'):
+            local.zf = zipfile.ZipFile(archive)
+        target = _safe_target(destination, info.filename)
+        if info.is_dir():
+            target.mkdir(parents=True, exist_ok=True)
+            return 0
+        target.parent.mkdir(parents=True, exist_ok=True)
+        mode = info.external_attr >> 16
+        with local.zf.open(info) as src:
+            if stat.S_ISLNK(mode):
+                target.unlink(missing_ok=True)
+                os.symlink(src.read().decode(), target)
+                return 0
+            with open(target, 'wb', buffering=WRITE_BUFFER) as dst:
+                shutil.copyfileobj(src, dst, WRITE_BUFFER)
+        if info.create_system == 3 and stat.S_IMODE(mode):
+            os.chmod(target, stat.S_IMODE(mode))
+        return info.file_size
+
+    # Largest members first so one big file doesn't end up alone at the tail
+    members.sort(key=lambda info: -info.compress_size)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4, thread_name_prefix='Extract') as pool:
+        written = sum(pool.map(extract, members))
+    return {'files': sum(not info.is_dir() for info in members), 'bytes': written}
+
+
+# =============================== Tar ===============================
+
+def extract_tar_stream(stream: BinaryIO, destination: Path, compression: str = None) -> Dict[str, int]:
+    """
+    Extract a (compressed) tar from a forward-only stream
+
+    Decompression runs in an external process when one is available (pigz, xz -T0, zstd),
+    so it overlaps with reading the source and writing files here.
+    """
+    destination = Path(destination)
+    destination.mkdir(parents=True, exist_ok=True)
+    proc = None
+    source = stream
+    if compression:
+        piped = _decompressor(TAR_FILTERS.get(compression, []), stream)
+        if piped:
+            source, proc = piped
+        elif compression == 'zst':
+            if zstandard is None:
+                raise ArchiveError('.tar.zst needs the zstd binary or the zstandard module')
+            source = zstandard.ZstdDecompressor().stream_reader(stream, read_size=READ_CHUNK)
+    mode = 'r|' if proc or compression in (None, 'zst') else f'r|{compression}'
+
+    files = written = 0
+    try:
+        with tarfile.open(fileobj=source, mode=mode, copybufsize=WRITE_BUFFER) as tar:
+            for member in tar:
+                _safe_target(destination, member.name)
+                if hasattr(tarfile, 'data_filter'):
+                    tar.extract(member, destination, filter='data')
+                else:
+                    tar.extract(member, destination)
+                if member.isfile():
+                    files += 1
+                    written += member.size
+    except tarfile.TarError as e:
+        raise ArchiveError(f"Corrupt tar stream: {e}") from e
+    finally:
+        if proc:
+            proc.stdout.close()
+            proc.wait()
+    # A decompressor may die of SIGPIPE once tar has seen its end-of-archive marker
+    if proc and proc.returncode and not files:
+        raise ArchiveError(f"{proc.args[0]} exited with code {proc.returncode}")
+    return {'files': files, 'bytes': written}
+
+
+# ============================== Public =============================
+
+def extract(archive: Path, destination: Path, fmt: str = None, workers: int = None) -> Dict[str, int]:
+    """
+    Extract an archive file into destination
+
+    Args:
+        fmt: 'zip', 'tar' or 'tar.<gz|bz2|xz|zst>' (guessed from the name by default)
+        workers: Threads for parallel zip extraction (defaults to the CPU count)
+
+    Returns:
+        Dict with files and bytes written
+    """
+    archive, destination = Path(archive), Path(destination)
+    fmt = fmt or archive_format(archive.name)
+    if fmt is None:
+        raise ArchiveError(f"Unsupported archive format: {archive.name}")
+    destination.mkdir(parents=True, exist_ok=True)
+    if fmt == 'zip':
+        return extract_zip_file(archive, destination, workers)
+    with open(archive, 'rb', buffering=READ_CHUNK) as f:
+        return extract_tar_stream(f, destination, fmt.partition('.')[2] or None)
+
+def stream_extract(url: str, destination: Path, fmt: str = None, workers: int = None,
+                   timeout: int = 60) -> Dict[str, int]:
+    """
+    Extract a remote archive while it downloads, without staging it on disk
+
+    Raises ArchiveError if the archive can't be streamed (callers should fall back to
+    downloading it and using extract()), requests exceptions for network failures.
+    """
+    fmt = fmt or archive_format(url)
+    if fmt is None:
+        raise ArchiveError(f"Unsupported archive format: {url}")
+    destination = Path(destination)
+    destination.mkdir(parents=True, exist_ok=True)
+    with http.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        if fmt == 'zip':
+            return extract_zip_stream(response.raw, destination, workers)
+        return extract_tar_stream(response.raw, destination, fmt.partition('.')[2] or None)
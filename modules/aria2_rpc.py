@@ -0,0 +1,218 @@
+# ~ aria2_rpc.py | Persistent aria2c JSON-RPC backend | by ANXETY ~
+
+import http_utils as http
+from pathlib import Path
+from typing import Optional, Dict, List
+import subprocess
+import threading
+import itertools
+import secrets
+import atexit
+import shutil
+import socket
+import time
+import os
+
+RPC_HOST = '127.0.0.1'
+STATUS_KEYS = ['gid', 'status', 'totalLength', 'completedLength', 'downloadSpeed',
+               'errorCode', 'errorMessage', 'files']
+FINAL_STATES = {'complete', 'error', 'removed'}
+
+
+class Aria2Error(RuntimeError):
+    """JSON-RPC error returned by the aria2c daemon."""
+
+
+class Aria2Daemon:
+    """
+    One long-lived `aria2c --enable-rpc` process for the whole session.
+
+    URIs are submitted through `aria2.addUri` (batched with `system.multicall`) so aria2's
+    own scheduler interleaves every file over shared connections; progress comes from
+    polling `tellStatus` / `tellActive`.
+    """
+
+    def __init__(self, max_concurrent: int = 8, connections_per_server: int = 8, split: int = 8,
+                 extra_options: List[str] = None):
+        self.port = self._free_port()
+        self.secret = secrets.token_hex(16)
+        self.url = f"http://{RPC_HOST}:{self.port}/jsonrpc"
+        self.options = [
+            f'--max-concurrent-downloads={max_concurrent}',
+            f'--max-connection-per-server={connections_per_server}',
+            f'--split={split}',
+            '--min-split-size=8M',
+            '--file-allocation=falloc',
+            '--continue=true',
+            '--auto-file-renaming=false',
+            '--allow-overwrite=true',
+            '--max-tries=3',
+            '--retry-wait=3',
+            '--timeout=30',
+            *(extra_options or [])
+        ]
+        self.proc: Optional[subprocess.Popen] = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as sock:
+            sock.bind((RPC_HOST, 0))
+            return sock.getsockname()[1]
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self, timeout: float = 15.0):
+        """Spawn the daemon (once) and wait until its RPC endpoint answers."""
+        with self._lock:
+            if self.running:
+                return
+            if not shutil.which('aria2c'):
+                raise Aria2Error('aria2c is not installed')
+
+            self.proc = subprocess.Popen([
+                'aria2c',
+                '--enable-rpc',
+                '--rpc-listen-all=false',
+                f'--rpc-listen-port={self.port}',
+                f'--rpc-secret={self.secret}',
+                f'--stop-with-process={os.getpid()}',
+                '--console-log-level=warn',
+                '--summary-interval=0',
+                '--download-result=hide',
+                *self.options
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                try:
+                    # Plain connect first so the pooled session's retry/backoff isn't hit while it boots
+                    socket.create_connection((RPC_HOST, self.port), timeout=1).close()
+                    self.call('getVersion')
+                    return
+                except Exception:
+                    if not self.running:
+                        raise Aria2Error('aria2c RPC daemon exited during startup')
+                    time.sleep(0.1)
+            raise Aria2Error('aria2c RPC daemon did not become ready')
+
+    def shutdown(self):
+        if not self.running:
+            return
+        try:
+            self.call('shutdown')
+            self.proc.wait(timeout=5)
+        except Exception:
+            self.proc.terminate()
+        self.proc = None
+
+    # ---- JSON-RPC ----
+
+    def _params(self, params) -> list:
+        return [f'token:{self.secret}', *params]
+
+    def call(self, method: str, *params):
+        payload = {
+            'jsonrpc': '2.0',
+            'id': next(self._ids),
+            'method': f'aria2.{method}',
+            'params': self._params(params)
+        }
+        data = http.get_session().post(self.url, json=payload, timeout=10).json()
+        if 'error' in data:
+            raise Aria2Error(data['error'].get('message', str(data['error'])))
+        return data['result']
+
+    def multicall(self, calls: List[tuple]) -> list:
+        """Run [(method, params), ...] in one round-trip; failed entries come back as Aria2Error."""
+        if not calls:
+            return []
+        payload = {
+            'jsonrpc': '2.0',
+            'id': next(self._ids),
+            'method': 'system.multicall',
+            'params': [[{'methodName': f'aria2.{method}', 'params': self._params(params)}
+                        for method, params in calls]]
+        }
+        data = http.get_session().post(self.url, json=payload, timeout=30).json()
+        if 'error' in data:
+            raise Aria2Error(data['error'].get('message', str(data['error'])))
+        # Failed entries are XML-RPC style fault structs ({faultCode, faultString}), not JSON-RPC errors
+        return [entry[0] if isinstance(entry, list) else Aria2Error(entry.get('faultString', str(entry)))
+                for entry in data['result']]
+
+    # ---- downloads ----
+
+    @staticmethod
+    def job_options(url: str, directory: Path, filename: str = None, sha256: str = None) -> Dict:
+        options = {'dir': str(directory)}
+        if filename:
+            options['out'] = filename
+        if sha256:
+            options['checksum'] = f'sha-256={sha256}'
+        headers = [f'{key}: {value}' for key, value in http.auth_headers(url).items()]
+        if headers:
+            options['header'] = headers
+        return options
+
+    def add_uris(self, jobs: List[Dict]) -> list:
+        """
+        Submit jobs in a single multicall
+
+        Args:
+            jobs: Dicts with url, destination and optional filename / sha256
+
+        Returns:
+            GID (or Aria2Error) per job, in order
+        """
+        self.start()
+        return self.multicall([
+            ('addUri', [[job['url']], self.job_options(job['url'], job['destination'],
+                                                       job.get('filename'), job.get('sha256'))])
+            for job in jobs
+        ])
+
+    def tell_statuses(self, gids: List[str], keys: List[str] = None) -> list:
+        return self.multicall([('tellStatus', [gid, keys or STATUS_KEYS]) for gid in gids])
+
+    def wait(self, gids: List[str], on_status=None, interval: float = 0.5) -> Dict[str, Dict]:
+        """
+        Poll until every gid reaches a final state
+
+        Args:
+            on_status: Called with each status dict on every poll (and on completion)
+
+        Returns:
+            Final status dict per gid
+        """
+        pending = list(gids)
+        final = {}
+        while pending:
+            for gid, status in zip(list(pending), self.tell_statuses(pending)):
+                if isinstance(status, Aria2Error):
+                    status = {'gid': gid, 'status': 'error', 'errorMessage': str(status)}
+                if on_status:
+                    on_status(status)
+                if status.get('status') in FINAL_STATES:
+                    final[gid] = status
+                    pending.remove(gid)
+            if pending:
+                time.sleep(interval)
+        return final
+
+
+_daemon: Optional[Aria2Daemon] = None
+_daemon_lock = threading.Lock()
+
+def get_daemon() -> Aria2Daemon:
+    """Process-wide daemon, started on first use and stopped at interpreter exit."""
+    global _daemon
+    with _daemon_lock:
+        if _daemon is None:
+            _daemon = Aria2Daemon()
+            atexit.register(_daemon.shutdown)
+    _daemon.start()
+    return _daemon
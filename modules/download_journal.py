@@ -0,0 +1,203 @@
+# ~ download_journal.py | Crash-safe download journal | by ANXETY ~
+
+from pathlib import Path
+from typing import Callable, Optional, Dict
+import threading
+import json
+import time
+import os
+
+osENV = os.environ
+PATHS = {k: Path(v) for k, v in osENV.items() if k.endswith('_path')}
+SETTINGS_PATH = PATHS.get('settings_path', Path.cwd() / 'ANXETY' / 'settings.json')
+JOURNAL_PATH = SETTINGS_PATH.with_name('download_journal.json')
+
+# Partial-progress files left by each engine next to the output file
+PARTIAL_SUFFIXES = ('.rdl', '.aria2')
+
+STATES = ('queued', 'running', 'partial', 'complete', 'failed')
+PROGRESS_WRITE_INTERVAL = 5.0            # seconds between journal appends for progress alone
+LOG_SUFFIX = '.log'                      # download_journal.json.log: entries changed since the snapshot
+
+
+def item_key(item: Dict) -> str:
+    """Stable journal key for a DownloadManager queue item."""
+    if item.get('is_git'):
+        return f"git|{item['git_url']}|{Path(item['destination'])}"
+    return f"file|{item['url']}|{Path(item['destination'])}|{item.get('filename') or ''}"
+
+
+class DownloadJournal:
+    """
+    Per-item record of queued transfers: a JSON snapshot plus an append-only change log.
+
+    Each entry holds the url, destination, output file, expected sha256, state and the
+    partial-progress file (if any), so a re-run after a kernel restart can skip what is
+    verifiably complete and resume what was interrupted.
+
+    A state change appends one JSON line with the item's entry to the log (no fsync: a
+    kernel restart keeps the page cache); sync() fsyncs it once per batch. Loading replays
+    the log over the snapshot and compacts both into a new snapshot.
+    """
+
+    def __init__(self, path: Path = JOURNAL_PATH):
+        self.path = Path(path)
+        self.log_path = self.path.with_name(self.path.name + LOG_SUFFIX)
+        self._lock = threading.Lock()
+        self._log = None
+        self._last_progress_write = 0.0
+        self.entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            entries = json.loads(self.path.read_text()).get('items', {})
+        except (OSError, ValueError):
+            entries = {}
+        replayed = False
+        try:
+            with open(self.log_path) as f:
+                for line in f:
+                    try:
+                        change = json.loads(line)
+                    except ValueError:
+                        continue                         # torn line of an interrupted append
+                    entries[change['key']] = change['entry']
+                    replayed = True
+        except OSError:
+            pass
+        # Anything still "running" was interrupted by a crash or restart
+        for entry in entries.values():
+            if entry.get('state') == 'running':
+                entry['state'] = 'partial' if self._partial_file(entry) else 'queued'
+        if replayed:
+            self._compact(entries)
+        return entries
+
+    def _compact(self, entries: Dict[str, Dict]):
+        """Write entries as the new snapshot and start an empty log."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp, 'w') as f:
+                json.dump({'version': 1, 'items': entries}, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self.log_path.unlink(missing_ok=True)
+        except OSError:
+            pass                                         # the log is replayed again next time
+
+    def _append(self, key: str):
+        """Log key's current entry (caller holds the lock)."""
+        if self._log is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(self.log_path, 'a')
+        self._log.write(json.dumps({'key': key, 'entry': self.entries[key]}) + '\n')
+        self._log.flush()
+
+    def sync(self):
+        """fsync the changes logged so far (end of a batch)."""
+        with self._lock:
+            if self._log is not None:
+                os.fsync(self._log.fileno())
+
+    @staticmethod
+    def _partial_file(entry: Dict) -> Optional[str]:
+        output = entry.get('output')
+        if not output:
+            return None
+        for suffix in PARTIAL_SUFFIXES:
+            candidate = Path(output + suffix)
+            if candidate.exists():
+                return str(candidate)
+        return None
+
+    def get(self, item: Dict) -> Optional[Dict]:
+        return self.entries.get(item_key(item))
+
+    def transition(self, item: Dict, state: str, **fields):
+        """Move item to state (creating its entry if needed) and persist the journal."""
+        key = item_key(item)
+        with self._lock:
+            entry = self.entries.setdefault(key, {
+                'kind': 'git' if item.get('is_git') else 'file',
+                'url': item.get('git_url') or item.get('url'),
+                'destination': str(item['destination']),
+                'filename': item.get('filename'),
+                'sha256': item.get('sha256')
+            })
+            entry.update(fields, state=state, updated_at=time.time())
+            if state in ('running', 'partial', 'failed'):
+                entry['partial'] = self._partial_file(entry)
+            elif state == 'complete':
+                entry['partial'] = None
+            self._append(key)
+
+    def complete(self, item: Dict, output: Optional[Path] = None, sha256: str = None):
+        """Mark item complete, remembering the output's size and mtime for later verification."""
+        fields = {}
+        if output and Path(output).is_file():
+            st = Path(output).stat()
+            fields.update(output=str(output), size=st.st_size, mtime_ns=st.st_mtime_ns, bytes_done=st.st_size)
+        if sha256:
+            fields['sha256'] = sha256.lower()
+        self.transition(item, 'complete', **fields)
+
+    def is_complete(self, item: Dict) -> bool:
+        """True if the journal marks item complete and its output is unchanged on disk."""
+        entry = self.get(item)
+        if not entry or entry.get('state') != 'complete':
+            return False
+        if item.get('is_git'):
+            return (Path(item['destination']) / '.git').exists()
+
+        output = entry.get('output')
+        if not output:
+            return False
+        try:
+            st = os.stat(output)
+        except OSError:
+            return False
+        if (st.st_size, st.st_mtime_ns) != (entry.get('size'), entry.get('mtime_ns')):
+            return False
+        # The models data may have gained (or changed) a published hash since the last run
+        expected = item.get('sha256')
+        return not expected or expected.lower() == entry.get('sha256')
+
+    def resumable(self, item: Dict) -> Optional[str]:
+        """Partial-progress file of an interrupted transfer, if one is still on disk."""
+        entry = self.get(item)
+        return self._partial_file(entry) if entry and entry.get('state') != 'complete' else None
+
+    def attach(self, bus) -> Callable[[], None]:
+        """
+        Subscribe to a progress bus so running entries record how many bytes are on disk
+
+        Entries are matched through the item_id stored by transition(); progress alone
+        is logged at most every PROGRESS_WRITE_INTERVAL seconds.
+
+        Returns:
+            Function that detaches the journal from the bus and syncs the log
+        """
+        def on_event(event):
+            if event['state'] not in ('running', 'paused'):
+                return
+            with self._lock:
+                key = next((k for k, e in self.entries.items()
+                            if e.get('item_id') == event['item_id'] and e.get('state') == 'running'), None)
+                if not key:
+                    return
+                entry = self.entries[key]
+                entry['bytes_done'] = event['bytes_done']
+                entry['total'] = event['total']
+                now = time.time()
+                if now - self._last_progress_write >= PROGRESS_WRITE_INTERVAL:
+                    self._last_progress_write = now
+                    self._append(key)
+
+        unsubscribe = bus.subscribe(on_event)
+
+        def detach():
+            unsubscribe()
+            self.sync()
+        return detach
@@ -0,0 +1,107 @@
+# ~ extension_lock.py | Pinned extension lockfile and tarball installs | by ANXETY ~
+
+import archive_utils as archive
+from urllib.parse import urlparse
+from pathlib import Path
+from typing import Optional, Dict
+import subprocess
+import shutil
+import json
+import time
+import os
+
+osENV = os.environ
+PATHS = {k: Path(v) for k, v in osENV.items() if k.endswith('_path')}
+SETTINGS_PATH = PATHS.get('settings_path', Path.cwd() / 'ANXETY' / 'settings.json')
+
+COMMIT_MARKER = '.anxety-commit'         # written into tarball installs: '<sha> <url>'
+
+# Archive URL templates per git host ({owner}, {repo}, {sha})
+ARCHIVE_TEMPLATES = {
+    'github.com': 'https://codeload.github.com/{owner}/{repo}/tar.gz/{sha}',
+    'gitlab.com': 'https://gitlab.com/{owner}/{repo}/-/archive/{sha}/{repo}-{sha}.tar.gz'
+}
+
+
+def lock_path(ui: str) -> Path:
+    return SETTINGS_PATH.with_name(f"extensions-{ui}.lock.json")
+
+def load_lock(ui: str) -> Dict[str, Dict]:
+    """name -> {url, sha, archive, resolved_at} for ui, empty if there is no lockfile yet."""
+    try:
+        return json.loads(lock_path(ui).read_text()).get('extensions', {})
+    except (OSError, ValueError):
+        return {}
+
+def save_lock(ui: str, entries: Dict[str, Dict]):
+    path = lock_path(ui)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps({'version': 1, 'ui': ui, 'extensions': entries}, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+def lock_entry(url: str, sha: str) -> Dict:
+    return {'url': url, 'sha': sha, 'archive': archive_url(url, sha), 'resolved_at': time.time()}
+
+def archive_url(url: str, sha: str) -> Optional[str]:
+    """Tarball URL of url at commit sha, if its host serves archives."""
+    parsed = urlparse(url)
+    template = ARCHIVE_TEMPLATES.get((parsed.hostname or '').lower())
+    parts = parsed.path.strip('/').removesuffix('.git').split('/')
+    if not template or len(parts) != 2:
+        return None
+    return template.format(owner=parts[0], repo=parts[1], sha=sha)
+
+
+# ============================ Checkouts ============================
+
+def installed_commit(path: Path) -> Optional[str]:
+    """Commit an extension folder holds: from its marker (tarball install) or git HEAD."""
+    path = Path(path)
+    marker = path / COMMIT_MARKER
+    if marker.is_file():
+        return marker.read_text().split()[0]
+    if (path / '.git').exists():
+        result = subprocess.run(['git', '-C', str(path), 'rev-parse', 'HEAD'], capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else None
+    return None
+
+def install_tarball(entry: Dict, destination: Path) -> Dict[str, int]:
+    """
+    Stream-extract entry's archive and swap it in at destination
+
+    The archive's single top-level folder becomes destination; the previous contents are
+    only removed once the new tree is fully extracted.
+    """
+    destination = Path(destination)
+    staging = destination.with_name(f".{destination.name}.staging")
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        result = archive.stream_extract(entry['archive'], staging)
+        roots = list(staging.iterdir())
+        root = roots[0] if len(roots) == 1 and roots[0].is_dir() else staging
+        (root / COMMIT_MARKER).write_text(f"{entry['sha']} {entry['url']}\n")
+        shutil.rmtree(destination, ignore_errors=True)
+        root.rename(destination)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return result
+
+def materialize_git(path: Path) -> bool:
+    """
+    Give a tarball install real git metadata (e.g. before updating it with git)
+
+    Fetches only the pinned commit and points the index at it, leaving the files untouched.
+    """
+    path = Path(path)
+    marker = path / COMMIT_MARKER
+    if (path / '.git').exists() or not marker.is_file():
+        return (path / '.git').exists()
+    sha, url = marker.read_text().split()[:2]
+    for args in (['init', '--quiet'], ['remote', 'add', 'origin', url],
+                 ['fetch', '--quiet', '--depth', '1', 'origin', sha], ['reset', '--quiet', '--mixed', sha]):
+        if subprocess.run(['git', '-C', str(path), *args], capture_output=True).returncode != 0:
+            shutil.rmtree(path / '.git', ignore_errors=True)
+            return False
+    marker.unlink()
+    return True
@@ -0,0 +1,132 @@
+# ~ git_cache.py | Local bare-mirror cache for git clones | by ANXETY ~
+
+from urllib.parse import urlparse
+from pathlib import Path
+from typing import Optional
+import subprocess
+import shutil
+import fcntl
+import time
+import re
+import os
+
+osENV = os.environ
+PATHS = {k: Path(v) for k, v in osENV.items() if k.endswith('_path')}
+CACHE_PATH = PATHS.get('cache_path', PATHS.get('home_path', Path.home()) / '.cache' / 'ANXETY')
+MIRRORS_PATH = PATHS.get('git_cache_path', CACHE_PATH / 'git')
+
+STALE_AFTER = 6 * 3600                   # seconds before a mirror is fetched again
+FETCHED_MARKER = 'anxety-fetched'        # touched inside the mirror after every successful fetch
+GIT_TIMEOUT = 600
+
+
+def mirror_path(url: str) -> Path:
+    """Mirror location for a remote: <MIRRORS_PATH>/<host>/<owner>/<repo>.git (credentials ignored)."""
+    parsed = urlparse(url)
+    parts = [parsed.hostname or 'local', *parsed.path.strip('/').removesuffix('.git').split('/')]
+    parts = [re.sub(r'[^A-Za-z0-9._-]', '_', part) for part in parts if part not in ('', '.', '..')]
+    return MIRRORS_PATH.joinpath(*parts[:-1], f"{parts[-1]}.git")
+
+def _git(*args: str, cwd: Path = None) -> subprocess.CompletedProcess:
+    env = {**osENV, 'GIT_TERMINAL_PROMPT': '0'}
+    return subprocess.run(['git', *args], cwd=str(cwd) if cwd else None, capture_output=True,
+                          text=True, timeout=GIT_TIMEOUT, env=env)
+
+
+class _MirrorLock:
+    """Exclusive flock per mirror, so parallel workers (or notebooks) never fetch the same repo twice."""
+
+    def __init__(self, mirror: Path):
+        self.path = mirror.with_name(mirror.name + '.lock')
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+
+
+def _age(mirror: Path) -> float:
+    try:
+        return time.time() - (mirror / FETCHED_MARKER).stat().st_mtime
+    except OSError:
+        return float('inf')
+
+def _mark_fetched(mirror: Path):
+    (mirror / FETCHED_MARKER).touch()
+
+def ensure_mirror(url: str, auth_url: str = None, max_age: float = STALE_AFTER) -> Optional[Path]:
+    """
+    Create or refresh the shallow bare mirror of url's default branch
+
+    Args:
+        url: Remote URL (the cache key; never contains credentials)
+        auth_url: Same remote with credentials embedded, used for network operations only
+        max_age: Fetch again only if the mirror is older than this many seconds
+
+    Returns:
+        Mirror path, or None if it could not be created (callers clone directly instead)
+    """
+    mirror = mirror_path(url)
+    remote = auth_url or url
+    with _MirrorLock(mirror):
+        if (mirror / 'HEAD').is_file():
+            if _age(mirror) < max_age:
+                return mirror
+            head = _git('symbolic-ref', 'HEAD', cwd=mirror).stdout.strip() or 'refs/heads/main'
+            result = _git('fetch', '--quiet', '--depth', '1', '--no-tags', remote, f'+HEAD:{head}', cwd=mirror)
+            if result.returncode == 0:
+                _mark_fetched(mirror)
+            # A failed refresh still leaves a usable (older) mirror
+            return mirror
+
+        tmp = mirror.with_name(mirror.name + '.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        result = _git('clone', '--quiet', '--bare', '--depth', '1', '--no-tags', remote, str(tmp))
+        if result.returncode != 0:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return None
+        _git('remote', 'set-url', 'origin', url, cwd=tmp)
+        _mark_fetched(tmp)
+        shutil.rmtree(mirror, ignore_errors=True)
+        tmp.rename(mirror)
+        return mirror
+
+def clone(url: str, destination: Path, auth_url: str = None, submodules: bool = True,
+          max_age: float = STALE_AFTER) -> bool:
+    """
+    Check out url into destination through its local mirror
+
+    The checkout is a local clone of the mirror with origin pointed back at url, so it
+    behaves like a normal (shallow) clone. Objects are copied, not hardlinked or shared:
+    git ignores --local for a shallow source and refuses one as a --reference. The saving
+    is the network round trip; the copy is a single depth-1 pack.
+
+    Returns:
+        True on success; False if the mirror path failed and destination was left absent
+    """
+    destination = Path(destination)
+    mirror = ensure_mirror(url, auth_url, max_age)
+    if not mirror:
+        return False
+
+    with _MirrorLock(mirror):
+        result = _git('clone', '--quiet', str(mirror), str(destination))
+    if result.returncode != 0:
+        shutil.rmtree(destination, ignore_errors=True)
+        return False
+    _git('remote', 'set-url', 'origin', url, cwd=destination)
+
+    if submodules and (destination / '.gitmodules').is_file():
+        if auth_url:
+            _git('remote', 'set-url', 'origin', auth_url, cwd=destination)
+        result = _git('submodule', 'update', '--init', '--recursive', '--depth', '1', '--jobs', '4', cwd=destination)
+        _git('remote', 'set-url', 'origin', url, cwd=destination)
+        if result.returncode != 0:
+            shutil.rmtree(destination, ignore_errors=True)
+            return False
+    return True
@@ -0,0 +1,198 @@
+# ~ hash_cache.py | Persistent file-hash cache | by ANXETY ~
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, List, Iterable
+import threading
+import hashlib
+import sqlite3
+import mmap
+import os
+
+osENV = os.environ
+PATHS = {k: Path(v) for k, v in osENV.items() if k.endswith('_path')}
+CACHE_PATH = PATHS.get('cache_path', PATHS.get('home_path', Path.home()) / '.cache' / 'ANXETY')
+DB_PATH = CACHE_PATH / 'hashes.sqlite'
+
+HASH_BUFFER_SIZE = 8 * 1024 * 1024
+MMAP_THRESHOLD = 64 * 1024 * 1024        # files at least this big are hashed through mmap
+MMAP_WINDOW = 256 * 1024 * 1024
+MODEL_PATTERNS = ('*.safetensors', '*.ckpt', '*.pt', '*.pth', '*.bin', '*.gguf')
+
+
+# ============================ Hashing ==============================
+
+def autov2(sha256: str) -> str:
+    """Civitai/A1111 AutoV2 short hash: first 10 hex chars of the SHA256, upper case."""
+    return sha256[:10].upper()
+
+def hash_file(path) -> str:
+    """SHA256 of a file using mmap for large files and big buffered reads otherwise."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, MMAP_WINDOW):
+                        digest.update(view[offset:offset + MMAP_WINDOW])
+                finally:
+                    view.release()
+        else:
+            buffer = bytearray(HASH_BUFFER_SIZE)
+            view = memoryview(buffer)
+            while (read := f.readinto(buffer)):
+                digest.update(view[:read])
+    return digest.hexdigest()
+
+def _stat_key(st: os.stat_result) -> tuple:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+# ============================== Cache ==============================
+
+class HashCache:
+    """
+    SQLite cache of file digests keyed by (device, inode, size, mtime_ns).
+
+    A file that is unchanged since it was last hashed is answered from the database
+    without being read; any rewrite changes its mtime (or inode) and forces a re-hash.
+    """
+
+    def __init__(self, db_path: Path = DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER,
+                path TEXT, sha256 TEXT NOT NULL, autov2 TEXT NOT NULL,
+                PRIMARY KEY (dev, ino, size, mtime_ns)
+            ) WITHOUT ROWID
+        ''')
+        self._db.commit()
+
+    def _select(self, key: tuple) -> Optional[Dict]:
+        row = self._db.execute(
+            'SELECT sha256, autov2 FROM hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=?', key
+        ).fetchone()
+        return {'sha256': row[0], 'autov2': row[1]} if row else None
+
+    def _store(self, rows: List[tuple]):
+        with self._lock:
+            self._db.executemany('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self._db.commit()
+
+    def lookup(self, path) -> Optional[Dict]:
+        """Cached digests for path if the file is unchanged, without hashing on a miss."""
+        try:
+            key = _stat_key(os.stat(path))
+        except OSError:
+            return None
+        with self._lock:
+            return self._select(key)
+
+    def put(self, path, sha256: str):
+        """Seed the cache with a digest computed elsewhere (e.g. hash-on-write during download)."""
+        st = os.stat(path)
+        sha256 = sha256.lower()
+        self._store([(*_stat_key(st), str(path), sha256, autov2(sha256))])
+
+    def get(self, path) -> Optional[Dict]:
+        """Digests for a single file ({'sha256', 'autov2'}), hashing it on a miss."""
+        return self.get_many([path]).get(str(path))
+
+    def get_many(self, paths: Iterable, workers: int = None) -> Dict[str, Dict]:
+        """
+        Digests for many files; misses are hashed in parallel worker processes
+
+        Args:
+            paths: Files to look up
+            workers: Process count for misses (defaults to the CPU count)
+
+        Returns:
+            Mapping of str(path) -> {'sha256', 'autov2'} for every readable file
+        """
+        results, misses = {}, []
+        with self._lock:
+            for path in paths:
+                try:
+                    key = _stat_key(os.stat(path))
+                except OSError:
+                    continue
+                cached = self._select(key)
+                if cached:
+                    results[str(path)] = cached
+                else:
+                    misses.append((str(path), key))
+
+        if not misses:
+            return results
+
+        workers = max(1, min(workers or os.cpu_count() or 1, len(misses)))
+        files = [path for path, _ in misses]
+        if workers == 1:
+            digests = list(map(hash_file, files))
+        else:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    digests = list(pool.map(hash_file, files))
+            except (OSError, RuntimeError):
+                # No process pool available (restricted sandbox); hashlib releases the GIL anyway
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    digests = list(pool.map(hash_file, files))
+
+        rows = []
+        for (path, key), sha256 in zip(misses, digests):
+            results[path] = {'sha256': sha256, 'autov2': autov2(sha256)}
+            rows.append((*key, path, sha256, autov2(sha256)))
+        self._store(rows)
+        return results
+
+    def scan(self, directory, patterns: Iterable[str] = MODEL_PATTERNS, workers: int = None) -> Dict[str, Dict]:
+        """Digests for every model-like file under directory."""
+        directory = Path(directory)
+        files = {p for pattern in patterns for p in directory.rglob(pattern) if p.is_file()}
+        return self.get_many(sorted(files), workers)
+
+    def prune(self) -> int:
+        """Drop entries whose file is gone or has changed; returns the number removed."""
+        with self._lock:
+            rows = self._db.execute('SELECT dev, ino, size, mtime_ns, path FROM hashes').fetchall()
+            stale = []
+            for *key, path in rows:
+                try:
+                    if _stat_key(os.stat(path)) != tuple(key):
+                        stale.append(key)
+                except OSError:
+                    stale.append(key)
+            self._db.executemany('DELETE FROM hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=?', stale)
+            self._db.commit()
+        return len(stale)
+
+
+_cache: Optional[HashCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> HashCache:
+    """Process-wide cache backed by CACHE_PATH/hashes.sqlite."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HashCache()
+    return _cache
+
+def get_sha256(path) -> Optional[str]:
+    """SHA256 of path, served from the cache when the file is unchanged."""
+    entry = get_cache().get(path)
+    return entry['sha256'] if entry else None
+
+def put(path, digest: str):
+    """Record a digest that is already known for path."""
+    get_cache().put(path, digest)
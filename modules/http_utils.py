@@ -0,0 +1,208 @@
+# ~ http_utils.py | Shared pooled HTTP client | by ANXETY ~
+
+import json_utils as js
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlparse, unquote
+from pathlib import Path
+from typing import Optional, Dict
+import threading
+import requests
+import asyncio
+import aiohttp
+import re
+import os
+
+osENV = os.environ
+PATHS = {k: Path(v) for k, v in osENV.items() if k.endswith('_path')}
+SETTINGS_PATH = PATHS.get('settings_path', Path.cwd() / 'ANXETY' / 'settings.json')
+
+USER_AGENT = 'LightningSdaigen/3.0 (Enhanced WebUI Manager)'
+
+# Keep-alive pool sizing: connections kept per host / number of host pools
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+ASYNC_LIMIT = 64
+ASYNC_LIMIT_PER_HOST = 16
+
+# Hosts that receive an Authorization header and the token they use
+AUTH_HOSTS = {
+    'huggingface.co': 'huggingface',
+    'civitai.com': 'civitai'
+}
+
+
+# ========================= Tokens & Headers ========================
+
+def get_tokens() -> Dict[str, str]:
+    """Get API tokens from multiple sources with priority (settings file, then environment)."""
+    tokens = {
+        'civitai': None,
+        'huggingface': None
+    }
+
+    try:
+        tokens['civitai'] = js.read(SETTINGS_PATH, 'WIDGETS.civitai_token') or js.read(SETTINGS_PATH, 'ENVIRONMENT.civitai_api_token')
+        tokens['huggingface'] = js.read(SETTINGS_PATH, 'WIDGETS.huggingface_token')
+    except Exception:
+        pass
+
+    tokens['civitai'] = tokens['civitai'] or os.getenv('CIVITAI_API_TOKEN', '')
+    tokens['huggingface'] = tokens['huggingface'] or os.getenv('HUGGINGFACE_TOKEN', '')
+    return tokens
+
+TOKENS = get_tokens()
+
+def _match_auth_host(url: str) -> Optional[str]:
+    host = (urlparse(url).hostname or '').lower()
+    for key in AUTH_HOSTS:
+        if host == key or host.endswith(f".{key}"):
+            return key
+    return None
+
+def auth_headers(url: str) -> Dict[str, str]:
+    """Authorization header for url if it targets a host we hold a token for."""
+    host = _match_auth_host(url)
+    token = TOKENS.get(AUTH_HOSTS[host]) if host else None
+    return {'Authorization': f'Bearer {token}'} if token else {}
+
+class _AuthSession(requests.Session):
+    """Session that injects per-host auth (requests strips it again on cross-host redirects)."""
+
+    def request(self, method, url, *args, auth_inject: bool = True, **kwargs):
+        if auth_inject:
+            headers = auth_headers(url)
+            headers.update(kwargs.get('headers') or {})
+            kwargs['headers'] = headers
+        kwargs.setdefault('timeout', 30)
+        return super().request(method, url, *args, **kwargs)
+
+
+# ========================== Sync Sessions ==========================
+
+_adapter = None
+_session = None
+_lock = threading.Lock()
+
+def _get_adapter() -> HTTPAdapter:
+    """Process-wide adapter; its urllib3 PoolManager holds the keep-alive pools."""
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=frozenset({'HEAD', 'GET', 'OPTIONS'}))
+            _adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+        return _adapter
+
+def new_session(headers: Dict[str, str] = None, auth_inject: bool = False) -> requests.Session:
+    """
+    Create a session with its own headers that shares the process-wide connection pools
+
+    Args:
+        headers: Default headers for this session only
+        auth_inject: Inject HF/Civitai tokens per request based on the target host
+    """
+    session = _AuthSession() if auth_inject else requests.Session()
+    adapter = _get_adapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    if headers:
+        session.headers.update(headers)
+    return session
+
+def get_session() -> requests.Session:
+    """Process-wide session with keep-alive pooling and automatic token injection."""
+    global _session
+    if _session is None:
+        session = new_session(auth_inject=True)
+        with _lock:
+            if _session is None:
+                _session = session
+    return _session
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return get_session().request(method, url, **kwargs)
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_session().request('GET', url, **kwargs)
+
+def head(url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault('allow_redirects', True)
+    return get_session().request('HEAD', url, **kwargs)
+
+
+# ========================= Metadata Probing ========================
+
+_probe_cache: Dict[str, Dict] = {}
+
+def _filename_from_disposition(value: str) -> Optional[str]:
+    match = re.search(r"filename\*=(?:UTF-8'')?([^;]+)", value, re.IGNORECASE)
+    if match:
+        return unquote(match.group(1).strip('"'))
+    match = re.search(r'filename="?([^";]+)"?', value, re.IGNORECASE)
+    return match.group(1) if match else None
+
+def probe(url: str, refresh: bool = False) -> Optional[Dict]:
+    """
+    Fetch (and memoize) download metadata over a pooled connection
+
+    Returns:
+        Dict with size, filename, accept_ranges, etag, sha256 (HF LFS) and final_url, or None
+    """
+    if not refresh and url in _probe_cache:
+        return _probe_cache[url]
+
+    try:
+        response = head(url, timeout=15)
+        if response.status_code >= 400:
+            return None
+    except requests.RequestException:
+        return None
+
+    headers = response.headers
+    size = headers.get('content-length')
+    disposition = headers.get('content-disposition', '')
+
+    # Hugging Face exposes the LFS sha256 on the redirect response
+    sha256 = None
+    for hop in [*response.history, response]:
+        linked = hop.headers.get('x-linked-etag', '').strip('"')
+        if re.fullmatch(r'[0-9a-f]{64}', linked):
+            sha256 = linked
+            break
+
+    info = {
+        'size': int(size) if size and size.isdigit() else None,
+        'filename': _filename_from_disposition(disposition) if disposition else None,
+        'accept_ranges': headers.get('accept-ranges', '').lower() == 'bytes',
+        'etag': headers.get('etag'),
+        'sha256': sha256,
+        'final_url': response.url
+    }
+    _probe_cache[url] = info
+    return info
+
+
+# ========================== Async Sessions =========================
+
+# aiohttp sessions are bound to the loop that created them, so keep one per loop
+_async_sessions: Dict[int, aiohttp.ClientSession] = {}
+
+def get_async_session() -> aiohttp.ClientSession:
+    """Pooled aiohttp session for the running event loop (call from inside a coroutine)."""
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(id(loop))
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=ASYNC_LIMIT, limit_per_host=ASYNC_LIMIT_PER_HOST,
+                                         keepalive_timeout=60, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT},
+                                        timeout=aiohttp.ClientTimeout(total=None, connect=10, sock_read=60))
+        _async_sessions[id(loop)] = session
+    return session
+
+async def close_async_session():
+    """Close the running loop's session; call before the loop ends (e.g. at the end of main())."""
+    session = _async_sessions.pop(id(asyncio.get_running_loop()), None)
+    if session and not session.closed:
+        await session.close()
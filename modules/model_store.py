@@ -0,0 +1,297 @@
+# ~ model_store.py | Content-addressed model store | by ANXETY ~
+
+from webui_utils import WEBUI_PATHS
+import hash_cache
+from pathlib import Path
+from typing import Optional, Dict, List
+import threading
+import shutil
+import fcntl
+import json
+import time
+import os
+
+osENV = os.environ
+PATHS = {k: Path(v) for k, v in osENV.items() if k.endswith('_path')}
+HOME = PATHS.get('home_path', Path.cwd())
+STORE_PATH = HOME / '.model_store'
+
+# Download categories that map onto a position in WEBUI_PATHS
+CATEGORY_SLOTS = {'model': 0, 'vae': 1, 'lora': 2, 'embed': 3, 'upscale': 5}
+
+FICLONE = 0x40049409                     # ioctl: share extents (btrfs, xfs, overlayfs on those)
+LINK_METHODS = ('hardlink', 'reflink', 'symlink')
+
+
+def _reflink(source: Path, target: Path):
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+def link_file(source: Path, target: Path) -> str:
+    """Create target as a view of source; returns the method used (hardlink, reflink or symlink)."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.link")
+    tmp.unlink(missing_ok=True)
+    for method in LINK_METHODS:
+        try:
+            if method == 'hardlink':
+                os.link(source, tmp)
+            elif method == 'reflink':
+                _reflink(source, tmp)
+            else:
+                os.symlink(source, tmp)
+            os.replace(tmp, target)
+            # rename() is a no-op when target is already a hardlink of the same inode
+            if os.path.lexists(tmp):
+                tmp.unlink()
+            return method
+        except OSError:
+            tmp.unlink(missing_ok=True)
+    raise OSError(f"Could not link {target} to {source}")
+
+
+def _stamp(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+class ModelStore:
+    """
+    Blobs stored once by SHA256 under STORE_PATH/blobs, exposed to WebUIs through views.
+
+    Every view (hardlink, reflink or symlink) is recorded in index.json; a blob's refcount is
+    the number of views that still exist and point at it, so deleting model files from any
+    WebUI folder eventually lets gc() reclaim the blob.
+
+    Blobs are read-only, and so are hardlink views (they share the inode): anything that
+    rewrites a model in place must detach() it first to get a private copy.
+    """
+
+    def __init__(self, root: Path = STORE_PATH):
+        self.root = Path(root)
+        self.blobs = self.root / 'blobs'
+        self.index_path = self.root / 'index.json'
+        self._lock = threading.RLock()
+        self.index: Dict[str, Dict] = self._load()
+
+    # ---- index ----
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            index = json.loads(self.index_path.read_text()).get('blobs', {})
+        except (OSError, ValueError):
+            return {}
+        for blob in index.values():
+            # Version 1 stored the bare method per view
+            blob['views'] = {view: record if isinstance(record, dict) else {'method': record}
+                             for view, record in blob.get('views', {}).items()}
+        return index
+
+    def _save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_name(self.index_path.name + '.tmp')
+        tmp.write_text(json.dumps({'version': 2, 'blobs': self.index}, indent=2))
+        os.replace(tmp, self.index_path)
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.blobs / sha256[:2] / sha256
+
+    def has(self, sha256: Optional[str]) -> bool:
+        return bool(sha256) and sha256 in self.index and self.blob_path(sha256).is_file()
+
+    def find_by_url(self, url: str) -> Optional[str]:
+        """SHA256 of a stored blob previously downloaded from url."""
+        with self._lock:
+            return next((sha for sha, blob in self.index.items()
+                         if url in blob.get('urls', []) and self.blob_path(sha).is_file()), None)
+
+    # ---- views ----
+
+    def _view_alive(self, sha256: str, view: str, record: Dict) -> bool:
+        """
+        Whether view still shows the blob's content
+
+        Hardlinks must share the blob's device and inode. Reflinks and copies are independent
+        files, so they must still carry the (device, inode, size, mtime) stamp taken when they
+        were created; one that was rewritten or replaced is the user's own file now.
+        """
+        blob, path = self.blob_path(sha256), Path(view)
+        method = record['method']
+        try:
+            if method == 'symlink':
+                return path.is_symlink() and path.resolve() == blob.resolve()
+            if method == 'hardlink':
+                st, blob_st = path.stat(), blob.stat()
+                return (st.st_dev, st.st_ino) == (blob_st.st_dev, blob_st.st_ino)
+            if 'stat' in record:
+                return _stamp(path) == record['stat']
+            return hash_cache.get_sha256(path) == sha256             # unstamped (version 1) entry
+        except OSError:
+            return False
+
+    def refcount(self, sha256: str) -> int:
+        """Number of live views of a blob."""
+        with self._lock:
+            views = self.index.get(sha256, {}).get('views', {})
+            return sum(self._view_alive(sha256, view, record) for view, record in views.items())
+
+    def link(self, sha256: str, target: Path) -> str:
+        """Expose a stored blob at target; returns the link method used."""
+        target = Path(target)
+        blob = self.blob_path(sha256)
+        with self._lock:
+            try:
+                os.chmod(blob, 0o444)
+            except OSError:
+                pass
+            method = link_file(blob, target)
+            record = {'method': method}
+            if method == 'reflink':
+                record['stat'] = _stamp(target)
+            self.index[sha256].setdefault('views', {})[str(target)] = record
+            self._save()
+        return method
+
+    def detach(self, view: Path) -> bool:
+        """
+        Replace a view with a private, writable copy of its blob (copy-on-write)
+
+        For tools that rewrite model files in place (mergers, metadata editors): writing
+        through a hardlink view would change the shared blob under its digest. The copy is a
+        reflink where the filesystem supports it, so it costs no space until it is written.
+
+        Returns:
+            False if view is not a view of any stored blob
+        """
+        view = Path(view)
+        with self._lock:
+            sha256 = next((sha for sha, blob in self.index.items() if str(view) in blob.get('views', {})), None)
+            if sha256 is None:
+                return False
+            blob = self.blob_path(sha256)
+            tmp = view.with_name(f".{view.name}.detach")
+            tmp.unlink(missing_ok=True)
+            try:
+                _reflink(blob, tmp)
+            except OSError:
+                shutil.copyfile(blob, tmp)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, view)
+            del self.index[sha256]['views'][str(view)]
+            self._save()
+        return True
+
+    def ingest(self, path: Path, sha256: str = None, url: str = None, category: str = None) -> str:
+        """
+        Move a downloaded file into the store and leave a view in its place
+
+        Args:
+            path: Freshly downloaded file
+            sha256: Digest if already known (otherwise taken from the hash cache)
+            url: Source URL, so other WebUIs can be served without re-downloading
+            category: Download category (model, vae, lora, ...) used by populate()
+
+        Returns:
+            The blob's SHA256
+        """
+        path = Path(path)
+        sha256 = (sha256 or hash_cache.get_sha256(path)).lower()
+        blob = self.blob_path(sha256)
+        with self._lock:
+            if blob.is_file():
+                path.unlink()                            # duplicate content: keep the stored copy
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(path), str(blob))        # rename on the same filesystem
+                hash_cache.put(blob, sha256)             # lets verify() skip unchanged blobs
+            entry = self.index.setdefault(sha256, {'size': blob.stat().st_size, 'name': path.name,
+                                                   'urls': [], 'views': {}, 'added_at': time.time()})
+            if url and url not in entry['urls']:
+                entry['urls'].append(url)
+            if category:
+                entry['category'] = category
+            self.link(sha256, path)
+        return sha256
+
+    # ---- WebUI layouts ----
+
+    def populate(self, ui: str, webui_base: Path = None) -> Dict[str, List[str]]:
+        """
+        Link every blob still in use into ui's folders from WEBUI_PATHS
+
+        Returns:
+            Mapping of category -> view paths created
+        """
+        slots = WEBUI_PATHS.get(ui)
+        if not slots:
+            return {}
+        webui_base = Path(webui_base or HOME / ui)
+        created: Dict[str, List[str]] = {}
+        with self._lock:
+            for sha256, blob in list(self.index.items()):
+                slot = CATEGORY_SLOTS.get(blob.get('category'))
+                if slot is None or not slots[slot] or not self.refcount(sha256):
+                    continue
+                target = webui_base / slots[slot] / blob['name']
+                record = blob.get('views', {}).get(str(target))
+                if record and self._view_alive(sha256, str(target), record):
+                    continue
+                if target.exists() or target.is_symlink():
+                    continue                             # never overwrite a user's own file
+                self.link(sha256, target)
+                created.setdefault(blob['category'], []).append(str(target))
+        return created
+
+    # ---- cleanup ----
+
+    def verify(self) -> List[str]:
+        """
+        Digests whose blob is missing or no longer matches its SHA256
+
+        Blobs are hashed through the hash cache, so only files whose stat changed since
+        they were stored (e.g. written through a hardlink view as root, which ignores the
+        read-only mode) are actually re-read.
+        """
+        with self._lock:
+            return [sha256 for sha256 in list(self.index)
+                    if not self.blob_path(sha256).is_file() or hash_cache.get_sha256(self.blob_path(sha256)) != sha256]
+
+    def gc(self, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Drop dead views and delete blobs no WebUI references any more
+
+        Blobs failing verify() leave the index as well: their views keep the modified file
+        (it is the user's now), but it is never linked anywhere else under the old digest.
+        """
+        removed, freed = 0, 0
+        with self._lock:
+            for sha256 in self.verify():
+                removed += 1
+                if not dry_run:
+                    del self.index[sha256]
+            for sha256, blob in list(self.index.items()):
+                blob['views'] = {view: record for view, record in blob.get('views', {}).items()
+                                 if self._view_alive(sha256, view, record)}
+                if blob['views']:
+                    continue
+                path = self.blob_path(sha256)
+                removed += 1
+                freed += blob.get('size', 0)
+                if not dry_run:
+                    path.unlink(missing_ok=True)
+                    del self.index[sha256]
+            if not dry_run:
+                self._save()
+        return {'blobs': removed, 'bytes': freed}
+
+
+_store: Optional[ModelStore] = None
+_store_lock = threading.Lock()
+
+def get_store() -> ModelStore:
+    """Process-wide store under HOME/.model_store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ModelStore()
+    return _store
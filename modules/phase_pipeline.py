@@ -0,0 +1,114 @@
+# ~ phase_pipeline.py | Dependency-aware concurrent setup phases | by ANXETY ~
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Iterable
+import threading
+import time
+
+
+class PhasePipeline:
+    """
+    Run named setup phases concurrently, each as soon as its dependencies have succeeded.
+
+    A phase fails if it raises or returns False; every phase depending on it is skipped.
+    The resource label (cpu, network, disk) is only informational and shows up in summary().
+    """
+
+    def __init__(self, max_workers: int = None, verbose: bool = True):
+        self.max_workers = max_workers
+        self.verbose = verbose
+        self.phases: Dict[str, Dict] = {}
+        self.started_at = None
+        self.finished_at = None
+        self._print_lock = threading.Lock()
+
+    def add(self, name: str, func: Callable, after: Iterable[str] = (), resource: str = 'cpu'):
+        self.phases[name] = {
+            'func': func,
+            'after': list(after),
+            'resource': resource,
+            'status': 'pending',
+            'result': None,
+            'error': None,
+            'started': None,
+            'finished': None
+        }
+
+    def _log(self, message: str):
+        if self.verbose:
+            with self._print_lock:
+                print(message, flush=True)
+
+    def _run_phase(self, name: str):
+        phase = self.phases[name]
+        phase['started'] = time.time()
+        self._log(f"▶️ {name} started")
+        try:
+            phase['result'] = phase['func']()
+            phase['status'] = 'failed' if phase['result'] is False else 'done'
+        except Exception as e:
+            phase['status'], phase['error'] = 'failed', str(e)
+        phase['finished'] = time.time()
+        duration = phase['finished'] - phase['started']
+        if phase['status'] == 'done':
+            self._log(f"✅ {name} finished in {duration:.1f}s")
+        else:
+            self._log(f"❌ {name} failed after {duration:.1f}s{': ' + phase['error'] if phase['error'] else ''}")
+
+    def run(self) -> Dict[str, Dict]:
+        """Execute every phase; returns name -> {status, result, error, started, finished, ...}."""
+        for name, phase in self.phases.items():
+            unknown = [dep for dep in phase['after'] if dep not in self.phases]
+            if unknown:
+                raise ValueError(f"Phase '{name}' depends on unknown phases: {', '.join(unknown)}")
+
+        self.started_at = time.time()
+        pending = [name for name in self.phases]
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers or len(self.phases) or 1,
+                                thread_name_prefix='Phase') as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = [self.phases[dep]['status'] for dep in self.phases[name]['after']]
+                    if any(status in ('failed', 'skipped') for status in deps):
+                        self.phases[name]['status'] = 'skipped'
+                        self._log(f"⏭️ {name} skipped (a dependency failed)")
+                        pending.remove(name)
+                    elif all(status == 'done' for status in deps):
+                        self.phases[name]['status'] = 'running'
+                        running[pool.submit(self._run_phase, name)] = name
+                        pending.remove(name)
+                if not running:
+                    # Whatever is left waits on itself (a dependency cycle)
+                    for name in pending:
+                        self.phases[name]['status'] = 'skipped'
+                        self._log(f"⏭️ {name} skipped (dependency cycle)")
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    future.result()
+        self.finished_at = time.time()
+        return self.phases
+
+    def summary(self, width: int = 24) -> List[str]:
+        """Combined timing table with a per-phase timeline bar."""
+        if self.started_at is None:
+            return []
+        wall = max((self.finished_at or time.time()) - self.started_at, 1e-6)
+        work = sum(p['finished'] - p['started'] for p in self.phases.values() if p['finished'])
+        lines = [f"⏱️ Setup pipeline: {wall:.1f}s wall, {work:.1f}s of work ({work / wall:.1f}x overlap)"]
+        icons = {'done': '✅', 'failed': '❌', 'skipped': '⏭️', 'pending': '…', 'running': '…'}
+        name_width = max(map(len, self.phases)) if self.phases else 0
+        for name, phase in self.phases.items():
+            if phase['started'] is None:
+                lines.append(f"  {name:<{name_width}} [{phase['resource']:<7}] {' ' * width}  {icons[phase['status']]}")
+                continue
+            start = phase['started'] - self.started_at
+            end = (phase['finished'] or time.time()) - self.started_at
+            first = int(start / wall * width)
+            last = max(first + 1, round(end / wall * width))
+            bar = '░' * first + '█' * (last - first) + '░' * (width - last)
+            lines.append(f"  {name:<{name_width}} [{phase['resource']:<7}] {bar[:width]}  "
+                         f"{start:6.1f}s → {end:6.1f}s ({end - start:.1f}s) {icons[phase['status']]}")
+        return lines
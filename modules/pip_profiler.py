@@ -0,0 +1,243 @@
+# ~ pip_profiler.py | Per-package timings of every pip run | by ANXETY ~
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+import subprocess
+import threading
+import tempfile
+import json
+import time
+import re
+import os
+
+osENV = os.environ
+PATHS = {k: Path(v) for k, v in osENV.items() if k.endswith('_path')}
+CACHE_PATH = PATHS.get('cache_path', PATHS.get('home_path', Path.home()) / '.cache' / 'ANXETY')
+LOG_PATH = PATHS.get('pip_profile_path', CACHE_PATH / 'pip-profile.jsonl')
+# Inherited by child processes (e.g. ComfyUI's install-deps.py), so their pip runs join this session
+SESSION = osENV.setdefault('ANXETY_PIP_SESSION', time.strftime('%Y%m%d-%H%M%S'))
+
+PHASES = ('resolve', 'download', 'build', 'install')
+NAME = re.compile(r'[A-Za-z0-9][A-Za-z0-9._-]*')
+
+# pip output line -> (phase, package group or None = the package currently being processed)
+MARKERS = [
+    (re.compile(r'^\s*Collecting (\S+)'), 'resolve'),
+    (re.compile(r'^\s*Requirement already satisfied: (\S+)'), 'resolve'),
+    (re.compile(r'^\s*(?:Obtaining|Processing|Downloading|Using cached|File was already downloaded) '), 'download'),
+    (re.compile(r'^\s*(?:Installing build dependencies|Getting requirements to build|Preparing metadata)'), 'build'),
+    (re.compile(r'^\s*Building wheel for (\S+)'), 'build'),
+    (re.compile(r'^\s*Running setup\.py (?:install|develop) for (\S+)'), 'build'),
+]
+IDLE = re.compile(r'^\s*(?:Created wheel for|Stored in directory|Building wheels for collected|Successfully built)')
+INSTALL = re.compile(r'^\s*Installing collected packages: (.+)$')
+DONE = re.compile(r'^\s*Successfully installed ')
+
+
+def canonical_name(name: str) -> str:
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+def _package(token: str) -> str:
+    """Project name of a 'Collecting' token ('numpy>=1.21', 'torch==2.1.0', 'git+https://...#egg=x')."""
+    egg = re.search(r'#egg=([A-Za-z0-9._-]+)', token)
+    if egg:
+        return canonical_name(egg.group(1))
+    if '://' in token:
+        return token.rstrip('/').rsplit('/', 1)[-1].removesuffix('.git').lower()
+    match = NAME.match(token)
+    return canonical_name(match.group(0)) if match else token
+
+
+# ============================= Parsing =============================
+
+def attribute(lines: List[tuple], end: float) -> tuple:
+    """
+    Split a pip run into per-package phase timings
+
+    Args:
+        lines: (timestamp, text) pairs in output order
+        end: When the process exited
+
+    Returns:
+        ({package: {phase: seconds}}, seconds not attributable to a package)
+
+    Every gap between two output lines is charged to the package and phase the earlier
+    line started. pip installs its wheels in one step, so that step is shared evenly
+    between the packages it lists.
+    """
+    timings = defaultdict(lambda: dict.fromkeys(PHASES, 0.0))
+    overhead = 0.0
+    current, phase, installing = None, None, []
+
+    def charge(seconds):
+        nonlocal overhead
+        if installing:
+            for name in installing:
+                timings[name]['install'] += seconds / len(installing)
+        elif current and phase:
+            timings[current][phase] += seconds
+        else:
+            overhead += seconds
+
+    for (stamp, text), (next_stamp, _) in zip(lines, [*lines[1:], (end, None)]):
+        install = INSTALL.match(text)
+        if install:
+            installing = [canonical_name(n.strip()) for n in install.group(1).split(',') if n.strip()]
+        elif DONE.match(text):
+            installing, current, phase = [], None, None
+        elif IDLE.match(text):
+            current, phase = None, None
+        else:
+            for pattern, marker_phase in MARKERS:
+                match = pattern.match(text)
+                if match:
+                    if match.groups():
+                        current = _package(match.group(1))
+                    phase = marker_phase
+                    break
+        charge(max(0.0, next_stamp - stamp))
+    return dict(timings), overhead
+
+def _report_packages(report: Path) -> Dict[str, Dict]:
+    """name -> version / source kind from pip's --report JSON (pip >= 22.2)."""
+    try:
+        items = json.loads(report.read_text()).get('install', [])
+    except (OSError, ValueError):
+        return {}
+    packages = {}
+    for item in items:
+        info = item.get('download_info', {})
+        url = info.get('url', '')
+        if 'vcs_info' in info:
+            source = 'vcs'
+        elif 'dir_info' in info:
+            source = 'local'
+        else:
+            source = 'wheel' if url.endswith('.whl') else 'sdist'     # sdists are what gets pre-built
+        name = canonical_name(item['metadata']['name'])
+        packages[name] = {'version': item['metadata'].get('version'), 'source': source}
+    return packages
+
+
+# ============================== Running ============================
+
+def _stream(pipe, stream: str, lines: list, lock: threading.Lock):
+    for line in iter(pipe.readline, ''):
+        with lock:
+            lines.append((time.time(), stream, line))
+    pipe.close()
+
+def _execute(cmd: List[str], cwd: Optional[Path], timeout: int) -> tuple:
+    lines, lock = [], threading.Lock()
+    process = subprocess.Popen(cmd, cwd=str(cwd) if cwd else None, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, text=True, bufsize=1)
+    readers = [threading.Thread(target=_stream, args=(pipe, name, lines, lock), daemon=True)
+               for pipe, name in ((process.stdout, 'stdout'), (process.stderr, 'stderr'))]
+    for reader in readers:
+        reader.start()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        for reader in readers:
+            reader.join()
+    return process.returncode, lines, time.time()
+
+def run(cmd: List[str], label: str = 'pip', cwd: Path = None, timeout: int = 3600) -> subprocess.CompletedProcess:
+    """
+    subprocess.run() for a pip command, recording where its time went
+
+    `install` runs get a --report file (versions, wheel vs sdist); -q is dropped and the
+    progress bar disabled so every Collecting / Downloading / Building line reaches the
+    parser. One 'package' record per package and one 'run' record go to LOG_PATH.
+    """
+    cmd = [arg for arg in cmd if arg not in ('-q', '--quiet')]
+    subcommand = next((arg for arg in cmd if arg in ('install', 'wheel', 'download')), None)
+    if subcommand is None:
+        return subprocess.run(cmd, cwd=str(cwd) if cwd else None, capture_output=True, text=True, timeout=timeout)
+
+    # A caller's own --report file is read too (and left for the caller)
+    own_report = '--report' not in cmd
+    if own_report:
+        fd, report = tempfile.mkstemp(suffix='.json', prefix='pip-report-')
+        os.close(fd)
+    else:
+        report = cmd[cmd.index('--report') + 1]
+    report = Path(report)
+    at = cmd.index(subcommand) + 1
+    add_report = ['--report', str(report)] if subcommand == 'install' and own_report else []
+    profiled = [*cmd[:at], '--progress-bar', 'off', *add_report, *cmd[at:]]
+    try:
+        start = time.time()
+        returncode, lines, end = _execute(profiled, cwd, timeout)
+        if returncode != 0 and any('no such option: --report' in text for _, _, text in lines):
+            start = time.time()                  # pip older than 22.2: profile from the output alone
+            returncode, lines, end = _execute([arg for arg in profiled if arg not in ('--report', str(report))], cwd, timeout)
+        packages = _report_packages(report)
+    finally:
+        if own_report:
+            report.unlink(missing_ok=True)
+
+    timings, overhead = attribute([(stamp, text.rstrip()) for stamp, _, text in lines], end)
+    _log(label, subcommand, returncode, end - start, overhead, timings, packages)
+    return subprocess.CompletedProcess(cmd, returncode,
+                                       ''.join(text for _, stream, text in lines if stream == 'stdout'),
+                                       ''.join(text for _, stream, text in lines if stream == 'stderr'))
+
+
+# ============================== Logging ============================
+
+def _log(label, subcommand, returncode, wall, overhead, timings, packages):
+    records = [{'kind': 'run', 'session': SESSION, 'label': label, 'command': subcommand,
+                'returncode': returncode, 'wall': round(wall, 3), 'overhead': round(overhead, 3),
+                'packages': len(timings), 'at': time.time()}]
+    for name, phases in sorted(timings.items()):
+        info = packages.get(name, {})
+        records.append({'kind': 'package', 'session': SESSION, 'label': label, 'command': subcommand,
+                        'name': name, 'version': info.get('version'), 'source': info.get('source'),
+                        **{phase: round(seconds, 3) for phase, seconds in phases.items()},
+                        'total': round(sum(phases.values()), 3)})
+    try:
+        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # One write per run in append mode: lines from concurrent installers don't interleave
+        with open(LOG_PATH, 'a') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+    except OSError:
+        pass
+
+def load(session: str = SESSION) -> List[Dict]:
+    try:
+        with open(LOG_PATH) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        return []
+    return [record for record in records if session is None or record.get('session') == session]
+
+def summary(limit: int = 10, session: str = SESSION) -> List[str]:
+    """Lines of the 'slowest packages' table for a session (all its pip runs added up)."""
+    records = load(session)
+    runs = [r for r in records if r['kind'] == 'run']
+    if not runs:
+        return []
+
+    totals = defaultdict(lambda: {**dict.fromkeys(PHASES, 0.0), 'version': None, 'source': None})
+    for record in (r for r in records if r['kind'] == 'package'):
+        entry = totals[record['name']]
+        for phase in PHASES:
+            entry[phase] += record[phase]
+        entry['version'] = record.get('version') or entry['version']
+        entry['source'] = record.get('source') or entry['source']
+
+    ranked = sorted(totals.items(), key=lambda item: -sum(item[1][p] for p in PHASES))[:limit]
+    lines = [f"\n🐢 pip: {len(runs)} runs, {sum(r['wall'] for r in runs):.1f}s - "
+             f"slowest packages (resolve / download / build / install):"]
+    for name, entry in ranked:
+        package = f"{name}=={entry['version']}" if entry['version'] else name
+        lines.append(f"  {package:<32} {sum(entry[p] for p in PHASES):>6.1f}s  "
+                     f"({' / '.join(f'{entry[p]:.1f}' for p in PHASES)})  {entry['source'] or ''}".rstrip())
+    lines.append(f"  📄 {LOG_PATH}")
+    return lines
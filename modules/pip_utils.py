@@ -0,0 +1,308 @@
+# ~ pip_utils.py | Merged single-resolution pip install plans | by ANXETY ~
+
+import pip_profiler                  # Per-package timings of every pip run
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+import subprocess
+import tempfile
+import hashlib
+import json
+import time
+import re
+import os
+
+osENV = os.environ
+PATHS = {k: Path(v) for k, v in osENV.items() if k.endswith('_path')}
+CACHE_PATH = PATHS.get('cache_path', PATHS.get('home_path', Path.home()) / '.cache' / 'ANXETY')
+# Every wheel our installers download or build is kept here (point wheelhouse_path at
+# persistent storage), so source builds happen once and warm installs can run offline
+WHEELHOUSE_PATH = PATHS.get('wheelhouse_path', CACHE_PATH / 'wheels')
+
+PLANS_FILE = '.anxety-pip-plans.json'    # inside the venv: label -> hash of the last applied plan
+COVERED_FILE = '.covered.json'           # in the wheelhouse: requirement sets it fully covered last time
+
+# Options that may appear in requirement files and carry over into the merged plan
+PASSTHROUGH_OPTIONS = ('--index-url', '-i', '--extra-index-url', '--find-links', '-f',
+                       '--pre', '--prefer-binary', '--trusted-host')
+REQUIREMENT = re.compile(r'^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*(.*)$')
+
+Source = Union[Path, str, Iterable[str]]      # requirement file, one requirement, or a list
+
+
+def canonical_name(name: str) -> str:
+    """PEP 503 normalised project name, so e.g. Pillow / pillow and opencv_python / opencv-python merge."""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+def project_requirements(scripts_dir: Path, ui: str) -> List[Path]:
+    """Project-level requirement files shipped for a WebUI (e.g. requirements_forge.txt)."""
+    names = {ui.lower(), ui.lower().replace('-', '_'), ui.lower().replace('_', '-')}
+    return [path for name in sorted(names) if (path := Path(scripts_dir) / f"requirements_{name}.txt").is_file()]
+
+
+# ============================= Parsing =============================
+
+def _read_lines(path: Path, seen: set) -> List[str]:
+    """Logical lines of a requirement file, with -r includes inlined and comments stripped."""
+    path = Path(path).resolve()
+    if path in seen or not path.is_file():
+        return []
+    seen.add(path)
+    lines = []
+    for raw in path.read_text(encoding='utf-8', errors='replace').replace('\\\n', '').splitlines():
+        line = re.sub(r'(^|\s)#.*$', '', raw).strip()
+        if line.startswith(('-r ', '--requirement ')):
+            lines.extend(_read_lines(path.parent / line.split(None, 1)[1], seen))
+        elif line:
+            lines.append(line)
+    return lines
+
+def _source_lines(source: Source) -> List[str]:
+    """A Path is a requirement file, a str one requirement, anything else a list of them."""
+    if isinstance(source, Path):
+        return _read_lines(source, set())
+    if isinstance(source, str):
+        return [source.strip()]
+    return [line.strip() for line in source if line and line.strip()]
+
+
+class InstallPlan:
+    """One deduplicated requirement set: specifiers for the same project are intersected."""
+
+    def __init__(self, label: str = 'default'):
+        self.label = label
+        self.options: List[str] = []
+        self.requirements: Dict[tuple, Dict] = {}
+        self.direct: Dict[str, str] = {}     # URL / VCS / editable requirements, kept verbatim
+        self.sources: List[str] = []
+
+    def add_line(self, line: str, origin: str):
+        if line.startswith(('-e ', '--editable ')):
+            self.direct.setdefault(line, origin)
+            return
+        if line.startswith('-'):
+            option = line.split(None, 1)[0].split('=', 1)[0]
+            if option in PASSTHROUGH_OPTIONS and line not in self.options:
+                # Only the first --index-url can win; later ones would be silently ignored by pip
+                if option in ('--index-url', '-i') and any(o.startswith(('--index-url', '-i ')) for o in self.options):
+                    return
+                self.options.append(line)
+            return
+        if '://' in line or line.startswith(('.', '/')) or ' @ ' in line:
+            self.direct.setdefault(line, origin)
+            return
+
+        requirement, _, marker = line.partition(';')
+        match = REQUIREMENT.match(requirement.strip())
+        if not match:
+            self.direct.setdefault(line, origin)
+            return
+        name, extras, specifier = match.groups()
+        entry = self.requirements.setdefault((canonical_name(name), marker.strip()), {
+            'name': name, 'extras': set(), 'specifiers': [], 'origins': []
+        })
+        if extras:
+            entry['extras'].update(e.strip() for e in extras[1:-1].split(',') if e.strip())
+        for spec in filter(None, (s.strip().replace(' ', '') for s in specifier.split(','))):
+            if spec not in entry['specifiers']:
+                entry['specifiers'].append(spec)
+        entry['origins'].append(origin)
+
+    def add(self, source: Source, origin: str = None):
+        origin = origin or (Path(source).name if isinstance(source, Path) else 'inline')
+        lines = _source_lines(source)
+        if lines:
+            self.sources.append(origin)
+        for line in lines:
+            self.add_line(line, origin)
+        return self
+
+    def lines(self) -> List[str]:
+        lines = list(self.options)
+        for (_, marker), entry in sorted(self.requirements.items()):
+            extras = f"[{','.join(sorted(entry['extras']))}]" if entry['extras'] else ''
+            lines.append(f"{entry['name']}{extras}{','.join(entry['specifiers'])}" + (f"; {marker}" if marker else ''))
+        lines.extend(sorted(self.direct))
+        return lines
+
+    def text(self) -> str:
+        return '\n'.join(self.lines()) + '\n'
+
+    def digest(self) -> str:
+        return hashlib.sha256(self.text().encode()).hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return len(self.requirements) + len(self.direct)
+
+
+def plan(sources: Iterable[Source], label: str = 'default') -> InstallPlan:
+    """Merge requirement files / specifier lists into one InstallPlan (missing files are skipped)."""
+    result = InstallPlan(label)
+    for source in sources:
+        result.add(source)
+    return result
+
+
+# ============================= Installing ==========================
+
+def venv_python(venv: Path) -> Optional[Path]:
+    for candidate in (Path(venv) / 'bin' / 'python', Path(venv) / 'Scripts' / 'python.exe'):
+        if candidate.exists():
+            return candidate
+    return None
+
+def _load_applied(venv: Path) -> Dict[str, Dict]:
+    try:
+        return json.loads((Path(venv) / PLANS_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+def is_applied(venv: Path, install_plan: InstallPlan) -> bool:
+    """True if exactly this plan was already installed into venv (so pip can be skipped)."""
+    return _load_applied(venv).get(install_plan.label, {}).get('digest') == install_plan.digest()
+
+def mark_applied(venv: Path, install_plan: InstallPlan):
+    applied = _load_applied(venv)
+    applied[install_plan.label] = {'digest': install_plan.digest(), 'packages': len(install_plan),
+                                   'applied_at': time.time()}
+    path = Path(venv) / PLANS_FILE
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(applied, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+def pip_command(venv: Path) -> List[str]:
+    """pip of the venv's interpreter; the pip on PATH only if venv has none."""
+    python = venv_python(venv)
+    return [str(python), '-m', 'pip'] if python else ['pip']
+
+def wheelhouse_args() -> List[str]:
+    WHEELHOUSE_PATH.mkdir(parents=True, exist_ok=True)
+    return ['--find-links', str(WHEELHOUSE_PATH)]
+
+def _wheelhouse_contents() -> set:
+    """(project, version) of every wheel in the wheelhouse."""
+    contents = set()
+    for wheel in WHEELHOUSE_PATH.glob('*.whl'):
+        parts = wheel.name.split('-')
+        if len(parts) >= 5:
+            contents.add((canonical_name(parts[0]), parts[1]))
+    return contents
+
+def _coverage_key(pip: List[str], requirements: Path, extra_args: Iterable[str]) -> str:
+    text = f"{' '.join(pip)}\0{Path(requirements).read_text()}\0{' '.join(extra_args)}"
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+def _load_covered() -> Dict[str, float]:
+    try:
+        return json.loads((WHEELHOUSE_PATH / COVERED_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+def _set_covered(key: str, covered: bool):
+    data = _load_covered()
+    if covered:
+        data[key] = time.time()
+    elif data.pop(key, None) is None:
+        return
+    path = WHEELHOUSE_PATH / COVERED_FILE
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        tmp.write_text(json.dumps(data, indent=2, sort_keys=True))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+def cache_wheels(pip: List[str], requirements: Path, report: Path, cwd: Path = None, timeout: int = 3600) -> Optional[bool]:
+    """
+    Keep the wheels an install just used in the wheelhouse
+
+    Only the index packages from its --report that the wheelhouse lacks are fetched, pinned
+    and with --no-deps, so there is no second resolve. pip serves them from its own HTTP and
+    built-wheel caches, so nothing is downloaded or built twice.
+
+    Returns:
+        True if the wheelhouse now covers the whole install, False if it could not be
+        filled, None if the install had direct (URL / VCS / local) requirements it never will
+    """
+    try:
+        items = json.loads(Path(report).read_text()).get('install', [])
+    except (OSError, ValueError):
+        return False
+    contents = _wheelhouse_contents()
+    pins = [f"{item['metadata']['name']}=={item['metadata']['version']}" for item in items if not item.get('is_direct')
+            and (canonical_name(item['metadata']['name']), item['metadata']['version']) not in contents]
+    if pins:
+        # The plan's index options decide where e.g. torch+cu121 comes from; keep them for the pins
+        options = [line for line in _read_lines(requirements, set()) if line.split(None, 1)[0].split('=', 1)[0]
+                   in PASSTHROUGH_OPTIONS and line.split(None, 1)[0] not in ('--pre', '--prefer-binary')]
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', prefix='anxety-wheels-', delete=False) as f:
+            f.write('\n'.join([*options, *pins]) + '\n')
+        try:
+            result = subprocess.run([*pip, 'wheel', '--no-deps', '--disable-pip-version-check', '--wheel-dir',
+                                     str(WHEELHOUSE_PATH), '-r', f.name], cwd=str(cwd) if cwd else None,
+                                    capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return False
+        finally:
+            os.unlink(f.name)
+        if result.returncode != 0:
+            return False
+    return None if any(item.get('is_direct') for item in items) else True
+
+def install_requirements(pip: List[str], requirements: Path, extra_args: Iterable[str] = (), cwd: Path = None,
+                         timeout: int = 3600, wheelhouse: bool = True, label: str = 'pip') -> subprocess.CompletedProcess:
+    """
+    pip install -r requirements with one resolver run, filling the shared wheelhouse
+
+    The install runs online with the wheelhouse as an extra --find-links source; afterwards
+    cache_wheels() adds what it downloaded or built. Only a requirement set the wheelhouse
+    is known to cover (from an earlier run) is tried offline (--no-index) first.
+
+    Every pip run is timed per package by pip_profiler under label.
+    """
+    extra_args = list(extra_args)
+
+    def run(*args):
+        return pip_profiler.run([*pip, *args, '--disable-pip-version-check', '-r', str(requirements), *extra_args],
+                                label=label, cwd=cwd, timeout=timeout)
+
+    if not wheelhouse:
+        return run('install')
+    links = wheelhouse_args()
+    key = _coverage_key(pip, requirements, extra_args)
+    if key in _load_covered():
+        result = run('install', '--no-index', *links)
+        if result.returncode == 0:
+            return result
+        _set_covered(key, False)
+
+    fd, report = tempfile.mkstemp(suffix='.json', prefix='anxety-report-')
+    os.close(fd)
+    try:
+        result = run('install', *links, '--report', report)
+        if result.returncode == 0:
+            covered = cache_wheels(pip, requirements, Path(report), cwd, timeout)
+            if covered is not None:
+                _set_covered(key, covered)
+    finally:
+        os.unlink(report)
+    return result
+
+def install(install_plan: InstallPlan, venv: Path, extra_args: Iterable[str] = (), cwd: Path = None,
+            timeout: int = 3600, wheelhouse: bool = True) -> subprocess.CompletedProcess:
+    """
+    Install the whole plan with a single pip resolver run inside venv
+
+    cwd: Folder relative paths in the plan (e.g. '-e .' from a repo's requirements.txt) refer to.
+    Falls back to the pip on PATH only if venv has no interpreter. The plan is recorded
+    as applied on success, so is_applied() lets the next run skip pip entirely.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', prefix='anxety-plan-', delete=False) as f:
+        f.write(install_plan.text())
+    try:
+        result = install_requirements(pip_command(venv), Path(f.name), extra_args, cwd, timeout, wheelhouse,
+                                      label=install_plan.label)
+    finally:
+        os.unlink(f.name)
+    if result.returncode == 0 and venv_python(venv):
+        mark_applied(venv, install_plan)
+    return result
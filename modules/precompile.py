@@ -0,0 +1,56 @@
+# ~ precompile.py | Parallel .pyc precompilation of WebUI trees and venvs | by ANXETY ~
+
+from pathlib import Path
+from typing import Dict, Iterable, List
+import subprocess
+import time
+import sys
+
+# Not worth compiling (never imported at launch) and the usual source of Py2 / template files
+EXCLUDE = r'[\\/](\.git|tests?|docs?|examples?|node_modules|__pycache__)[\\/]'
+TIMEOUT = 1800
+
+
+def site_packages(venv: Path) -> List[Path]:
+    """Own site-packages of a venv (an overlay's .pth link to its base is not followed)."""
+    venv = Path(venv)
+    return sorted(venv.glob('lib/python*/site-packages')) or sorted(venv.glob('Lib/site-packages'))
+
+def interpreter(venv: Path) -> str:
+    """Python that will import the files: its version decides the __pycache__/*.cpython-XY.pyc tag."""
+    for candidate in (Path(venv) / 'bin' / 'python', Path(venv) / 'Scripts' / 'python.exe'):
+        if candidate.exists():
+            return str(candidate)
+    return sys.executable
+
+def compile_trees(python: str, paths: Iterable[Path], workers: int = 0, timeout: int = TIMEOUT) -> Dict:
+    """
+    Byte-compile every .py under paths with `python -m compileall`
+
+    Args:
+        python: Interpreter the trees run under (never the notebook kernel's own, unless equal)
+        workers: Processes to use; 0 means one per core
+
+    compileall skips files whose .pyc already matches the source's mtime and size, so
+    re-running over an unchanged tree only costs the directory walk. Files that fail to
+    compile are reported but don't fail the stage: Python would hit the same error at import.
+
+    Returns:
+        {'ok', 'paths', 'errors', 'seconds'}
+    """
+    paths = [str(path) for path in paths if Path(path).is_dir()]
+    if not paths:
+        return {'ok': True, 'paths': [], 'errors': 0, 'seconds': 0.0}
+    start = time.time()
+    try:
+        result = subprocess.run([python, '-m', 'compileall', '-q', '-j', str(workers), '-x', EXCLUDE, *paths],
+                                capture_output=True, text=True, timeout=timeout)
+        errors = result.stdout.count('*** Error compiling')
+        ok = result.returncode == 0 or errors > 0
+    except (OSError, subprocess.TimeoutExpired):
+        ok, errors = False, 0
+    return {'ok': ok, 'paths': paths, 'errors': errors, 'seconds': time.time() - start}
+
+def compile_venv(venv: Path, workers: int = 0) -> Dict:
+    """Precompile a venv's site-packages (before it is snapshotted, so restores come warm)."""
+    return compile_trees(interpreter(venv), site_packages(venv), workers)
@@ -0,0 +1,219 @@
+# ~ progress_bus.py | Download progress events and renderer | by ANXETY ~
+
+from typing import Callable, Dict, List, Optional, TypedDict
+from pathlib import Path
+import threading
+import time
+import sys
+
+STATES = ('queued', 'running', 'paused', 'completed', 'failed', 'skipped')
+FINAL_STATES = {'completed', 'failed', 'skipped'}
+
+
+class ProgressEvent(TypedDict):
+    item_id: str
+    url: str
+    file: Optional[str]
+    bytes_done: int
+    total: Optional[int]
+    rate: float
+    state: str
+    timestamp: float
+
+
+def make_event(item_id: str, url: str, state: str, file: str = None, bytes_done: int = 0,
+               total: int = None, rate: float = 0.0) -> ProgressEvent:
+    return ProgressEvent(item_id=item_id, url=url, file=file, bytes_done=int(bytes_done or 0),
+                         total=total, rate=float(rate or 0), state=state, timestamp=time.time())
+
+
+# ============================== Bus ================================
+
+class ProgressBus:
+    """In-process pub/sub for ProgressEvents; also keeps the latest event per item."""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[ProgressEvent], None]] = []
+        self._latest: Dict[str, ProgressEvent] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[ProgressEvent], None]) -> Callable[[], None]:
+        """Register callback for every event; returns a function that unsubscribes it."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def publish(self, event: ProgressEvent):
+        with self._lock:
+            self._latest[event['item_id']] = event
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception:
+                pass                             # a broken consumer must never stall a transfer
+
+    def get(self, item_id: str) -> Optional[ProgressEvent]:
+        with self._lock:
+            return self._latest.get(item_id)
+
+    def snapshot(self) -> Dict[str, ProgressEvent]:
+        with self._lock:
+            return dict(self._latest)
+
+    def reset(self):
+        with self._lock:
+            self._latest.clear()
+
+
+_bus = ProgressBus()
+
+def get_bus() -> ProgressBus:
+    return _bus
+
+
+# ============================ Renderer =============================
+
+def _format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}PB"
+
+def _format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes // 60}h{minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m{seconds:02d}s"
+
+def _bar(fraction: float, width: int = 20) -> str:
+    filled = int(max(0.0, min(1.0, fraction)) * width)
+    return '█' * filled + '░' * (width - filled)
+
+
+class ProgressRenderer:
+    """
+    Redraws an aggregated multi-download view from the bus at a bounded frame rate.
+
+    mode 'widget' updates one ipywidgets HTML block, 'terminal' redraws in place with ANSI
+    escapes, and 'log' prints a single summary line every few seconds (plain notebook output).
+    """
+
+    MAX_ROWS = 8
+
+    def __init__(self, bus: ProgressBus = None, fps: float = 2.0, mode: str = 'auto',
+                 log_interval: float = 5.0):
+        self.bus = bus or get_bus()
+        self.interval = 1.0 / max(fps, 0.1)
+        self.log_interval = log_interval
+        self.mode = self._detect_mode() if mode == 'auto' else mode
+        self._stop = threading.Event()
+        self._thread = None
+        self._widget = None
+        self._lines_drawn = 0
+        self._started = 0.0
+        self._baseline = 0
+
+    @staticmethod
+    def _detect_mode() -> str:
+        try:
+            from IPython import get_ipython
+            if get_ipython() is not None and hasattr(get_ipython(), 'kernel'):
+                import ipywidgets  # noqa: F401
+                return 'widget'
+        except ImportError:
+            pass
+        return 'terminal' if sys.stdout.isatty() else 'log'
+
+    # ---- view ----
+
+    def summary(self) -> Dict:
+        events = list(self.bus.snapshot().values())
+        done = sum(e['bytes_done'] for e in events)
+        total = sum(e['total'] or 0 for e in events)
+        rate = (done - self._baseline) / max(time.time() - self._started, 1e-6)
+        return {
+            'events': events,
+            'finished': sum(e['state'] in FINAL_STATES for e in events),
+            'failed': sum(e['state'] == 'failed' for e in events),
+            'done': done,
+            'total': total,
+            'rate': rate,
+            'eta': (total - done) / rate if total > done and rate > 0 else None
+        }
+
+    def lines(self) -> List[str]:
+        info = self.summary()
+        eta = f" · ETA {_format_eta(info['eta'])}" if info['eta'] is not None else ''
+        failed = f" · {info['failed']} failed" if info['failed'] else ''
+        lines = [f"Downloads: {info['finished']}/{len(info['events'])} done{failed} · "
+                 f"{_format_bytes(info['done'])}/{_format_bytes(info['total'])} · "
+                 f"{_format_bytes(info['rate'])}/s{eta}"]
+
+        active = [e for e in info['events'] if e['state'] in ('running', 'paused')]
+        for event in active[:self.MAX_ROWS]:
+            name = Path(event['file'] or event['url']).name[:32]
+            if event['total']:
+                fraction = event['bytes_done'] / event['total']
+                lines.append(f"{_bar(fraction)} {fraction:4.0%}  {name:<32} "
+                             f"{_format_bytes(event['bytes_done'])}/{_format_bytes(event['total'])} "
+                             f"{_format_bytes(event['rate'])}/s")
+            else:
+                lines.append(f"{'·' * 20}   ?   {name:<32} {_format_bytes(event['bytes_done'])}")
+        if len(active) > self.MAX_ROWS:
+            lines.append(f"... +{len(active) - self.MAX_ROWS} more")
+        return lines
+
+    def _draw(self):
+        lines = self.lines()
+        if self.mode == 'widget':
+            import html
+            self._widget.value = f"<pre style='margin:0'>{html.escape(chr(10).join(lines))}</pre>"
+        elif self.mode == 'terminal':
+            if self._lines_drawn:
+                sys.stdout.write(f"\x1b[{self._lines_drawn}F\x1b[J")
+            sys.stdout.write('\n'.join(lines) + '\n')
+            sys.stdout.flush()
+            self._lines_drawn = len(lines)
+        else:
+            print(lines[0], flush=True)
+
+    # ---- lifecycle ----
+
+    def _loop(self):
+        last_log = time.time()
+        while not self._stop.wait(self.interval):
+            if self.mode == 'log':
+                if time.time() - last_log < self.log_interval:
+                    continue
+                last_log = time.time()
+            self._draw()
+
+    def start(self):
+        self._started = time.time()
+        self._baseline = sum(e['bytes_done'] for e in self.bus.snapshot().values())
+        if self.mode == 'widget':
+            import ipywidgets as widgets
+            from IPython.display import display
+            self._widget = widgets.HTML()
+            display(self._widget)
+        self._thread = threading.Thread(target=self._loop, name='ProgressRenderer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop redrawing and leave the final frame on screen."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._draw()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,306 @@
+# ~ range_downloader.py | Native multi-connection HTTP downloader | by ANXETY ~
+
+import http_utils as http            # Shared HTTP pools
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+import threading
+import requests
+import hashlib
+import errno
+import json
+import time
+import os
+
+HASH_BUFFER_SIZE = 1024 * 1024
+NATIVE_CONNECTIONS = 8
+NATIVE_MIN_SEGMENT = 8 * 1024 * 1024     # don't split below this many bytes per connection
+NATIVE_CHUNK_SIZE = 1024 * 1024
+NATIVE_MAX_RETRIES = 5
+NATIVE_STATE_INTERVAL = 2.0              # seconds between sidecar state flushes
+
+
+def _preallocate(fd: int, size: int):
+    """Reserve size bytes up front (no fragmentation, ENOSPC before the transfer rather than at 80%)."""
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError) as e:
+        if getattr(e, 'errno', None) == errno.ENOSPC:
+            raise
+        os.ftruncate(fd, size)
+
+class OrderedHasher:
+    """
+    SHA256 of a file whose ranges are written out of order.
+    
+    Chunks landing exactly on the hashed offset are fed from memory; once a gap closes, the
+    bytes written ahead of it are read back with pread while the page cache still holds them.
+    Only one thread hashes at a time, the others just keep writing.
+    """
+    
+    def __init__(self, fd: int):
+        self.fd = fd
+        self.offset = 0
+        self._hash = hashlib.sha256()
+        self._lock = threading.Lock()
+    
+    def _catch_up(self, frontier: int):
+        while self.offset < frontier:
+            data = os.pread(self.fd, min(HASH_BUFFER_SIZE, frontier - self.offset), self.offset)
+            if not data:
+                raise IOError(f"Short read while hashing at offset {self.offset}")
+            self._hash.update(data)
+            self.offset += len(data)
+    
+    def feed(self, pos: int, data: bytes, frontier: int):
+        """Account for data written at pos; frontier is the end of the contiguous written prefix."""
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if pos == self.offset:
+                self._hash.update(data)
+                self.offset += len(data)
+            self._catch_up(frontier)
+        finally:
+            self._lock.release()
+    
+    def finish(self, size: int) -> str:
+        with self._lock:
+            self._catch_up(size)
+            return self._hash.hexdigest()
+
+class RangeDownloader:
+    """
+    Pure-Python multi-connection downloader.
+
+    The file is split into byte ranges fetched in parallel over the pooled session from
+    http_utils and written at their offsets into a preallocated file. Progress is kept in
+    a `<file>.rdl` sidecar so an interrupted transfer resumes where each range stopped;
+    the sidecar is removed once the file is complete. The SHA256 is computed while the
+    ranges arrive (see OrderedHasher) and left in `sha256` after a successful run.
+    """
+    
+    STATE_SUFFIX = '.rdl'
+    
+    def __init__(self, url: str, output_file: Path, connections: int = NATIVE_CONNECTIONS,
+                 on_progress=None, progress_interval: float = 0.5, hash_on_write: bool = True, log=None):
+        self.url = url
+        self.output_file = Path(output_file)
+        self.state_file = self.output_file.with_name(self.output_file.name + self.STATE_SUFFIX)
+        self.connections = max(1, connections)
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.total = None
+        self.done = 0
+        self.state = None
+        self.sha256 = None
+        self.hash_on_write = hash_on_write
+        self.log = log                           # log(message, level), e.g. Manager's Logger.log
+        self._fd = None
+        self._hasher = None
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+        self._started = 0.0
+        self._session_bytes = 0
+        self._last_progress = 0.0
+        self._last_flush = 0.0
+    
+    def _log(self, message: str, level: str = 'info'):
+        if self.log:
+            self.log(message, level)
+    
+    # ---- state ----
+    
+    def _new_state(self, info: Dict, ranged: bool) -> Dict:
+        size = info['size']
+        count = min(self.connections, max(1, size // NATIVE_MIN_SEGMENT)) if ranged else 1
+        step = -(-size // count)
+        segments = [{'start': start, 'end': min(start + step, size) - 1, 'pos': start}
+                    for start in range(0, size, step)]
+        return {'url': self.url, 'size': size, 'etag': info.get('etag'), 'segments': segments}
+    
+    def _load_state(self, info: Dict) -> Optional[Dict]:
+        if not (self.state_file.exists() and self.output_file.exists()):
+            return None
+        try:
+            state = json.loads(self.state_file.read_text())
+        except (OSError, ValueError):
+            return None
+        if state.get('url') != self.url or state.get('size') != info['size']:
+            return None
+        if info.get('etag') and state.get('etag') and state['etag'] != info['etag']:
+            return None
+        return state
+    
+    def _flush_state(self, force: bool = False):
+        now = time.time()
+        if not force and now - self._last_flush < NATIVE_STATE_INTERVAL:
+            return
+        self._last_flush = now
+        tmp = self.state_file.with_name(self.state_file.name + '.tmp')
+        tmp.write_text(json.dumps(self.state))
+        os.replace(tmp, self.state_file)
+    
+    # ---- progress ----
+    
+    def _emit(self, status: str, force: bool = False):
+        if not self.on_progress:
+            return
+        now = time.time()
+        if not force and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        elapsed = max(now - self._started, 1e-6)
+        self.on_progress({
+            'url': self.url,
+            'file': str(self.output_file),
+            'bytes_done': self.done,
+            'total': self.total,
+            'rate': self._session_bytes / elapsed,
+            'status': status
+        })
+    
+    def _advance(self, segment: Dict, length: int) -> int:
+        """Record written bytes; returns the end of the contiguous written prefix."""
+        with self._lock:
+            segment['pos'] += length
+            self.done += length
+            self._session_bytes += length
+            self._flush_state()
+            self._emit('running')
+            return next((seg['pos'] for seg in self.state['segments'] if seg['pos'] <= seg['end']), self.total)
+    
+    # ---- transfer ----
+    
+    def reserve(self, info: Dict = None) -> bool:
+        """
+        Preallocate the output file ahead of run() and write a fresh sidecar for it,
+        so the later run() resumes into the reserved blocks instead of truncating them.
+        """
+        info = info or http.probe(self.url)
+        if not info or not info.get('size') or not info.get('accept_ranges') or self.output_file.exists():
+            return False
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self.state = self._new_state(info, True)
+        fd = os.open(self.output_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _preallocate(fd, info['size'])
+        finally:
+            os.close(fd)
+        self._flush_state(force=True)
+        return True
+    
+    def cancel(self):
+        """Stop all connections; the sidecar keeps the progress for a later resume."""
+        self._abort.set()
+    
+    def _supports_ranges(self) -> bool:
+        try:
+            with http.get(self.url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=15) as response:
+                return response.status_code == 206
+        except requests.RequestException:
+            return False
+    
+    def _fetch_segment(self, segment: Dict):
+        attempts = 0
+        while segment['pos'] <= segment['end'] and not self._abort.is_set():
+            try:
+                headers = {'Range': f"bytes={segment['pos']}-{segment['end']}"}
+                with http.get(self.url, headers=headers, stream=True, timeout=(10, 60)) as response:
+                    if response.status_code != 206:
+                        raise IOError(f"Range request rejected (HTTP {response.status_code})")
+                    for chunk in response.iter_content(NATIVE_CHUNK_SIZE):
+                        if self._abort.is_set():
+                            return
+                        chunk = chunk[:segment['end'] + 1 - segment['pos']]
+                        pos = segment['pos']
+                        os.pwrite(self._fd, chunk, pos)
+                        frontier = self._advance(segment, len(chunk))
+                        if self._hasher:
+                            self._hasher.feed(pos, chunk, frontier)
+                        if segment['pos'] > segment['end']:
+                            break
+                attempts = 0
+            except (requests.RequestException, IOError) as e:
+                attempts += 1
+                if attempts > NATIVE_MAX_RETRIES:
+                    raise
+                self._log(f"Range {segment['start']}-{segment['end']} retry {attempts}: {e}", 'debug')
+                time.sleep(min(2 ** attempts, 30))
+    
+    def _fetch_stream(self):
+        """Single-connection fallback for servers without Range support or a known size."""
+        with http.get(self.url, stream=True, timeout=(10, 60)) as response:
+            response.raise_for_status()
+            offset = 0
+            for chunk in response.iter_content(NATIVE_CHUNK_SIZE):
+                os.pwrite(self._fd, chunk, offset)
+                if self._hasher:
+                    self._hasher.feed(offset, chunk, offset + len(chunk))
+                offset += len(chunk)
+                with self._lock:
+                    self.done += len(chunk)
+                    self._session_bytes += len(chunk)
+                    self._emit('running')
+            os.ftruncate(self._fd, offset)
+            self.total = offset
+    
+    def run(self) -> bool:
+        """Download the file; returns True when it is complete on disk."""
+        info = http.probe(self.url, refresh=True) or {'size': None}
+        self.total = info.get('size')
+        ranged = bool(self.total) and (info.get('accept_ranges') or self._supports_ranges())
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self._started = time.time()
+        self._session_bytes = 0
+        
+        self.state = self._load_state(info) if ranged else None
+        resumed = self.state is not None
+        if not resumed and ranged:
+            self.state = self._new_state(info, ranged)
+        
+        self._fd = os.open(self.output_file, os.O_RDWR | os.O_CREAT | (0 if resumed else os.O_TRUNC), 0o644)
+        # A resumed file is hashed from offset 0 again; the already-written prefix is caught up via pread
+        self._hasher = OrderedHasher(self._fd) if self.hash_on_write else None
+        try:
+            if not self.state:
+                self._emit('running', force=True)
+                self._fetch_stream()
+            else:
+                if resumed:
+                    self.done = sum(seg['pos'] - seg['start'] for seg in self.state['segments'])
+                    if self.done:
+                        self._log(f"Resuming {self.output_file.name} at {self.done / 1024 ** 2:.1f} MB")
+                else:
+                    _preallocate(self._fd, self.total)
+                    self._flush_state(force=True)
+                
+                self._emit('running', force=True)
+                pending = [seg for seg in self.state['segments'] if seg['pos'] <= seg['end']]
+                with ThreadPoolExecutor(max_workers=max(1, len(pending)), thread_name_prefix='RangeDownloader') as pool:
+                    futures = [pool.submit(self._fetch_segment, seg) for seg in pending]
+                    try:
+                        for future in futures:
+                            future.result()
+                    except BaseException:
+                        self._abort.set()
+                        raise
+                    finally:
+                        with self._lock:
+                            self._flush_state(force=True)
+                
+                if any(seg['pos'] <= seg['end'] for seg in self.state['segments']):
+                    self._emit('paused', force=True)
+                    return False
+                self.state_file.unlink(missing_ok=True)
+            
+            if self._hasher:
+                self.sha256 = self._hasher.finish(self.total)
+            self._emit('completed', force=True)
+            return True
+        except BaseException:
+            self._emit('failed', force=True)
+            raise
+        finally:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,59 @@
+# ~ venv_layers.py | Shared base venv plus thin per-WebUI overlays | by ANXETY ~
+
+from pathlib import Path
+from typing import Optional
+import subprocess
+import re
+
+BASE_PTH = '_anxety_base.pth'            # in the overlay's site-packages: adds the base site-packages
+
+
+def overlay_path(base: Path, ui: str) -> Path:
+    """Overlay venv of a WebUI next to the base venv, e.g. <venv>-Forge."""
+    base = Path(base)
+    return base.with_name(f"{base.name}-{re.sub(r'[^A-Za-z0-9._-]', '_', ui)}")
+
+def python_path(venv: Path) -> Optional[Path]:
+    for candidate in (Path(venv) / 'bin' / 'python', Path(venv) / 'Scripts' / 'python.exe'):
+        if candidate.exists():
+            return candidate
+    return None
+
+def site_packages(venv: Path) -> Optional[Path]:
+    found = sorted(Path(venv).glob('lib/python*/site-packages')) or sorted(Path(venv).glob('Lib/site-packages'))
+    return found[0] if found else None
+
+def is_overlay(venv: Path) -> bool:
+    packages = site_packages(venv)
+    return bool(packages and (packages / BASE_PTH).is_file())
+
+def ensure_overlay(base: Path, ui: str) -> Optional[Path]:
+    """
+    Create (or re-link) the WebUI's overlay on top of base
+
+    The overlay is a pip-less venv of the same interpreter whose site-packages chains to
+    the base one through a .pth file: everything in base is importable (and counts as
+    installed for pip, which itself comes from base), while installs land in the overlay.
+
+    Returns:
+        Overlay path, or None if base has no interpreter / site-packages yet
+    """
+    base_python, base_packages = python_path(base), site_packages(base)
+    if not base_python or not base_packages:
+        return None
+    overlay = overlay_path(base, ui)
+    if not python_path(overlay):
+        result = subprocess.run([str(base_python), '-m', 'venv', '--without-pip', str(overlay)],
+                                capture_output=True, text=True, timeout=120)
+        if result.returncode != 0:
+            return None
+    # addsitedir() rather than a bare path line: the base's own .pth files (editable installs,
+    # namespace packages, distutils-precedence) are processed too. It appends after the
+    # overlay's site-packages, so the overlay still wins
+    (site_packages(overlay) / BASE_PTH).write_text(f"import site; site.addsitedir({str(base_packages)!r})\n")
+    return overlay
+
+def active_venv(base: Path, ui: str) -> Path:
+    """The venv to run a WebUI with: its overlay when one exists, else the base venv."""
+    overlay = overlay_path(base, ui)
+    return overlay if python_path(overlay) and is_overlay(overlay) else Path(base)
@@ -0,0 +1,237 @@
+# ~ venv_snapshot.py | Fingerprinted venv snapshots (zstd tarballs) | by ANXETY ~
+
+from pathlib import Path
+from typing import Iterable, Optional
+import subprocess
+import platform
+import tarfile
+import hashlib
+import shutil
+import fcntl
+import json
+import time
+import sys
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+osENV = os.environ
+PATHS = {k: Path(v) for k, v in osENV.items() if k.endswith('_path')}
+CACHE_PATH = PATHS.get('cache_path', PATHS.get('home_path', Path.home()) / '.cache' / 'ANXETY')
+# Point venv_cache_path at persistent storage (e.g. Google Drive) to survive new sessions
+SNAPSHOTS_PATH = PATHS.get('venv_cache_path', CACHE_PATH / 'venv')
+
+MARKER = '.anxety-fingerprint'           # inside the venv: fingerprint of what was installed
+INDEX_FILE = 'index.json'                # base fingerprint -> newest snapshot built from it
+ZSTD_LEVEL = 3
+KEEP_SNAPSHOTS = 6                       # base venv + recent WebUI overlays
+
+
+def python_tag() -> str:
+    """Interpreter identity a venv is bound to, e.g. 'cpython-3.10.12-x86_64'."""
+    return f"{sys.implementation.name}-{platform.python_version()}-{platform.machine()}"
+
+def fingerprint(files: Iterable[Path] = (), packages: Iterable[str] = (), extra: Iterable[str] = ()) -> str:
+    """
+    Hash everything a venv's contents depend on
+
+    Args:
+        files: Requirement files (a missing file hashes differently from an empty one)
+        packages: Extra requirement specifiers installed on top
+        extra: Any other distinguishing values (e.g. the WebUI name)
+    """
+    digest = hashlib.sha256(python_tag().encode())
+    for path in files:
+        path = Path(path)
+        digest.update(f"\0file:{path.name}\0".encode())
+        digest.update(path.read_bytes() if path.is_file() else b'<missing>')
+    for value in sorted(packages):
+        digest.update(f"\0pkg:{value}".encode())
+    for value in extra:
+        digest.update(f"\0extra:{value}".encode())
+    return digest.hexdigest()[:16]
+
+def snapshot_path(key: str) -> Path:
+    return SNAPSHOTS_PATH / f"venv-{key}.tar.zst"
+
+
+class VenvLock:
+    """Exclusive flock beside the venv, held while it is created, restored or pip-installed into."""
+
+    def __init__(self, venv: Path):
+        venv = Path(venv)
+        self.path = venv.with_name(f".{venv.name}.lock")
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+
+
+def installed_fingerprint(venv: Path) -> Optional[str]:
+    try:
+        return (Path(venv) / MARKER).read_text().strip()
+    except OSError:
+        return None
+
+def mark(venv: Path, key: str):
+    (Path(venv) / MARKER).write_text(f"{key}\n")
+
+
+# ============================== Index ==============================
+
+def _load_index() -> dict:
+    try:
+        return json.loads((SNAPSHOTS_PATH / INDEX_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+def _save_index(index: dict):
+    path = SNAPSHOTS_PATH / INDEX_FILE
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(index, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+def latest(base: str) -> Optional[str]:
+    """Newest snapshot built on top of base (the snapshot for base itself if nothing was added)."""
+    entry = _load_index().get(base)
+    return entry['key'] if entry and snapshot_path(entry['key']).is_file() else None
+
+def _prune(index: dict):
+    keep = {entry['key'] for entry in sorted(index.values(), key=lambda e: e['created'])[-KEEP_SNAPSHOTS:]}
+    for path in SNAPSHOTS_PATH.glob('venv-*.tar.zst'):
+        if path.name.removeprefix('venv-').removesuffix('.tar.zst') not in keep:
+            path.unlink(missing_ok=True)
+
+
+# ============================ Tarballs =============================
+
+def _write_tarball(venv: Path, target: Path):
+    """tar | zstd -T0 when both binaries exist (multi-threaded), the zstandard module otherwise."""
+    if shutil.which('tar') and shutil.which('zstd'):
+        tar = subprocess.Popen(['tar', '-C', str(venv), '-cf', '-', '.'], stdout=subprocess.PIPE)
+        zstd = subprocess.run(['zstd', '-q', '-f', '-T0', f'-{ZSTD_LEVEL}', '-o', str(target)],
+                              stdin=tar.stdout, capture_output=True)
+        tar.stdout.close()
+        if tar.wait() != 0 or zstd.returncode != 0:
+            raise OSError(f"Snapshot compression failed: {zstd.stderr.decode(errors='replace').strip()}")
+        return
+    if zstandard is None:
+        raise OSError('Venv snapshots need the zstd binary or the zstandard module')
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1)
+    with open(target, 'wb') as f, compressor.stream_writer(f) as writer:
+        with tarfile.open(fileobj=writer, mode='w|') as tar:
+            tar.add(venv, arcname='.')
+
+def _read_tarball(archive: Path, destination: Path):
+    destination.mkdir(parents=True)
+    if shutil.which('tar') and shutil.which('zstd'):
+        zstd = subprocess.Popen(['zstd', '-dc', str(archive)], stdout=subprocess.PIPE)
+        tar = subprocess.run(['tar', '-C', str(destination), '-xf', '-'], stdin=zstd.stdout, capture_output=True)
+        zstd.stdout.close()
+        if zstd.wait() != 0 or tar.returncode != 0:
+            raise OSError(f"Snapshot extraction failed: {tar.stderr.decode(errors='replace').strip()}")
+        return
+    if zstandard is None:
+        raise OSError('Venv snapshots need the zstd binary or the zstandard module')
+    with open(archive, 'rb') as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+        with tarfile.open(fileobj=reader, mode='r|') as tar:
+            # Our own archive: the venv's absolute interpreter symlinks must survive
+            if hasattr(tarfile, 'data_filter'):
+                tar.extractall(destination, filter='fully_trusted')
+            else:
+                tar.extractall(destination)
+
+
+# ============================ Path fix-ups =========================
+
+def _relocate(venv: Path, old_prefix: str, new_prefix: str) -> int:
+    """Rewrite the venv's absolute prefix in scripts, pyvenv.cfg and .pth files; returns files changed."""
+    if old_prefix == new_prefix:
+        return 0
+    old, new = old_prefix.encode(), new_prefix.encode()
+    candidates = [venv / 'pyvenv.cfg', *(venv / 'bin').glob('*'), *venv.glob('lib/python*/site-packages/*.pth')]
+    changed = 0
+    for path in candidates:
+        if path.is_symlink() or not path.is_file() or path.stat().st_size > 1024 * 1024:
+            continue
+        data = path.read_bytes()
+        if old in data and b'\0' not in data[:1024]:
+            mode = path.stat().st_mode
+            path.write_bytes(data.replace(old, new))
+            path.chmod(mode)
+            changed += 1
+    return changed
+
+def _interpreter_ok(venv: Path) -> bool:
+    """The base interpreter the venv links to still exists (same image / Python build)."""
+    python = venv / 'bin' / 'python'
+    return python.exists() and os.access(python, os.X_OK)
+
+
+# ============================== Public =============================
+
+def save(venv: Path, key: str, base: str = None) -> Optional[Path]:
+    """
+    Archive venv as the snapshot for key (and the newest one for base)
+
+    Returns:
+        Snapshot path, or None if it could not be written (snapshots are best-effort)
+    """
+    venv = Path(venv)
+    if not (venv / 'pyvenv.cfg').is_file():
+        return None
+    SNAPSHOTS_PATH.mkdir(parents=True, exist_ok=True)
+    target = snapshot_path(key)
+    tmp = target.with_name(target.name + '.tmp')
+    mark(venv, key)
+    try:
+        _write_tarball(venv, tmp)
+        os.replace(tmp, target)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        return None
+
+    index = _load_index()
+    index[base or key] = {'key': key, 'prefix': str(venv), 'python': python_tag(),
+                          'created': time.time(), 'size': target.stat().st_size}
+    if base and base != key:
+        index[key] = dict(index[base])
+    _save_index(index)
+    _prune(index)
+    return target
+
+def restore(venv: Path, key: str) -> bool:
+    """
+    Replace venv with the snapshot for key, fixing up absolute paths if it moved
+
+    Extracts into a staging folder first, so a corrupt or foreign snapshot never
+    leaves a half-restored venv behind.
+    """
+    venv = Path(venv)
+    archive = snapshot_path(key)
+    entry = next((e for e in _load_index().values() if e['key'] == key), None)
+    if not archive.is_file() or entry is None or entry.get('python') != python_tag():
+        return False
+
+    staging = venv.with_name(f".{venv.name}.restore")
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        _read_tarball(archive, staging)
+        _relocate(staging, entry['prefix'], str(venv))
+        if not _interpreter_ok(staging) or installed_fingerprint(staging) != key:
+            raise OSError('Snapshot does not match this runtime')
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        return False
+    shutil.rmtree(venv, ignore_errors=True)
+    staging.rename(venv)
+    return True
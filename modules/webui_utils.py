@@ -200,6 +200,11 @@ def get_launch_script(ui: str) -> str:
     features = get_webui_features(ui)
     return features.get('launch_script', 'launch.py')
 
+def is_webui_installed(ui: str, webui_path: Path) -> bool:
+    """Check for an installed WebUI (its launch script or a checkout), not just a non-empty folder."""
+    webui_path = Path(webui_path)
+    return (webui_path / get_launch_script(ui)).is_file() or (webui_path / '.git').exists()
+
 def get_config_files(ui: str) -> list:
     """Get list of configuration files for a WebUI."""
     features = get_webui_features(ui)
@@ -1,5 +1,7 @@
 ## MODEL
 
+# Entries: {"url", "name"} plus optional "inpainting" and "sha256" (checked while downloading)
+
 model_list = {
     "D5K6.0": {"url": "https://huggingface.co/Remphanstar/Rojos/blob/main/1.5-D5K6.0.safetensors", "name": "1.5-D5K6.0.safetensors"},
     "Merged amateurs - Mixed Amateurs": {"url": "https://civitai.com/api/download/models/179318", "name": "mergedAmateurs_mixedAmateurs.safetensors"},
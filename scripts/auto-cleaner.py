@@ -2,6 +2,7 @@
 
 from widget_factory import WidgetFactory    # WIDGETS
 import json_utils as js                     # JSON
+from model_store import get_store           # MODEL STORE
 
 from IPython.display import display, HTML, clear_output
 import ipywidgets as widgets
@@ -83,9 +84,15 @@ def execute_button_press(_):
         if option in directories
     }
 
+    # Deleted files were links into the model store; reclaim blobs nothing links to any more
+    freed = get_store().gc()
+    messages = generate_messages(deleted_files_dict)
+    if freed['blobs']:
+        messages.append(f"Freed {freed['blobs']} unused stored models ({freed['bytes'] / (1024 ** 3):.2f} GB)")
+
     output_widget.clear_output()
     with output_widget:
-        for message in generate_messages(deleted_files_dict):
+        for message in messages:
             display(HTML(f'<p class="output-message">{message}</p>'))
     _update_memory_info()
 
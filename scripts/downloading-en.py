@@ -4,14 +4,28 @@ import subprocess
 import sys
 import os
 import time
+import shutil
+import threading
+import asyncio
+import importlib.util
 from pathlib import Path
 from IPython import get_ipython
 
 # Safe import with comprehensive fallbacks
 try:
     from webui_utils import (get_webui_features, is_webui_supported, get_webui_category, 
-                           get_webui_specific_paths, handle_setup_timer, log_webui_info)
-    from Manager import m_download, m_clone
+                           get_webui_specific_paths, handle_setup_timer, log_webui_info,
+                           is_webui_installed)
+    from Manager import m_download, m_clone, DownloadManager, DiskSpaceError
+    from download_journal import DownloadJournal
+    from model_store import get_store
+    from progress_bus import ProgressBus
+    from phase_pipeline import PhasePipeline
+    import venv_snapshot
+    import pip_utils
+    import pip_profiler
+    import precompile
+    import venv_layers
     from CivitaiAPI import CivitAiAPI
     import json_utils as js
     MODULES_AVAILABLE = True
@@ -25,12 +39,14 @@ except ImportError as e:
     def get_webui_specific_paths(ui): return {}
     def handle_setup_timer(path, timer): return timer
     def log_webui_info(ui): print(f"🔍 WebUI: {ui}")
+    def is_webui_installed(ui, path): return path.exists() and any(path.iterdir())
     def m_download(cmd, **kwargs): 
         parts = cmd.split()
         if len(parts) >= 2:
             subprocess.run(['wget', '-O', parts[-1], parts[0]], check=False)
     def m_clone(cmd, **kwargs): 
         subprocess.run(['git', 'clone'] + cmd.split(), check=False)
+    class DiskSpaceError(OSError): pass
     class CivitAiAPI:
         def __init__(self, token): self.token = token
         def get_model_versions(self, model_id): return []
@@ -39,6 +55,16 @@ except ImportError as e:
         def read(path, key, default=None): return default
         @staticmethod
         def save(path, key, value): pass
+    class PhasePipeline:
+        # Sequential stand-in: phases run in the order they were added
+        def __init__(self, **kwargs): self.phases = {}
+        def add(self, name, func, after=(), resource='cpu'): self.phases[name] = {'func': func, 'after': after}
+        def run(self):
+            for name, phase in self.phases.items():
+                ok = all(self.phases[dep]['status'] == 'done' for dep in phase['after'])
+                phase['status'] = 'done' if ok and phase['func']() is not False else 'skipped'
+            return self.phases
+        def summary(self): return []
 
 ipyRun = get_ipython().run_line_magic
 
@@ -91,7 +117,9 @@ required_vars = {
     'embed': widget_settings.get('embed', ['none']),
     'extension': widget_settings.get('extension', ['none']),
     'control': widget_settings.get('control', ['none']),
-    'detailed_download': widget_settings.get('detailed_download', 'off')
+    'detailed_download': widget_settings.get('detailed_download', 'off'),
+    'early_launch': widget_settings.get('early_launch', True),
+    'precompile_bytecode': widget_settings.get('precompile', True)
 }
 
 # Set all variables in global scope with validation
@@ -106,11 +134,45 @@ if MODULES_AVAILABLE:
 
 # ==================== FIXED VENV SETUP ====================
 
+# VENV is the shared base layer (interpreter + scripts/requirements.txt) for every WebUI;
+# each WebUI's own requirements go into a thin overlay on top of it (see webui-installer.py).
+VENV_BASE_KEY = (venv_snapshot.fingerprint([SCRIPTS / 'requirements.txt'])
+                 if MODULES_AVAILABLE else None)
+
 def setup_venv():
-    """FIXED: Enhanced virtual environment setup with comprehensive error handling."""
+    """Restore the venv from a matching snapshot, or build it (and snapshot it) from scratch."""
     
     print("🐍 Setting up virtual environment...")
     
+    if not MODULES_AVAILABLE:
+        return create_venv() is not False
+    
+    with venv_snapshot.VenvLock(VENV):
+        if VENV.exists():
+            print(f"✅ Virtual environment already exists: {VENV}")
+            return True
+        
+        key = venv_snapshot.latest(VENV_BASE_KEY)
+        start_time = time.time()
+        if key and venv_snapshot.restore(VENV, key):
+            print(f"♻️ Restored venv snapshot {key} in {time.time() - start_time:.1f}s")
+            return True
+        
+        created = create_venv()
+        if not created:
+            return created is None
+        if precompile_bytecode:
+            # Compiled before the snapshot, so every restore of it starts with warm .pyc files
+            compiled = precompile.compile_venv(VENV)
+            print(f"⚙️ Precompiled venv bytecode in {compiled['seconds']:.1f}s")
+        start_time = time.time()
+        if venv_snapshot.save(VENV, VENV_BASE_KEY):
+            print(f"💾 Saved venv snapshot {VENV_BASE_KEY} in {time.time() - start_time:.1f}s")
+        return True
+
+def create_venv():
+    """FIXED: Enhanced virtual environment setup with comprehensive error handling."""
+    
     if VENV.exists():
         print(f"✅ Virtual environment already exists: {VENV}")
         return True
@@ -183,7 +245,7 @@ def setup_venv():
             print("✅ Basic requirements file created")
         except Exception as e:
             print(f"⚠️ Could not create requirements file: {e}")
-            return True  # Continue without requirements
+            return None  # Continue without requirements
     
     # FIXED: Install requirements with only ONE process.wait() call
     pip_executable_paths = [
@@ -202,6 +264,19 @@ def setup_venv():
         pip_executable = f"{venv_python} -m pip"
 
     print(f"📦 Installing dependencies from {requirements_path.name}...")
+    if MODULES_AVAILABLE:
+        # One merged plan, installed through the shared wheelhouse (offline when it has everything)
+        plan = pip_utils.plan([requirements_path], label='base')
+        result = pip_utils.install(plan, VENV)
+        if detailed_download == 'on':
+            print(result.stdout.rstrip())
+        if result.returncode != 0:
+            print("⚠️ Some dependencies failed to install, but continuing...")
+            return None
+        print("✅ Dependencies installed successfully")
+        print("✅ Virtual environment setup complete")
+        return True
+    
     try:
         install_command = f"{pip_executable} install -r {requirements_path}"
         process = subprocess.Popen(install_command, shell=True, 
@@ -217,33 +292,67 @@ def setup_venv():
         return_code = process.wait()
         if return_code != 0:
             print("⚠️ Some dependencies failed to install, but continuing...")
+            requirements_ok = None
         else:
             print("✅ Dependencies installed successfully")
+            requirements_ok = True
             
     except Exception as e:
         print(f"⚠️ Requirements installation issue: {e}")
+        requirements_ok = None
 
     print("✅ Virtual environment setup complete")
-    return True
-
-# Execute Venv Setup
-if not setup_venv():
-    print("❌ Virtual environment setup failed, but continuing...")
+    # None: the venv is usable but its requirements are incomplete (never snapshot that)
+    return requirements_ok
 
 # ==================== ENHANCED WEBUI INSTALLATION ====================
 
-print(f"🔧 Checking WebUI installation...")
-
 webui_path = Path(WEBUI)
-if not webui_path.exists() or not any(webui_path.iterdir()):
+_installer = None
+
+def load_installer():
+    """
+    webui-installer.py as a module (loaded once)
+
+    Its functions are called directly from the pipeline's worker threads: %run would swap
+    sys.argv and __main__ for the whole kernel while the other phases are running.
+    """
+    global _installer
+    if _installer is None:
+        spec = importlib.util.spec_from_file_location('webui_installer', SCRIPTS / 'webui-installer.py')
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _installer = module
+    return _installer
+
+def install_webui():
+    """Fetch / unpack the WebUI unless it is already in place (its requirements are a phase of their own)."""
+    if is_webui_installed(UI, webui_path):
+        print(f"✅ WebUI {UI} already exists at {webui_path}")
+        return True
+    
     print(f"⌚ Installing {UI} WebUI...")
     try:
-        ipyRun('run', f"{SCRIPTS}/webui-installer.py")
-        print(f"✅ {UI} installation completed")
+        asyncio.run(load_installer().main(with_requirements=False))
     except Exception as e:
         print(f"⚠️ WebUI installation issue: {e}")
-else:
-    print(f"✅ WebUI {UI} already exists at {webui_path}")
+    
+    if not is_webui_installed(UI, webui_path):
+        print(f"❌ {UI} installation did not complete")
+        critical_done('webui', False)
+        return False
+    print(f"✅ {UI} installation completed")
+    return True
+
+def install_webui_requirements():
+    """Install the WebUI's requirements into its overlay on the base venv."""
+    try:
+        ok = load_installer().install_requirements(UI)
+    except Exception as e:
+        print(f"⚠️ WebUI requirements issue: {e}")
+        ok = False
+    critical_done('webui', ok)
+    return ok
 
 # ==================== ENHANCED DIRECTORY SETUP ====================
 
@@ -303,47 +412,125 @@ PREFIX_MAP = {
     'control': (webui_specific_paths.get('control_dir', str(webui_path / 'models/ControlNet')), '$ctrl')
 }
 
-# Create all directories
-for name, (path, _) in PREFIX_MAP.items():
-    if path:  # Only create if path is defined
+def create_directories():
+    """Create all download target folders (the WebUI installer merges into them)."""
+    for name, (path, _) in PREFIX_MAP.items():
+        if path:  # Only create if path is defined
+            try:
+                Path(path).mkdir(parents=True, exist_ok=True)
+                if detailed_download == 'on':
+                    print(f"📁 Created: {name} -> {path}")
+            except Exception as e:
+                print(f"⚠️ Could not create {name} directory: {e}")
+    
+    print("✅ Directory setup complete")
+
+# ==================== MODEL DATA RESOLUTION ====================
+
+def load_models_data():
+    """Index the SD1.5 and SDXL data files by name (entries may carry an optional 'sha256')."""
+    data = {}
+    for data_file in ('_models-data.py', '_xl-models-data.py'):
+        scope = {}
         try:
-            Path(path).mkdir(parents=True, exist_ok=True)
-            if detailed_download == 'on':
-                print(f"📁 Created: {name} -> {path}")
+            exec((SCRIPTS / data_file).read_text(), scope)
         except Exception as e:
-            print(f"⚠️ Could not create {name} directory: {e}")
+            print(f"⚠️ Could not load {data_file}: {e}")
+            continue
+        for list_name in ('model_list', 'vae_list', 'controlnet_list', 'lora_list'):
+            for name, entries in scope.get(list_name, {}).items():
+                data.setdefault(name, entries if isinstance(entries, list) else [entries])
+    return data
 
-print("✅ Directory setup complete")
+MODELS_DATA = load_models_data()
+
+def resolve_entries(selection):
+    """Data entries for a widget selection; unknown values are treated as raw URLs."""
+    return MODELS_DATA.get(selection) or [{'url': selection}]
 
 # ==================== ENHANCED MODEL DOWNLOADING ====================
 
-# Check if we should skip models for this WebUI type
-if MODULES_AVAILABLE and get_webui_category(UI) == 'face_swap':
-    print(f"🎭 {UI} is a face swap WebUI - skipping standard SD model downloads")
-    print("Models for face swapping have been configured during installation")
+# All transfers are queued and drained together by a worker pool (see DownloadManager);
+# with aria2c present, files go to one persistent RPC daemon instead of one process each.
+# The journal next to settings.json makes re-running this cell skip finished items.
+# Models live once in the content-addressed store; each WebUI folder only holds links to them.
+DOWNLOAD_ENGINE = 'aria2rpc' if shutil.which('aria2c') else 'auto'
+download_manager = DownloadManager(engine=DOWNLOAD_ENGINE, journal=DownloadJournal(),
+                                   store=get_store()) if MODULES_AVAILABLE else None
+
+# Early launch: only the checkpoint, its VAE and the extensions must be on disk before
+# launch.py may start; LoRA / embeddings / ControlNet keep downloading in the background
+# and show up after a refresh in the WebUI. Progress is published under DOWNLOADS in settings.
+BACKGROUND_KINDS = ('lora', 'embed', 'control')
+background_manager = (DownloadManager(engine=DOWNLOAD_ENGINE, journal=download_manager.journal,
+                                      store=get_store())
+                      if MODULES_AVAILABLE and early_launch else download_manager)
+
+# Extension clones wait for the WebUI checkout but not for the models, so they get their
+# own manager (and progress bus) to run alongside the critical downloads
+extension_manager = (DownloadManager(engine=DOWNLOAD_ENGINE, journal=download_manager.journal,
+                                     store=get_store(), bus=ProgressBus())
+                     if MODULES_AVAILABLE else None)
+
+def set_download_status(**fields):
+    """Record download phase states (critical / background) for launch.py."""
+    try:
+        for key, value in {**fields, 'updated_at': time.time()}.items():
+            js.save(SETTINGS_PATH, f'DOWNLOADS.{key}', value)
+    except Exception as e:
+        print(f"⚠️ Could not save download status: {e}")
+
+# What launch.py waits for: the checkpoint / component downloads and a launchable WebUI
+# (checkout + requirements). Extensions and background downloads are not part of it.
+CRITICAL_PARTS = ('downloads', 'webui')
+_critical = {}
+_critical_lock = threading.Lock()
+
+def critical_done(part, ok, failed=0):
+    """Record one critical part; the status flips as soon as the last one is in, not when the cell ends."""
+    with _critical_lock:
+        _critical[part] = (ok, failed)
+        if set(_critical) != set(CRITICAL_PARTS) or not MODULES_AVAILABLE:
+            return
+        ok = all(done for done, _ in _critical.values())
+        failed = sum(count for _, count in _critical.values())
+    set_download_status(critical='ready' if ok else 'failed', critical_failed=failed)
+
+def queue_models():
+    """Link stored models into this WebUI and queue the selected checkpoints."""
+    if MODULES_AVAILABLE:
+        # Switching WebUI: link everything already in use by another UI into this one's folders
+        linked_views = get_store().populate(UI, Path(WEBUI))
+        if linked_views:
+            print(f"🔗 Linked {sum(map(len, linked_views.values()))} stored models into {UI}")
     
-elif model and model != ['none'] and model[0] != 'none':
-    print(f"📦 Processing model downloads...")
+    # Check if we should skip models for this WebUI type
+    if MODULES_AVAILABLE and get_webui_category(UI) == 'face_swap':
+        print(f"🎭 {UI} is a face swap WebUI - skipping standard SD model downloads")
+        print("Models for face swapping have been configured during installation")
     
-    # Enhanced model downloading with WebUI awareness
-    for model_item in model:
-        if model_item and model_item != 'none':
-            try:
-                print(f"📥 Downloading model: {model_item}")
-                # Use appropriate download method
-                if MODULES_AVAILABLE:
-                    # Use enhanced download method
-                    download_path = PREFIX_MAP['model'][0]
-                    m_download(f"{model_item} {download_path}")
-                else:
-                    # Fallback download method
-                    subprocess.run(['wget', '-P', PREFIX_MAP['model'][0], model_item], check=False)
-                    
-                print(f"✅ Model downloaded: {model_item}")
-            except Exception as e:
-                print(f"⚠️ Model download failed for {model_item}: {e}")
-else:
-    print("📦 No models selected for download")
+    elif model and model != ['none'] and model[0] != 'none':
+        print(f"📦 Processing model downloads...")
+    
+        # Enhanced model downloading with WebUI awareness
+        for model_item in model:
+            if model_item and model_item != 'none':
+                try:
+                    if MODULES_AVAILABLE:
+                        # Queue for the enhanced download manager (verified against sha256 when published)
+                        for entry in resolve_entries(model_item):
+                            download_manager.add_download(entry['url'], Path(PREFIX_MAP['model'][0]),
+                                                          entry.get('name'), entry.get('sha256'), 'model')
+                        print(f"📥 Queued model: {model_item}")
+                    else:
+                        # Fallback download method
+                        print(f"📥 Downloading model: {model_item}")
+                        subprocess.run(['wget', '-P', PREFIX_MAP['model'][0], model_item], check=False)
+                        print(f"✅ Model downloaded: {model_item}")
+                except Exception as e:
+                    print(f"⚠️ Model download failed for {model_item}: {e}")
+    else:
+        print("📦 No models selected for download")
 
 # ==================== ENHANCED COMPONENT DOWNLOADING ====================
 
@@ -363,30 +550,141 @@ def download_components(component_type, component_list, prefix_key):
     for item in component_list:
         if item and item != 'none':
             try:
-                print(f"📥 Downloading {component_type}: {item}")
                 download_path = PREFIX_MAP[prefix_key][0]
                 
                 if MODULES_AVAILABLE:
+                    background = prefix_key in BACKGROUND_KINDS and background_manager is not download_manager
+                    manager = background_manager if background else download_manager
                     if component_type == 'extension':
-                        m_clone(f"{item} {download_path}")
+                        manager = extension_manager
+                        # Each extension gets its own checkout inside the extensions folder
+                        repo_name = Path(item.rstrip('/')).name.removesuffix('.git')
+                        manager.add_clone(item, Path(download_path) / repo_name)
                     else:
-                        m_download(f"{item} {download_path}")
+                        for entry in resolve_entries(item):
+                            manager.add_download(entry['url'], Path(download_path),
+                                                 entry.get('name'), entry.get('sha256'), prefix_key)
+                    print(f"📥 Queued {component_type}: {item}" + (" (background)" if background else ""))
                 else:
                     # Fallback method
+                    print(f"📥 Downloading {component_type}: {item}")
                     if item.startswith('http'):
                         subprocess.run(['wget', '-P', download_path, item], check=False)
-                    
-                print(f"✅ {component_type.title()} downloaded: {item}")
+                    print(f"✅ {component_type.title()} downloaded: {item}")
                 
             except Exception as e:
                 print(f"⚠️ {component_type.title()} download failed for {item}: {e}")
 
-# Download all component types
-download_components('vae', [vae] if vae != 'none' else [], 'vae')
-download_components('lora', lora, 'lora')
-download_components('embed', embed, 'embed')
-download_components('extension', extension, 'extension')
-download_components('control', control, 'control')
+def queue_components():
+    """Queue VAE, LoRA, embeddings and ControlNet (extensions are cloned in their own phase)."""
+    download_components('vae', [vae] if vae != 'none' else [], 'vae')
+    download_components('lora', lora, 'lora')
+    download_components('embed', embed, 'embed')
+    download_components('control', control, 'control')
+
+def run_manager(manager, label):
+    """
+    Drain a manager's queue concurrently (global, per-host and per-lane limits apply)
+    
+    A disk-space preflight runs first so a batch that can't fit fails before any transfer starts.
+    """
+    if not (manager and manager.queue):
+        return {'completed': 0, 'failed': 0, 'skipped': 0}
+    try:
+        results = manager.process_queue(show_progress=detailed_download == 'on', parallel=True, preflight=True)
+    except DiskSpaceError as e:
+        print(f"❌ {e.strerror}: free up space (e.g. with the auto-cleaner) and re-run this cell")
+        for fs in e.plan['filesystems']:
+            print(f"  💾 {fs['path']}: need {fs['needed'] / 1024**3:.2f} GB, free {fs['free'] / 1024**3:.2f} GB")
+        return False
+    print(f"📊 {label}: {results['completed']} completed, {results['failed']} failed, "
+          f"{results['skipped']} already done in {results.get('duration', 0):.1f}s")
+    return results
+
+def download_critical():
+    try:
+        queue_models()
+        queue_components()
+        results = run_manager(download_manager, 'Transfers')
+    except Exception:
+        critical_done('downloads', False)
+        raise
+    critical_done('downloads', results is not False, results['failed'] if results else 0)
+    return results
+
+def install_user_extensions():
+    download_components('extension', extension, 'extension')
+    return run_manager(extension_manager, 'Extensions')
+
+def precompile_trees():
+    """Byte-compile the WebUI (extensions / custom nodes included) and its venv layers on all cores."""
+    venv = venv_layers.active_venv(VENV, UI)
+    trees = [Path(WEBUI), *precompile.site_packages(venv), *(precompile.site_packages(VENV) if venv != VENV else [])]
+    extensions = webui_settings.get('extension_dir')
+    if extensions and not Path(extensions).is_relative_to(WEBUI):
+        trees.append(Path(extensions))
+    compiled = precompile.compile_trees(precompile.interpreter(venv), trees)
+    errors = f", {compiled['errors']} files with syntax errors" if compiled['errors'] else ''
+    print(f"⚙️ Precompiled {len(compiled['paths'])} trees in {compiled['seconds']:.1f}s{errors}")
+    return compiled['ok']
+
+def on_background_finish(results):
+    if results is None:
+        set_download_status(background='failed', background_pending=0)
+        return
+    set_download_status(background='done', background_pending=0, background_failed=results['failed'])
+    print(f"\n📥 Background downloads finished: {results['completed']} completed, {results['failed']} failed "
+          f"in {results['duration']:.1f}s - refresh the LoRA / ControlNet lists in the WebUI")
+
+def start_background_downloads():
+    if background_manager is not download_manager and background_manager.queue:
+        pending = len(background_manager.queue)
+        set_download_status(background='running', background_pending=pending)
+        background_manager.process_in_background(on_finish=on_background_finish)
+        print(f"🔄 {pending} LoRA / embedding / ControlNet downloads continue in the background - you can launch now")
+    elif MODULES_AVAILABLE:
+        set_download_status(background='done', background_pending=0)
+
+# ==================== SETUP PIPELINE ====================
+
+# Phases start as soon as what they need is done: pip (CPU), the WebUI download (network /
+# disk) and the checkpoint downloads (network) overlap instead of running back to back.
+# Model folders are created first; the installer then merges the WebUI around them. The
+# WebUI's requirements go into an overlay on the base venv, so they wait for both.
+pipeline = PhasePipeline()
+pipeline.add('venv', setup_venv, resource='cpu')
+pipeline.add('directories', create_directories, resource='disk')
+pipeline.add('webui', install_webui, after=['directories'], resource='network')
+pipeline.add('webui-requirements', install_webui_requirements, after=['webui', 'venv'], resource='cpu')
+pipeline.add('downloads', download_critical, after=['directories'], resource='network')
+pipeline.add('extensions', install_user_extensions, after=['webui'], resource='network')
+pipeline.add('background', start_background_downloads, after=['downloads'], resource='network')
+if MODULES_AVAILABLE and precompile_bytecode:
+    # Spare CPU while checkpoints download: the first launch no longer compiles thousands of modules
+    pipeline.add('precompile', precompile_trees, after=['webui-requirements', 'extensions'], resource='cpu')
+
+if MODULES_AVAILABLE:
+    set_download_status(critical='running', pid=os.getpid())
+phases = {}
+try:
+    phases = pipeline.run()
+finally:
+    # Normally set by critical_done() already; this covers an interrupt / error or a part that
+    # was skipped (e.g. no requirements phase after a failed venv): launch.py must never wait
+    # for a cell that is gone
+    if MODULES_AVAILABLE and set(_critical) != set(CRITICAL_PARTS):
+        for part in CRITICAL_PARTS:
+            if part not in _critical:
+                critical_done(part, False)
+
+if phases['venv']['status'] != 'done':
+    print("❌ Virtual environment setup failed, but continuing...")
+
+for line in pipeline.summary():
+    print(line)
+if MODULES_AVAILABLE:
+    for line in pip_profiler.summary():
+        print(line)
 
 # ==================== FINAL SETUP ====================
 
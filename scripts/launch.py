@@ -3,13 +3,19 @@
 import os
 import sys
 import subprocess
+import hashlib
+import json
 import time
+import socket
+import threading
 from pathlib import Path
 from IPython import get_ipython
 
 # Safe import with comprehensive fallbacks
 try:
     from webui_utils import get_webui_features, get_launch_script, get_webui_category
+    from venv_layers import active_venv
+    from extension_lock import COMMIT_MARKER
     import json_utils as js
     MODULES_AVAILABLE = True
     print("✅ Enhanced launch modules loaded")
@@ -20,6 +26,8 @@ except ImportError as e:
     def get_webui_features(ui): return {'launch_script': 'launch.py', 'category': 'standard_sd'}
     def get_launch_script(ui): return 'launch.py'
     def get_webui_category(ui): return 'standard_sd'
+    def active_venv(base, ui): return base
+    COMMIT_MARKER = '.anxety-commit'
     class js:
         @staticmethod
         def read(path, key, default=None): return default
@@ -56,6 +64,8 @@ try:
     commandline_arguments = settings.get('WIDGETS', {}).get('commandline_arguments', '')
     theme_accent = settings.get('WIDGETS', {}).get('theme_accent', 'anxety')
     detailed_download = settings.get('WIDGETS', {}).get('detailed_download', 'off')
+    fast_relaunch = settings.get('WIDGETS', {}).get('fast_relaunch', True)
+    EXTS = Path(settings.get('WEBUI', {}).get('extension_dir') or Path(WEBUI) / 'extensions')
     
     print(f"✅ Launch settings loaded for WebUI: {UI}")
     
@@ -67,71 +77,89 @@ except Exception as e:
     commandline_arguments = '--listen --enable-insecure-extension-access --theme dark'
     theme_accent = 'anxety'
     detailed_download = 'off'
+    fast_relaunch = True
+    EXTS = Path(WEBUI) / 'extensions'
 
 # ENHANCED: WebUI-specific launch configurations
+# skip_args: flags that skip the WebUI's own environment preparation (pip checks, repo clones,
+# requirement verification) on a fast relaunch; '' for WebUIs without such a step
 WEBUI_LAUNCH_CONFIGS = {
     'A1111': {
         'script': 'launch.py',
         'args_prefix': '',
         'supports_themes': True,
-        'pre_launch_setup': 'setup_gradio_webui'
+        'pre_launch_setup': 'setup_gradio_webui',
+        'skip_args': '--skip-prepare-environment --skip-install --skip-version-check'
     },
     'ComfyUI': {
         'script': 'main.py', 
         'args_prefix': '',
         'supports_themes': False,
-        'pre_launch_setup': 'setup_comfyui'
+        'pre_launch_setup': 'setup_comfyui',
+        'skip_args': ''
     },
     'Classic': {
         'script': 'launch.py',
         'args_prefix': '',
         'supports_themes': True,
-        'pre_launch_setup': 'setup_gradio_webui'
+        'pre_launch_setup': 'setup_gradio_webui',
+        'skip_args': '--skip-prepare-environment --skip-install --skip-version-check'
     },
     'Lightning.ai': {
         'script': 'launch.py',
         'args_prefix': '',
         'supports_themes': True,
-        'pre_launch_setup': 'setup_gradio_webui'
+        'pre_launch_setup': 'setup_gradio_webui',
+        'skip_args': '--skip-prepare-environment --skip-install --skip-version-check'
     },
     'Forge': {
         'script': 'launch.py',
         'args_prefix': '',
         'supports_themes': True,
-        'pre_launch_setup': 'setup_forge'
+        'pre_launch_setup': 'setup_forge',
+        'skip_args': '--skip-prepare-environment --skip-install --skip-version-check'
     },
     'ReForge': {
         'script': 'launch.py',
         'args_prefix': '',
         'supports_themes': True,
-        'pre_launch_setup': 'setup_forge'
+        'pre_launch_setup': 'setup_forge',
+        'skip_args': '--skip-prepare-environment --skip-install --skip-version-check'
     },
     'SD-UX': {
         'script': 'launch.py',
         'args_prefix': '',
         'supports_themes': True,
-        'pre_launch_setup': 'setup_gradio_webui'
+        'pre_launch_setup': 'setup_gradio_webui',
+        'skip_args': '--skip-prepare-environment --skip-install --skip-version-check'
     },
     'FaceFusion': {
         'script': 'run.py',
         'args_prefix': 'python -m facefusion',
         'supports_themes': False,
-        'pre_launch_setup': 'setup_facefusion'
+        'pre_launch_setup': 'setup_facefusion',
+        'skip_args': ''
     },
     'RoopUnleashed': {
         'script': 'run.py',
         'args_prefix': 'python',
         'supports_themes': False,
-        'pre_launch_setup': 'setup_roop'
+        'pre_launch_setup': 'setup_roop',
+        'skip_args': ''
     },
     'DreamO': {
         'script': 'app.py',
         'args_prefix': 'python',
         'supports_themes': False,
-        'pre_launch_setup': 'setup_dreamo'
+        'pre_launch_setup': 'setup_dreamo',
+        'skip_args': ''
     }
 }
 
+# Per-WebUI fingerprint of the environment its server last came up with (see FAST RELAUNCH)
+LAUNCH_STATE = HOME / '.anxety-launch.json'
+DEFAULT_PORTS = {'ComfyUI': 8188}           # everything else is Gradio's 7860
+
 # ==================== ENHANCED ENVIRONMENT SETUP ====================
 
 def setup_environment():
@@ -151,9 +179,11 @@ def setup_environment():
         print(f"⚠️ Matplotlib setup warning: {e}")
     
     # FIXED: Comprehensive venv detection and activation
+    # (the WebUI's overlay on top of the shared base venv, if the installer created one)
+    venv = active_venv(VENV, UI)
     venv_python_paths = [
-        VENV / 'bin' / 'python',      # Linux/Mac
-        VENV / 'Scripts' / 'python.exe'  # Windows
+        venv / 'bin' / 'python',      # Linux/Mac
+        venv / 'Scripts' / 'python.exe'  # Windows
     ]
     
     venv_python = None
@@ -163,7 +193,7 @@ def setup_environment():
             break
     
     if not venv_python:
-        print(f"❌ Virtual environment not found at {VENV}")
+        print(f"❌ Virtual environment not found at {venv}")
         print("Please run the downloading cell first to create the virtual environment.")
         return False
     
@@ -173,20 +203,58 @@ def setup_environment():
     venv_bin = venv_python.parent
     current_path = os.environ.get('PATH', '')
     
-    # Update PATH to prioritize venv
-    if str(venv_bin) not in current_path:
-        os.environ['PATH'] = f"{venv_bin}{os.pathsep}{current_path}"
+    # Update PATH to prioritize venv (an overlay's console scripts first, then the base ones)
+    for bin_dir in ([VENV / 'bin'] if venv != VENV else []) + [venv_bin]:
+        if str(bin_dir) not in current_path.split(os.pathsep):
+            current_path = f"{bin_dir}{os.pathsep}{current_path}"
+    os.environ['PATH'] = current_path
     
     # Set virtual environment variables
-    os.environ['VIRTUAL_ENV'] = str(VENV)
+    os.environ['VIRTUAL_ENV'] = str(venv)
     
     # Remove PYTHONHOME if set (can interfere with venv)
     if 'PYTHONHOME' in os.environ:
         del os.environ['PYTHONHOME']
     
-    print(f"✅ Virtual environment activated: {VENV}")
+    print(f"✅ Virtual environment activated: {venv}" + (f" (overlay on {VENV})" if venv != VENV else ''))
+    return True
+
+def _critical_running(status, stale_after=600):
+    """
+    A 'running' critical status only counts while its writer is alive in this kernel
+
+    A status from another process (a previous kernel) or one not updated for stale_after
+    seconds is left over from an interrupted / crashed downloading cell.
+    """
+    if status.get('critical') != 'running':
+        return False
+    if status.get('pid') != os.getpid() or time.time() - status.get('updated_at', 0) > stale_after:
+        print(f"{COL.Y}⚠️ Ignoring a stale 'downloads running' status from an interrupted downloading cell{COL.X}")
+        status['critical'] = 'failed'
+        return False
     return True
 
+def wait_for_critical_downloads(timeout=3600, interval=2):
+    """Block until the downloading cell reports the critical set (checkpoint, VAE, extensions) ready."""
+    
+    status = js.read(SETTINGS_PATH, 'DOWNLOADS') or {}
+    if _critical_running(status):
+        print(f"⏳ Waiting for the checkpoint / VAE / extension downloads to finish...")
+        deadline = time.time() + timeout
+        while _critical_running(status) and time.time() < deadline:
+            time.sleep(interval)
+            status = js.read(SETTINGS_PATH, 'DOWNLOADS') or {}
+    
+    if status.get('critical') == 'failed':
+        print(f"{COL.Y}⚠️ Critical downloads failed - {UI} will start without them{COL.X}")
+    elif status.get('critical_failed'):
+        print(f"{COL.Y}⚠️ {status['critical_failed']} critical downloads failed{COL.X}")
+    
+    if status.get('background') == 'running' and status.get('pid') == os.getpid():
+        print(f"🔄 {status.get('background_pending', 0)} LoRA / embedding / ControlNet downloads are still "
+              f"running in the background; refresh their lists in the WebUI once they finish")
+    return status.get('critical') != 'running'
+
 # ==================== WEBUI-SPECIFIC SETUP FUNCTIONS ====================
 
 def setup_gradio_webui():
@@ -288,9 +356,119 @@ def setup_dreamo():
     
     return True
 
+# ==================== FAST RELAUNCH ====================
+
+def _git_head(repo):
+    """Commit checked out in repo, read from .git without spawning git ('' if it is no checkout)."""
+    git = Path(repo) / '.git'
+    try:
+        if git.is_file():
+            # Submodules / worktrees: .git is a "gitdir: <path>" pointer
+            git = Path(repo) / git.read_text().split(':', 1)[1].strip()
+        head = (git / 'HEAD').read_text().strip()
+        if not head.startswith('ref: '):
+            return head
+        ref = head[5:]
+        if (git / ref).is_file():
+            return (git / ref).read_text().strip()
+        for line in (git / 'packed-refs').read_text().splitlines():
+            if line.endswith(f" {ref}"):
+                return line.split()[0]
+    except (OSError, IndexError):
+        pass
+    return ''
+
+def _extension_commit(ext):
+    """Commit of an extension: git HEAD, or the pinned commit of a tarball install."""
+    marker = ext / COMMIT_MARKER
+    if marker.is_file():
+        return (marker.read_text().split() or [''])[0]
+    return _git_head(ext) or str(ext.stat().st_mtime_ns)
+
+def launch_fingerprint():
+    """
+    Hash of everything the WebUI's environment preparation would act on
+
+    Installed distributions of the overlay and base venv (names + versions from the
+    *.dist-info folders, no imports), the WebUI commit, the extension set with their
+    commits, and the launch arguments (e.g. --xformers makes A1111 install xformers).
+    """
+    digest = hashlib.sha256(f"{UI}\0{commandline_arguments}".encode())
+    for venv in dict.fromkeys([active_venv(VENV, UI), VENV]):
+        for site_packages in sorted(venv.glob('lib/python*/site-packages')):
+            installed = sorted(p.name for pattern in ('*.dist-info', '*.egg-info', '*.egg-link')
+                               for p in site_packages.glob(pattern))
+            digest.update('\0'.join(installed).encode())
+    digest.update(f"\0webui:{_git_head(WEBUI)}".encode())
+    if EXTS.is_dir():
+        for ext in sorted(p for p in EXTS.iterdir() if p.is_dir()):
+            digest.update(f"\0ext:{ext.name}:{_extension_commit(ext)}".encode())
+    return digest.hexdigest()[:16]
+
+def _load_launch_state():
+    try:
+        return json.loads(LAUNCH_STATE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+def is_relaunch(fingerprint):
+    """True if the WebUI's server last came up with exactly this environment."""
+    return _load_launch_state().get(UI, {}).get('fingerprint') == fingerprint
+
+def remember_launch(fingerprint):
+    state = _load_launch_state()
+    state[UI] = {'fingerprint': fingerprint, 'launched_at': time.time()}
+    try:
+        tmp = LAUNCH_STATE.with_name(LAUNCH_STATE.name + '.tmp')
+        tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+        os.replace(tmp, LAUNCH_STATE)
+    except OSError:
+        pass
+
+def server_port():
+    args = commandline_arguments.split()
+    for flag in ('--port', '--listen-port'):
+        if flag in args[:-1]:
+            try:
+                return int(args[args.index(flag) + 1])
+            except ValueError:
+                pass
+    return DEFAULT_PORTS.get(UI, 7860)
+
+def remember_when_ready(stopped, interval=2.0):
+    """
+    Record the launch fingerprint once the server accepts connections
+
+    By then the WebUI's environment preparation has finished, so whatever it installed
+    is part of the baseline - and a server later stopped from the notebook (the usual
+    way out) still counts as a successful preparation.
+    """
+    def listening(port):
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    port = server_port()
+    if listening(port):
+        return                                  # something else holds the port: can't tell when ours is up
+    while not stopped.wait(interval):
+        if listening(port):
+            remember_launch(launch_fingerprint())
+            return
+
+def get_skip_args():
+    """The WebUI's skip flags if nothing changed since its server last came up, else ''."""
+    config = WEBUI_LAUNCH_CONFIGS.get(UI, WEBUI_LAUNCH_CONFIGS['A1111'])
+    skip_args = [arg for arg in config.get('skip_args', '').split() if arg not in commandline_arguments.split()]
+    if not fast_relaunch or not skip_args or not is_relaunch(launch_fingerprint()):
+        return ''
+    return ' '.join(skip_args)
+
 # ==================== LAUNCH LOGIC ====================
 
-def get_launch_command():
+def get_launch_command(extra_args=''):
     """Get the proper launch command with WebUI-aware configuration."""
     
     # Get WebUI configuration
@@ -298,10 +476,11 @@ def get_launch_command():
     script = config['script']
     args_prefix = config.get('args_prefix', '')
     
-    # Determine the correct python executable
+    # Determine the correct python executable (WebUI overlay first, then the base venv)
+    venv = active_venv(VENV, UI)
     venv_python_paths = [
-        VENV / 'bin' / 'python',      # Linux/Mac
-        VENV / 'Scripts' / 'python.exe'  # Windows
+        venv / 'bin' / 'python',      # Linux/Mac
+        venv / 'Scripts' / 'python.exe'  # Windows
     ]
     
     venv_python = None
@@ -319,9 +498,9 @@ def get_launch_command():
         if 'python' in args_prefix and str(venv_python) not in args_prefix:
             # Replace 'python' in args_prefix with venv python path
             args_prefix = args_prefix.replace('python', f'"{venv_python}"')
-        full_command = f'{args_prefix} {script} {commandline_arguments}'
+        full_command = f'{args_prefix} {script} {commandline_arguments} {extra_args}'
     else:
-        full_command = f'"{venv_python}" {script} {commandline_arguments}'
+        full_command = f'"{venv_python}" {script} {commandline_arguments} {extra_args}'
     
     return full_command.strip()
 
@@ -442,22 +621,26 @@ def main():
         print("❌ Failed to set up environment. Aborting launch.")
         return False
     
-    # Step 2: Validate WebUI installation
+    # Step 2: Only the critical downloads have to be on disk; the rest streams in while running
+    if not wait_for_critical_downloads():
+        print("⚠️ Critical downloads still running after the wait limit, launching anyway...")
+    
+    # Step 3: Validate WebUI installation
     if not validate_webui_installation():
         print("❌ WebUI validation failed. Aborting launch.")
         return False
     
-    # Step 3: Run pre-launch setup
+    # Step 4: Run pre-launch setup
     if not run_pre_launch_setup():
         print("⚠️ Pre-launch setup had issues, but continuing...")
     
-    # Step 4: Apply WebUI-specific fixes
+    # Step 5: Apply WebUI-specific fixes
     try:
         apply_webui_specific_fixes()
     except Exception as e:
         print(f"⚠️ Could not apply WebUI fixes: {e}")
     
-    # Step 5: Change to WebUI directory
+    # Step 6: Change to WebUI directory
     try:
         os.chdir(WEBUI)
         print(f"📁 Changed to WebUI directory: {WEBUI}")
@@ -465,11 +648,14 @@ def main():
         print(f"❌ Could not change to WebUI directory: {e}")
         return False
     
-    # Step 6: Build and execute launch command
+    # Step 7: Build and execute launch command
     try:
-        launch_command = get_launch_command()
+        skip_args = get_skip_args()
+        launch_command = get_launch_command(skip_args)
         print(f"\n🚀 {COL.Y}Launching {UI}...{COL.X}")
         print(f"📋 Command: {COL.C}{launch_command}{COL.X}")
+        if skip_args:
+            print(f"⚡ Environment unchanged since the last run - skipping {UI}'s environment preparation")
         
         if detailed_download == 'on':
             print(f"🔍 Launch arguments: {commandline_arguments}")
@@ -478,8 +664,14 @@ def main():
         print(f"\n{COL.G}🎉 Starting {UI} WebUI...{COL.X}")
         print(f"{COL.Y}⏳ This may take a few moments to load...{COL.X}")
         
-        # Execute the launch command
-        result = os.system(launch_command)
+        # Execute the launch command (the fingerprint is taken once the server is up)
+        stopped = threading.Event()
+        if fast_relaunch:
+            threading.Thread(target=remember_when_ready, args=(stopped,), daemon=True).start()
+        try:
+            result = os.system(launch_command)
+        finally:
+            stopped.set()
         
         if result == 0:
             print(f"\n{COL.G}✅ {UI} launched successfully!{COL.X}")
@@ -63,6 +63,7 @@ HOME = detect_platform_home()
 SCR_PATH = HOME / 'ANXETY'
 SETTINGS_PATH = SCR_PATH / 'settings.json'
 VENV_PATH = HOME / 'venv'
+CACHE_PATH = HOME / '.cache' / 'ANXETY'     # persistent caches (file hashes, ...)
 MODULES_FOLDER = SCR_PATH / "modules"
 
 print(f"🏠 Home directory: {HOME}")
@@ -73,7 +74,8 @@ os.environ.update({
     'home_path': str(HOME),
     'scr_path': str(SCR_PATH),
     'venv_path': str(VENV_PATH),
-    'settings_path': str(SETTINGS_PATH)
+    'settings_path': str(SETTINGS_PATH),
+    'cache_path': str(CACHE_PATH)
 })
 
 # GitHub configuration
@@ -96,14 +98,20 @@ FILE_STRUCTURE = {
     'CSS': ['main-widgets.css', 'download-result.css', 'auto-cleaner.css'],
     'JS': ['main-widgets.js'],
     'modules': [
-        'json_utils.py', 'webui_utils.py', 'widget_factory.py',
+        'json_utils.py', 'webui_utils.py', 'widget_factory.py', 'http_utils.py',
+        'aria2_rpc.py', 'hash_cache.py', 'download_journal.py', 'model_store.py',
+        'progress_bus.py', 'archive_utils.py', 'git_cache.py', 'extension_lock.py',
+        'phase_pipeline.py', 'venv_snapshot.py', 'venv_layers.py', 'pip_utils.py',
+        'pip_profiler.py', 'precompile.py', 'range_downloader.py',
         'CivitaiAPI.py', 'Manager.py', 'TunnelHub.py', '_season.py'
     ],
     'scripts': [
         'widgets-en.py', 'downloading-en.py', 'webui-installer.py',
         'launch.py', 'download-result.py', 'auto-cleaner.py',
         '_models-data.py', '_xl-models-data.py', 'setup.py',
-        'requirements.txt'
+        'requirements.txt', 'requirements_forge.txt', 'requirements_reforge.txt',
+        'requirements_sd-ux.txt', 'requirements_sd_ux.txt', 'requirements_facefusion.txt',
+        'requirements_roopunleashed.txt', 'requirements_dreamo.txt'
     ],
     '__configs__': {
         'A1111': ['_extensions.txt', 'config.json', 'ui-config.json'],
@@ -187,6 +195,7 @@ def create_environment_data(env, lang, fork_user, fork_repo, branch):
             "scr_path": str(SCR_PATH),
             "venv_path": str(VENV_PATH),
             "settings_path": str(SETTINGS_PATH),
+            "cache_path": str(CACHE_PATH),
             "start_timer": start_timer,
             "public_ip": "",
             "civitai_api_token": CIVITAI_API_TOKEN
@@ -315,10 +324,12 @@ async def download_repository_files(fork_user: str, fork_repo: str, branch: str,
     print(f"📥 Downloading {len(file_list)} files from repository...")
     print(f"📍 Repository: {fork_user}/{fork_repo} (branch: {branch})")
     
-    # Configure session with proper timeouts
+    # Configure session with proper timeouts. modules/http_utils.py is one of the files
+    # being fetched here, so this bootstrap keeps its own session, pooled the same way.
     timeout = aiohttp.ClientTimeout(total=30, connect=10)
+    connector = aiohttp.TCPConnector(limit_per_host=16, keepalive_timeout=60, ttl_dns_cache=300)
     
-    async with aiohttp.ClientSession(timeout=timeout) as session:
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
         # Download files with progress tracking
         with tqdm(total=len(file_list), desc="Downloading", unit="file") as pbar:
             results = {"success": 0, "failed": 0, "errors": []}
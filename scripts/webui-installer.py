@@ -6,18 +6,32 @@ from IPython import get_ipython
 from pathlib import Path
 import subprocess
 import asyncio
+import shutil
+import time
+import sys
 import aiohttp
 import os
 
 # Safe import with fallbacks
 try:
     from Manager import m_download
+    import archive_utils as archive
+    import git_cache
+    import extension_lock
+    import venv_snapshot
+    import pip_utils
+    import venv_layers
+    import precompile
+    from webui_utils import is_webui_installed
+    import http_utils as http
     import json_utils as js
     MODULES_AVAILABLE = True
 except ImportError as e:
     print(f"Warning: Could not import custom modules: {e}")
     MODULES_AVAILABLE = False
     # Create fallback functions
+    def is_webui_installed(ui, webui_path):
+        return webui_path.exists() and any(webui_path.iterdir())
     def m_download(url_cmd): 
         parts = url_cmd.split()
         if len(parts) >= 2:
@@ -26,9 +40,20 @@ except ImportError as e:
         @staticmethod
         def read(path, key, default=None): 
             return default
+    class http:
+        _sessions = []
+        @staticmethod
+        def auth_headers(url): return {}
+        @classmethod
+        def get_async_session(cls):
+            cls._sessions.append(aiohttp.ClientSession())
+            return cls._sessions[-1]
+        @classmethod
+        async def close_async_session(cls):
+            while cls._sessions:
+                await cls._sessions.pop().close()
 
 osENV = os.environ
-CD = os.chdir
 ipySys = get_ipython().system
 ipyRun = get_ipython().run_line_magic
 
@@ -59,8 +84,6 @@ except Exception as e:
 REPO_URL = f"https://huggingface.co/NagisaNao/ANXETY/resolve/main/{UI}.zip"
 CONFIG_URL = f"https://raw.githubusercontent.com/{FORK_REPO}/{BRANCH}/__configs__"
 
-CD(HOME)
-
 # ENHANCED: Git-based WebUI Repository URLs
 WEBUI_REPOSITORIES = {
     'Forge': 'https://github.com/lllyasviel/stable-diffusion-webui-forge',
@@ -71,6 +94,17 @@ WEBUI_REPOSITORIES = {
     'DreamO': 'https://github.com/huggingface/diffusers'  # Custom DreamO implementation
 }
 
+# Clone profiles for git-based WebUIs (all optional; without one: --depth 1 --single-branch):
+#   filter - partial clone filter; blobs outside the sparse checkout are never downloaded.
+#            Ignored without `sparse`: a full checkout needs every blob of the commit anyway,
+#            and a blob-less clone fetches them in a second, lazy round trip
+#   sparse - cone-mode sparse checkout paths (top-level files are always included)
+#   ref    - branch, tag or commit to pin; cloned single-branch
+WEBUI_CLONE_PROFILES = {
+    'FaceFusion': {'filter': 'blob:none', 'sparse': ['facefusion']},
+    'DreamO': {'filter': 'blob:none', 'sparse': ['src']}
+}
+
 # ENHANCED: WebUI-specific requirements
 WEBUI_REQUIREMENTS = {
     'Forge': ['torch>=2.0.0', 'torchvision>=0.15.0', 'xformers'],
@@ -94,15 +128,15 @@ async def _download_file(url, directory=WEBUI, filename=None):
             file_path.unlink()
 
         timeout = aiohttp.ClientTimeout(total=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    with open(file_path, 'wb') as f:
-                        f.write(content)
-                    print(f"✅ Downloaded: {file_path.name}")
-                else:
-                    print(f"⚠️ Failed to download {url}: HTTP {response.status}")
+        session = http.get_async_session()
+        async with session.get(url, headers=http.auth_headers(url), timeout=timeout) as response:
+            if response.status == 200:
+                content = await response.read()
+                with open(file_path, 'wb') as f:
+                    f.write(content)
+                print(f"✅ Downloaded: {file_path.name}")
+            else:
+                print(f"⚠️ Failed to download {url}: HTTP {response.status}")
     except Exception as e:
         print(f"⚠️ Download error for {url}: {e}")
 
@@ -112,24 +146,24 @@ async def get_extensions_list():
 
     try:
         timeout = aiohttp.ClientTimeout(total=30)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(config_file) as response:
-                if response.status == 200:
-                    text = await response.text()
-                    urls = []
-                    for line in text.splitlines():
-                        line = line.strip()
-                        if line and not line.startswith('#'):
-                            # Handle lines with custom names or additional info
-                            if ' ' in line:
-                                url = line.split()[0]
-                            else:
-                                url = line
-                            if url.startswith('http'):
-                                urls.append(url)
-                    return urls
-                else:
-                    print(f"⚠️ Extensions config not found: HTTP {response.status}")
+        session = http.get_async_session()
+        async with session.get(config_file, timeout=timeout) as response:
+            if response.status == 200:
+                text = await response.text()
+                urls = []
+                for line in text.splitlines():
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        # Handle lines with custom names or additional info
+                        if ' ' in line:
+                            url = line.split()[0]
+                        else:
+                            url = line
+                        if url.startswith('http'):
+                            urls.append(url)
+                return urls
+            else:
+                print(f"⚠️ Extensions config not found: HTTP {response.status}")
     except Exception as e:
         print(f"⚠️ Could not fetch extensions list: {e}")
     
@@ -151,8 +185,103 @@ async def download_configuration():
     except Exception as e:
         print(f"⚠️ Configuration download issue: {e}")
 
-async def install_extensions():
-    """Install WebUI extensions with comprehensive error handling."""
+EXTENSION_CONCURRENCY = 8                # simultaneous extension clones / updates
+GIT_ENV = {**os.environ, 'GIT_TERMINAL_PROMPT': '0'}
+
+async def _git_async(*args, cwd=None, timeout=600):
+    """Run git without blocking the event loop; returns (returncode, stdout, stderr)."""
+    process = await asyncio.create_subprocess_exec(
+        'git', *args, cwd=str(cwd) if cwd else None, env=GIT_ENV,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        return 1, '', f"timed out after {timeout}s"
+    return process.returncode, stdout.decode().strip(), stderr.decode().strip()
+
+async def _resolve_lock(targets, semaphore, refresh=False):
+    """
+    Pin every extension to a commit in the UI's lockfile
+
+    Only entries that are new (or whose URL changed) are resolved with `git ls-remote`,
+    unless refresh is set, in which case every remote HEAD is re-read in one concurrent pass.
+    An extension already on disk whose remote can't be read (offline, rate-limited) is
+    pinned to the commit it holds.
+
+    Returns:
+        (lock, names kept at their installed commit for lack of a remote HEAD)
+    """
+    lock = extension_lock.load_lock(UI)
+    stale = {name: url for name, url in targets.items() if refresh or lock.get(name, {}).get('url') != url}
+
+    async def resolve(url):
+        async with semaphore:
+            code, remote, _ = await _git_async('ls-remote', url, 'HEAD', timeout=60)
+            return remote.split()[0] if code == 0 and remote else None
+
+    shas = await asyncio.gather(*(resolve(url) for url in stale.values()))
+    kept = set()
+    for (name, url), sha in zip(stale.items(), shas):
+        if not sha and (EXTS / name).exists():
+            sha = await asyncio.to_thread(extension_lock.installed_commit, EXTS / name)
+            kept.add(name)
+        if sha:
+            lock[name] = extension_lock.lock_entry(url, sha)
+    lock = {name: entry for name, entry in lock.items() if name in targets}
+    extension_lock.save_lock(UI, lock)
+    return lock, kept
+
+async def _clone_extension(ext_url, path):
+    if MODULES_AVAILABLE and await asyncio.to_thread(git_cache.clone, ext_url, path):
+        return None
+    code, _, stderr = await _git_async('clone', '--depth', '1', '--quiet', ext_url, str(path))
+    return None if code == 0 else stderr or f"git exited with {code}"
+
+async def _checkout_commit(path, sha):
+    code, _, stderr = await _git_async('fetch', '--depth', '1', '--quiet', 'origin', sha, cwd=path)
+    if code == 0:
+        code, _, stderr = await _git_async('reset', '--hard', '--quiet', 'FETCH_HEAD', cwd=path)
+    return None if code == 0 else stderr or f"git exited with {code}"
+
+async def _install_locked(name, ext_url, entry):
+    """Bring EXTS/name to the locked commit; returns (action, error)."""
+    path = EXTS / name
+    current = await asyncio.to_thread(extension_lock.installed_commit, path) if path.exists() else None
+    if current == entry['sha']:
+        return 'up to date', None
+    action = 'updated' if current else 'installed'
+
+    # A tarball install that has to move gets real git metadata first: from then on it
+    # updates incrementally, like a clone (and the WebUI's own extension updater works on it)
+    if current and not (path / '.git').exists():
+        await asyncio.to_thread(extension_lock.materialize_git, path)
+
+    # New installs: one HTTP archive instead of a git negotiation
+    if entry.get('archive') and not (path / '.git').exists():
+        try:
+            await asyncio.to_thread(extension_lock.install_tarball, entry, path)
+            return action, None
+        except Exception as e:
+            print(f"    ⚠️ Archive fetch failed for {name} ({e}), using git")
+
+    if not (path / '.git').exists():
+        shutil.rmtree(path, ignore_errors=True)
+        error = await _clone_extension(ext_url, path)
+        if error:
+            return 'failed', error
+    if await asyncio.to_thread(extension_lock.installed_commit, path) == entry['sha']:
+        return action, None
+    return action, await _checkout_commit(path, entry['sha'])
+
+async def install_extensions(refresh=None):
+    """
+    Install the UI's extensions at the commits pinned in its lockfile, EXTENSION_CONCURRENCY at a time.
+
+    refresh: re-resolve every extension to its current remote HEAD (defaults to the
+             'Update Extensions' setting).
+    """
     # Skip extensions for WebUIs that don't support them
     if UI in ['FaceFusion', 'RoopUnleashed', 'DreamO']:
         print(f"📦 Skipping extensions for {UI} (uses specialized modules)")
@@ -167,81 +296,180 @@ async def install_extensions():
     print(f"📦 Installing {len(extensions)} extensions...")
     
     EXTS.mkdir(parents=True, exist_ok=True)
-    CD(EXTS)
-
-    # Install extensions one by one with proper error handling
-    successful = 0
-    failed = 0
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(EXTENSION_CONCURRENCY)
+    targets = {Path(ext_url).name.removesuffix('.git'): ext_url for ext_url in extensions}
+    if refresh is None:
+        refresh = bool(js.read(SETTINGS_PATH, 'WIDGETS.latest_extensions'))
+    lock, kept = await _resolve_lock(targets, semaphore, refresh) if MODULES_AVAILABLE else ({}, set())
     
-    for ext_url in extensions:
-        try:
-            ext_name = Path(ext_url).name
-            print(f"  📥 Installing: {ext_name}")
-            
-            process = await asyncio.create_subprocess_shell(
-                f"git clone --depth 1 --quiet {ext_url}",
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                successful += 1
-                print(f"    ✅ {ext_name}")
+    async def install(name, ext_url):
+        async with semaphore:
+            started = time.time()
+            try:
+                if name in kept or (name not in lock and (EXTS / name).exists()):
+                    # Remote unreachable, but the working checkout stays usable
+                    action, error = 'kept', None
+                elif name in lock:
+                    action, error = await _install_locked(name, ext_url, lock[name])
+                else:
+                    action, error = 'cloned', await _clone_extension(ext_url, EXTS / name)
+            except Exception as e:
+                action, error = 'failed', str(e)
+            duration = time.time() - started
+            if error:
+                print(f"    ⚠️ Failed: {name} - {error.splitlines()[0]} ({duration:.1f}s)")
             else:
-                failed += 1
-                error_msg = stderr.decode().strip()
-                print(f"    ⚠️ Failed: {ext_name} - {error_msg}")
-                
-        except Exception as e:
-            failed += 1
-            print(f"    ❌ Error installing {ext_url}: {e}")
+                print(f"    ✅ {name} ({action}, {duration:.1f}s)")
+            return name, 'failed' if error else action, duration
     
-    print(f"✅ Extensions complete: {successful} successful, {failed} failed")
+    results = await asyncio.gather(*(install(name, url) for name, url in targets.items()))
+    
+    counts = {}
+    for _, action, _ in results:
+        counts[action] = counts.get(action, 0) + 1
+    summary = ', '.join(f"{count} {action}" for action, count in counts.items())
+    print(f"✅ Extensions complete in {time.time() - start_time:.1f}s: {summary}")
+    slowest = sorted(results, key=lambda result: -result[2])[:5]
+    print("⏱️ Slowest: " + ', '.join(f"{name} {duration:.1f}s" for name, _, duration in slowest))
 
 # =================== ENHANCED WEBUI INSTALLATION ===================
 
-def install_git_webui(ui_name, repo_url):
-    """Install WebUI from git repository with comprehensive setup."""
+def _git(*args, cwd=None):
+    return subprocess.run(['git', *args], cwd=cwd, capture_output=True, text=True, timeout=300)
+
+def clone_webui_repo(repo_url, destination, profile=None):
+    """Shallow clone honouring a WEBUI_CLONE_PROFILES entry; returns the failing CompletedProcess or None."""
+    profile = profile or {}
+    ref, sparse = profile.get('ref'), profile.get('sparse')
+    fetch_options = ['--depth', '1'] + ([f"--filter={profile['filter']}"] if sparse and profile.get('filter') else [])
+
+    if ref and len(ref) == 40 and all(c in '0123456789abcdef' for c in ref.lower()):
+        # Commit pin: fetch exactly that commit (GitHub serves reachable SHAs)
+        steps = [
+            ['init', '--quiet', str(destination)],
+            ['-C', str(destination), 'remote', 'add', 'origin', repo_url],
+            ['-C', str(destination), 'fetch', '--quiet', *fetch_options, 'origin', ref]
+        ]
+        if sparse:
+            steps.append(['-C', str(destination), 'sparse-checkout', 'set', '--cone', *sparse])
+        steps.append(['-C', str(destination), 'checkout', '--quiet', 'FETCH_HEAD'])
+    else:
+        branch = ['--single-branch', '--branch', ref] if ref else ['--single-branch']
+        sparse_option = ['--sparse'] if sparse else []
+        steps = [['clone', '--quiet', *fetch_options, *sparse_option, *branch, repo_url, str(destination)]]
+        if sparse:
+            steps.append(['-C', str(destination), 'sparse-checkout', 'set', '--cone', *sparse])
+
+    for step in steps:
+        result = _git(*step)
+        if result.returncode != 0:
+            return result
+    return None
+
+def _merge_into(staging, target):
+    """Move a finished staging tree to target, keeping folders created there meanwhile (e.g. model dirs)."""
+    if target.exists() and any(target.iterdir()):
+        # Same semantics as `unzip -o`: staged contents win over what is already there
+        shutil.copytree(staging, target, symlinks=True, dirs_exist_ok=True)
+        shutil.rmtree(staging)
+    else:
+        staging.replace(target)                  # rename(2) also replaces an empty directory
+
+def install_webui_requirements(ui_name):
+    """
+    Install everything the WebUI needs into its overlay venv with a single pip resolver run
+
+    Project-level requirements (scripts/requirements_<ui>.txt), WEBUI_REQUIREMENTS and the
+    repo's requirements.txt are merged into one plan. The overlay sits on the shared base venv,
+    so only the delta lands in it; an applied plan or a matching overlay snapshot skips pip.
+    """
+    req_file = WEBUI / 'requirements.txt'
+    if not MODULES_AVAILABLE:
+        args = [*WEBUI_REQUIREMENTS.get(ui_name, []), *(['-r', str(req_file)] if req_file.exists() else [])]
+        if args:
+            return subprocess.run(['pip', 'install', *args], cwd=WEBUI, capture_output=True, text=True).returncode == 0
+        return True
+    
+    plan = pip_utils.plan([*pip_utils.project_requirements(SCR_PATH / 'scripts', ui_name),
+                           WEBUI_REQUIREMENTS.get(ui_name, []), req_file], label=ui_name)
+    if not len(plan):
+        return True
+    
+    overlay = venv_layers.overlay_path(VENV, ui_name)
+    # An overlay snapshot only fits the exact plan on top of the exact base it was built on
+    key = venv_snapshot.fingerprint(packages=plan.lines(),
+                                    extra=[ui_name, venv_snapshot.installed_fingerprint(VENV) or ''])
+    with venv_snapshot.VenvLock(overlay):
+        start_time = time.time()
+        if not venv_layers.python_path(overlay) and venv_snapshot.restore(overlay, key):
+            print(f"♻️ Restored {ui_name} overlay snapshot {key} in {time.time() - start_time:.1f}s")
+        if not venv_layers.ensure_overlay(VENV, ui_name):
+            print(f"⚠️ Base venv {VENV} is not ready - skipping {ui_name} requirements")
+            return False
+        if pip_utils.is_applied(overlay, plan):
+            print(f"✅ {ui_name} requirements unchanged (plan {plan.digest()}, {len(plan)} packages) - skipping pip")
+            return True
+        
+        print(f"📦 Installing {len(plan)} {ui_name} requirements from {', '.join(plan.sources)} "
+              f"into overlay {overlay.name} in one resolver run...")
+        start_time = time.time()
+        result = pip_utils.install(plan, overlay, cwd=WEBUI)
+        if result.returncode != 0:
+            print(f"⚠️ Requirements install issues: {(result.stderr.strip().splitlines() or ['unknown error'])[-1]}")
+            return False
+        print(f"✅ Requirements installed in {time.time() - start_time:.1f}s")
+        
+        # Only a complete install becomes the snapshot the next session restores (with its .pyc files)
+        if js.read(SETTINGS_PATH, 'WIDGETS.precompile', True) is not False:
+            precompile.compile_venv(overlay)
+        start_time = time.time()
+        if venv_snapshot.save(overlay, key):
+            print(f"💾 Saved {ui_name} overlay snapshot {key} in {time.time() - start_time:.1f}s")
+    return True
+
+def install_requirements(ui_name):
+    """
+    Requirements step of a git WebUI, separate from the clone so the download cell can run
+    it once both the clone and the base venv are in place. A no-op for archive WebUIs.
+    """
+    if not is_git_based_webui(ui_name):
+        return True
+    if MODULES_AVAILABLE:
+        with venv_snapshot.VenvLock(VENV):
+            return install_webui_requirements(ui_name)
+    return install_webui_requirements(ui_name)
+
+def install_git_webui(ui_name, repo_url, with_requirements=True):
+    """
+    Install WebUI from git repository with comprehensive setup.
+
+    with_requirements: False leaves the pip step to a later install_requirements() call.
+    """
     print(f"🔧 Installing {ui_name} from git repository...")
     
     try:
         # Clone the repository
-        print(f"📥 Cloning {repo_url}...")
-        result = subprocess.run([
-            'git', 'clone', '--depth', '1', repo_url, str(WEBUI)
-        ], capture_output=True, text=True, timeout=300)
+        profile = WEBUI_CLONE_PROFILES.get(ui_name, {})
+        print(f"📥 Cloning {repo_url}..." + (f" (sparse: {', '.join(profile['sparse'])})" if profile.get('sparse') else ''))
+        start_time = time.time()
+        # Clone beside WEBUI: git refuses non-empty destinations, and the download cell
+        # may already be creating model folders in there concurrently
+        staging = HOME / f".{ui_name}.partial"
+        shutil.rmtree(staging, ignore_errors=True)
+        failed = clone_webui_repo(repo_url, staging, profile)
         
-        if result.returncode != 0:
-            print(f"❌ Git clone failed: {result.stderr}")
+        if failed is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+            print(f"❌ Git clone failed: {failed.stderr}")
             return False
+        _merge_into(staging, WEBUI)
         
-        CD(WEBUI)
-        
-        # Install WebUI-specific requirements
-        if ui_name in WEBUI_REQUIREMENTS:
-            requirements = WEBUI_REQUIREMENTS[ui_name]
-            print(f"📦 Installing {ui_name}-specific requirements...")
-            for req in requirements:
-                print(f"  📦 Installing {req}...")
-                result = subprocess.run([
-                    'pip', 'install', req
-                ], capture_output=True, text=True)
-                
-                if result.returncode != 0:
-                    print(f"⚠️ Failed to install {req}: {result.stderr}")
+        stats = dict(line.split(': ', 1) for line in _git('count-objects', '-vH', cwd=WEBUI).stdout.splitlines() if ': ' in line)
+        print(f"📊 Cloned in {time.time() - start_time:.1f}s (objects: {stats.get('size-pack', '?')})")
         
-        # Install from requirements.txt if available
-        req_file = WEBUI / 'requirements.txt'
-        if req_file.exists():
-            print(f"📦 Installing from requirements.txt...")
-            result = subprocess.run([
-                'pip', 'install', '-r', 'requirements.txt'
-            ], capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                print(f"⚠️ Requirements install issues: {result.stderr}")
+        if with_requirements:
+            install_requirements(ui_name)
         
         # Setup WebUI-specific environment
         setup_webui_environment(ui_name)
@@ -305,8 +533,27 @@ output:
         for folder in ['models/Stable-diffusion', 'models/VAE', 'models/Lora', 'embeddings', 'extensions']:
             (webui_path / folder).mkdir(parents=True, exist_ok=True)
 
+def stream_webui() -> bool:
+    """Extract the WebUI archive while it downloads into a staging folder, then move it into place."""
+    staging = HOME / f".{UI}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        start_time = time.time()
+        result = archive.stream_extract(REPO_URL, staging)
+    except Exception as e:
+        print(f"⚠️ Streaming extraction unavailable ({e}), downloading archive first")
+        shutil.rmtree(staging, ignore_errors=True)
+        return False
+
+    _merge_into(staging, WEBUI)
+    print(f"✅ {UI} extracted successfully ({result['files']} files in {time.time() - start_time:.1f}s, streamed)")
+    return True
+
 def unpack_webui():
     """Download and extract WebUI archive with enhanced error handling."""
+    if MODULES_AVAILABLE and stream_webui():
+        return True
+
     if not MODULES_AVAILABLE:
         print("⚠️ Manager module not available, using fallback download")
         import urllib.request
@@ -327,7 +574,11 @@ def unpack_webui():
     try:
         zip_path = HOME / f"{UI}.zip"
         if zip_path.exists():
-            ipySys(f"unzip -q -o {zip_path} -d {WEBUI} && rm -rf {zip_path}")
+            if MODULES_AVAILABLE:
+                archive.extract(zip_path, WEBUI)
+                zip_path.unlink()
+            else:
+                ipySys(f"unzip -q -o {zip_path} -d {WEBUI} && rm -rf {zip_path}")
             print(f"✅ {UI} extracted successfully")
             return True
         else:
@@ -364,7 +615,12 @@ def run_tagcomplete_tag_parser():
     parser_script = WEBUI / 'tagcomplete-tags-parser.py'
     if parser_script.exists():
         try:
-            ipyRun('run', str(parser_script))
+            # Own process, not %run: the installer may be running in a download-cell worker thread
+            env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [str(SCR_PATH / 'modules'), os.environ.get('PYTHONPATH')]))}
+            result = subprocess.run([sys.executable, str(parser_script)], cwd=WEBUI, env=env,
+                                    capture_output=True, text=True, timeout=600)
+            if result.returncode != 0:
+                raise RuntimeError((result.stderr.strip().splitlines() or ['unknown error'])[-1])
             print("✅ Tag parser executed")
         except Exception as e:
             print(f"⚠️ Tag parser execution failed: {e}")
@@ -379,10 +635,18 @@ def should_use_archive(ui_name):
     archive_webuis = ['A1111', 'ComfyUI', 'Classic', 'Lightning.ai']
     return ui_name in archive_webuis
 
+async def _download_models(models):
+    """Download (url, subdir) pairs concurrently over one pooled session."""
+    webui_path = Path(WEBUI)
+    try:
+        await asyncio.gather(*(_download_file(model_url, webui_path / model_dir) for model_url, model_dir in models))
+    except Exception as e:
+        print(f"⚠️ Model download failed: {e}")
+    finally:
+        await http.close_async_session()
+
 def download_webui_models(ui_name):
     """Download essential models for specialized WebUIs."""
-    webui_path = Path(WEBUI)
-    
     if ui_name == 'FaceFusion':
         print("📦 Downloading FaceFusion models...")
         models = [
@@ -390,13 +654,7 @@ def download_webui_models(ui_name):
             ('https://github.com/facefusion/facefusion-assets/releases/download/models/arcface_w600k_r50.onnx', 'models/face_analyser/')
         ]
         
-        for model_url, model_dir in models:
-            try:
-                model_path = webui_path / model_dir
-                model_path.mkdir(parents=True, exist_ok=True)
-                asyncio.run(_download_file(model_url, model_path))
-            except Exception as e:
-                print(f"⚠️ Model download failed: {e}")
+        asyncio.run(_download_models(models))
     
     elif ui_name == 'RoopUnleashed':
         print("📦 Downloading RoopUnleashed models...")
@@ -405,26 +663,24 @@ def download_webui_models(ui_name):
             ('https://github.com/TencentARC/GFPGAN/releases/download/v1.3.0/GFPGANv1.4.pth', 'models/gfpgan/')
         ]
         
-        for model_url, model_dir in models:
-            try:
-                model_path = webui_path / model_dir
-                model_path.mkdir(parents=True, exist_ok=True)
-                asyncio.run(_download_file(model_url, model_path))
-            except Exception as e:
-                print(f"⚠️ Model download failed: {e}")
+        asyncio.run(_download_models(models))
 
 # ======================== MAIN INSTALLATION LOGIC =======================
 
-async def main():
-    """Enhanced main installation logic with comprehensive WebUI detection."""
+async def main(with_requirements=True):
+    """
+    Enhanced main installation logic with comprehensive WebUI detection.
+
+    with_requirements: False only fetches / unpacks the WebUI (see install_requirements()).
+    """
     
     print(f"🔧 Installing WebUI: {UI}")
     print(f"📍 Environment: {ENV_NAME}")
     print(f"📂 Installation path: {WEBUI}")
     
     try:
-        # Check if WebUI already exists
-        if WEBUI.exists() and any(WEBUI.iterdir()):
+        # Check if WebUI already exists (model folders alone may already have been created)
+        if is_webui_installed(UI, WEBUI):
             print(f"✅ {UI} already installed at {WEBUI}")
             return True
         
@@ -437,7 +693,7 @@ async def main():
                 return False
             
             repo_url = WEBUI_REPOSITORIES[UI]
-            success = install_git_webui(UI, repo_url)
+            success = install_git_webui(UI, repo_url, with_requirements)
             
             if success:
                 # Download specialized models if needed
@@ -469,6 +725,8 @@ async def main():
     except Exception as e:
         print(f"❌ Installation failed: {e}")
         return False
+    finally:
+        await http.close_async_session()
 
 # Execute main installation
 if __name__ == "__main__":
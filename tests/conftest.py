@@ -0,0 +1,17 @@
+# ~ conftest.py | Shared setup for the module tests | by ANXETY ~
+
+from pathlib import Path
+import tempfile
+import sys
+import os
+
+ROOT = Path(__file__).resolve().parents[1]
+HOME = Path(tempfile.mkdtemp(prefix='anxety-tests-'))
+
+# Modules read their *_path variables at import time, so these go in before any test imports one
+os.environ.update({
+    'home_path': str(HOME),
+    'settings_path': str(HOME / 'settings.json'),
+    'cache_path': str(HOME / 'cache')
+})
+sys.path.insert(0, str(ROOT / 'modules'))
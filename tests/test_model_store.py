@@ -0,0 +1,90 @@
+import hashlib
+import os
+
+import pytest
+
+from model_store import ModelStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ModelStore(tmp_path / 'store')
+
+
+def download(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path, hashlib.sha256(data).hexdigest()
+
+
+def test_ingest_leaves_read_only_view(store, tmp_path):
+    path, sha256 = download(tmp_path / 'A1111' / 'models' / 'a.safetensors', b'a' * 4096)
+    assert store.ingest(path, sha256, url='https://host/a', category='model') == sha256
+
+    blob = store.blob_path(sha256)
+    assert blob.is_file() and os.path.samefile(blob, path)
+    assert blob.stat().st_mode & 0o777 == 0o444
+    assert store.find_by_url('https://host/a') == sha256
+    assert store.refcount(sha256) == 1
+
+
+def test_duplicate_ingest_keeps_one_blob(store, tmp_path):
+    first, sha256 = download(tmp_path / 'A1111' / 'a.safetensors', b'same')
+    second, _ = download(tmp_path / 'Forge' / 'a.safetensors', b'same')
+    store.ingest(first, sha256)
+    store.ingest(second, sha256)
+    assert os.path.samefile(first, second)
+    assert store.refcount(sha256) == 2
+    assert len(list(store.blobs.rglob('*'))) == 2      # one shard folder, one blob
+
+
+def test_link_and_gc(store, tmp_path):
+    path, sha256 = download(tmp_path / 'A1111' / 'a.safetensors', b'model')
+    store.ingest(path, sha256, category='model')
+    view = tmp_path / 'ComfyUI' / 'checkpoints' / 'a.safetensors'
+    assert store.link(sha256, view) in ('hardlink', 'reflink', 'symlink')
+    assert view.read_bytes() == b'model'
+    assert store.refcount(sha256) == 2
+
+    path.unlink()
+    assert store.gc() == {'blobs': 0, 'bytes': 0}      # still linked into ComfyUI
+    assert list(store.index[sha256]['views']) == [str(view)]
+
+    view.unlink()
+    assert store.gc(dry_run=True) == {'blobs': 1, 'bytes': 5}
+    assert store.blob_path(sha256).is_file()
+    assert store.gc() == {'blobs': 1, 'bytes': 5}
+    assert not store.blob_path(sha256).exists()
+    assert sha256 not in ModelStore(store.root).index  # persisted
+
+
+def test_replaced_view_is_not_a_reference(store, tmp_path):
+    path, sha256 = download(tmp_path / 'A1111' / 'a.safetensors', b'model')
+    store.ingest(path, sha256)
+    path.unlink()
+    path.write_bytes(b'model')                         # same size, but the user's own file now
+    assert store.refcount(sha256) == 0
+    assert store.gc()['blobs'] == 1
+    assert path.read_bytes() == b'model'
+
+
+def test_detach_gives_writable_copy(store, tmp_path):
+    path, sha256 = download(tmp_path / 'A1111' / 'a.safetensors', b'model')
+    store.ingest(path, sha256)
+    assert store.detach(path)
+    assert not os.path.samefile(path, store.blob_path(sha256))
+    path.write_bytes(b'merged')                        # writable, and the blob is untouched
+    assert store.blob_path(sha256).read_bytes() == b'model'
+    assert store.refcount(sha256) == 0
+    assert not store.detach(path)
+
+
+def test_gc_drops_modified_blob(store, tmp_path):
+    path, sha256 = download(tmp_path / 'A1111' / 'a.safetensors', b'model')
+    store.ingest(path, sha256)
+    os.chmod(path, 0o644)                              # e.g. written through the view as root
+    path.write_bytes(b'modded')
+    assert store.verify() == [sha256]
+    assert store.gc()['blobs'] == 1
+    assert sha256 not in store.index
+    assert path.read_bytes() == b'modded'
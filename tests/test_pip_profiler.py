@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+import pip_profiler
+
+
+# Captured `pip install` output, with the time each line arrived
+OUTPUT = [
+    (0.0, 'Collecting numpy>=1.21'),
+    (1.0, '  Downloading numpy-1.26.4-cp311-cp311-manylinux_2_17_x86_64.whl (18.3 MB)'),
+    (3.0, 'Collecting insightface==0.7.3'),
+    (3.5, '  Downloading insightface-0.7.3.tar.gz (439 kB)'),
+    (4.0, '  Installing build dependencies: started'),
+    (5.0, 'Building wheels for collected packages: insightface'),
+    (5.5, '  Building wheel for insightface (pyproject.toml): started'),
+    (9.5, '  Created wheel for insightface: filename=insightface-0.7.3-cp311-linux_x86_64.whl'),
+    (10.0, 'Successfully built insightface'),
+    (10.5, 'Installing collected packages: numpy, insightface'),
+    (12.5, 'Successfully installed insightface-0.7.3 numpy-1.26.4'),
+]
+
+
+def test_attribute_phases():
+    timings, overhead = pip_profiler.attribute(OUTPUT, end=13.0)
+    assert set(timings) == {'numpy', 'insightface'}
+    assert timings['numpy'] == pytest.approx({'resolve': 1.0, 'download': 2.0, 'build': 0.0, 'install': 1.0})
+    # 'Building wheels for collected packages' is not charged to a package
+    assert timings['insightface'] == pytest.approx({'resolve': 0.5, 'download': 0.5, 'build': 5.0, 'install': 1.0})
+    assert overhead == pytest.approx(2.0)
+
+
+def test_attribute_accounts_for_every_second():
+    timings, overhead = pip_profiler.attribute(OUTPUT, end=13.0)
+    assert sum(sum(phases.values()) for phases in timings.values()) + overhead == pytest.approx(13.0)
+
+
+def test_attribute_empty_output():
+    assert pip_profiler.attribute([], end=1.0) == ({}, 0.0)
+
+
+@pytest.mark.parametrize('token, name', [
+    ('numpy>=1.21', 'numpy'),
+    ('Pillow==10.0', 'pillow'),
+    ('opencv_python-headless', 'opencv-python-headless'),
+    ('git+https://github.com/openai/CLIP.git', 'clip'),
+    ('git+https://github.com/x/y.git#egg=Some_Pkg', 'some-pkg'),
+])
+def test_package_names(token, name):
+    assert pip_profiler._package(token) == name
+
+
+def test_report_packages(tmp_path):
+    report = tmp_path / 'report.json'
+    report.write_text(json.dumps({'install': [
+        {'metadata': {'name': 'NumPy', 'version': '1.26.4'},
+         'download_info': {'url': 'https://files/numpy-1.26.4-cp311-manylinux.whl'}},
+        {'metadata': {'name': 'insightface', 'version': '0.7.3'},
+         'download_info': {'url': 'https://files/insightface-0.7.3.tar.gz'}},
+        {'metadata': {'name': 'clip', 'version': '1.0'},
+         'download_info': {'url': 'https://github.com/openai/CLIP', 'vcs_info': {'vcs': 'git'}}},
+        {'metadata': {'name': 'node', 'version': '0.1'},
+         'download_info': {'url': 'file:///nodes/node', 'dir_info': {}}},
+    ]}))
+    assert pip_profiler._report_packages(report) == {
+        'numpy': {'version': '1.26.4', 'source': 'wheel'},
+        'insightface': {'version': '0.7.3', 'source': 'sdist'},
+        'clip': {'version': '1.0', 'source': 'vcs'},
+        'node': {'version': '0.1', 'source': 'local'},
+    }
@@ -0,0 +1,138 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import hashlib
+import json
+import os
+
+import pytest
+
+import range_downloader
+from range_downloader import RangeDownloader
+
+DATA = os.urandom(64 * 1024 + 123)
+
+
+def make_handler(ranges):
+    class Handler(BaseHTTPRequestHandler):
+        requested = []
+
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(DATA)))
+            self.send_header('ETag', '"v1"')
+            if ranges:
+                self.send_header('Accept-Ranges', 'bytes')
+            self.end_headers()
+
+        def do_GET(self):
+            header = self.headers.get('Range')
+            self.requested.append(header)
+            if ranges and header:
+                start, end = header.split('=', 1)[1].split('-')
+                start, end = int(start), int(end or len(DATA) - 1)
+                body = DATA[start:end + 1]
+                self.send_response(206)
+                self.send_header('Content-Range', f"bytes {start}-{end}/{len(DATA)}")
+            else:
+                body = DATA
+                self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    return Handler
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(ranges=True):
+        handler = make_handler(ranges)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/model.safetensors", handler.requested
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def small_segments(monkeypatch):
+    # Split the test file into several ranges instead of one 8 MB minimum segment
+    monkeypatch.setattr(range_downloader, 'NATIVE_MIN_SEGMENT', 16 * 1024)
+
+
+def interrupted(url, output, written):
+    """Leave output as a transfer stopped after `written` bytes of its first range."""
+    downloader = RangeDownloader(url, output, connections=4)
+    assert downloader.reserve({'size': len(DATA), 'accept_ranges': True, 'etag': '"v1"'})
+    with open(output, 'r+b') as f:
+        f.write(written)
+    state = json.loads(downloader.state_file.read_text())
+    state['segments'][0]['pos'] = len(written)
+    downloader.state_file.write_text(json.dumps(state))
+    return state
+
+
+def test_download_in_ranges(serve, tmp_path):
+    url, requested = serve()
+    downloader = RangeDownloader(url, tmp_path / 'model.safetensors', connections=4)
+    assert downloader.run()
+    assert (tmp_path / 'model.safetensors').read_bytes() == DATA
+    assert downloader.sha256 == hashlib.sha256(DATA).hexdigest()
+    assert not downloader.state_file.exists()
+    assert len([r for r in requested if r and r != 'bytes=0-0']) == 4
+
+
+def test_resume_from_sidecar(serve, tmp_path):
+    url, requested = serve()
+    output = tmp_path / 'model.safetensors'
+    state = interrupted(url, output, DATA[:5000])
+
+    downloader = RangeDownloader(url, output, connections=4)
+    assert downloader.run()
+    assert output.read_bytes() == DATA
+    assert downloader.sha256 == hashlib.sha256(DATA).hexdigest()
+    assert not downloader.state_file.exists()
+    # The first range picks up where it stopped; nothing before it is fetched again
+    first = state['segments'][0]
+    assert f"bytes=5000-{first['end']}" in requested
+    assert not any(r and r.startswith('bytes=0-') and r != 'bytes=0-0' for r in requested)
+
+
+def test_sidecar_for_other_url_is_ignored(serve, tmp_path):
+    url, requested = serve()
+    output = tmp_path / 'model.safetensors'
+    interrupted(url + '?old', output, b'\0' * 5000)
+
+    downloader = RangeDownloader(url, output, connections=4)
+    assert downloader.run()
+    assert output.read_bytes() == DATA
+
+
+def test_fallback_without_range_support(serve, tmp_path):
+    url, requested = serve(ranges=False)
+    downloader = RangeDownloader(url, tmp_path / 'model.safetensors', connections=4)
+    assert downloader.run()
+    assert (tmp_path / 'model.safetensors').read_bytes() == DATA
+    assert downloader.sha256 == hashlib.sha256(DATA).hexdigest()
+    assert not downloader.state_file.exists()
+    assert downloader.total == len(DATA)
+
+
+def test_hash_covers_resumed_prefix(serve, tmp_path):
+    # A corrupt prefix from an earlier run must not slip through: the digest is taken over
+    # the whole file, so it no longer matches the published SHA256
+    url, _ = serve()
+    output = tmp_path / 'model.safetensors'
+    interrupted(url, output, b'\xff' * 5000)
+
+    downloader = RangeDownloader(url, output, connections=4)
+    assert downloader.run()
+    assert downloader.sha256 != hashlib.sha256(DATA).hexdigest()
+    assert downloader.sha256 == hashlib.sha256(output.read_bytes()).hexdigest()